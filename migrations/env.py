@@ -4,6 +4,7 @@ import asyncio
 import sys
 from logging.config import fileConfig
 from os import environ
+from uuid import uuid4
 
 from alembic import context
 from sqlalchemy import engine_from_config, pool
@@ -17,8 +18,8 @@ from smart_fridge.lib.models.abc import AbstractModel
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-# set database connection string from environment variable
-database_url = environ.get("DATABASE__URL")
+# set database connection string from `-x url=...`, which migrates one shard, or the environment variable
+database_url = context.get_x_argument(as_dictionary=True).get("url") or environ.get("DATABASE__URL")
 if not database_url:
     sys.exit("Enviroment variable `DATABASE__URL` is not set. Exiting...")
 config.set_main_option("sqlalchemy.url", database_url)
@@ -76,12 +77,21 @@ async def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    connect_args = {}
+    if environ.get("DATABASE__TRANSACTION_POOLING", "").lower() in ("1", "true"):
+        # PgBouncer in transaction pooling mode, see `db_engine`
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
     connectable = AsyncEngine(
         engine_from_config(
             config.get_section(config.config_ini_section),  # type: ignore[arg-type]
             prefix="sqlalchemy.",
             poolclass=pool.NullPool,
             future=True,
+            connect_args=connect_args,
         )
     )
 
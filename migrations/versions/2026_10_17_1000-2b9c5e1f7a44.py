@@ -0,0 +1,33 @@
+"""Add lower(email) index on users
+
+Revision ID: 2b9c5e1f7a44
+Revises: 8d2e4b7a1c30
+Create Date: 2026-10-17 10:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2b9c5e1f7a44"
+down_revision: Union[str, None] = "8d2e4b7a1c30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_email_lower",
+        "users",
+        [sa.text("lower(email)")],
+        unique=False,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email_lower", table_name="users")
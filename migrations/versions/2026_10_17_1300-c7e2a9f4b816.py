@@ -0,0 +1,117 @@
+"""Add indexes on foreign keys, refresh tokens & Telegram ids
+
+Revision ID: c7e2a9f4b816
+Revises: 9a4c1e7d3b52
+Create Date: 2026-10-17 13:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c7e2a9f4b816"
+down_revision: Union[str, None] = "9a4c1e7d3b52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently, outside of the migration transaction, so writes are not blocked meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f("ix_auth_sessions_refresh_token"),
+            "auth_sessions",
+            ["refresh_token"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f("ix_auth_sessions_user_id"), "auth_sessions", ["user_id"], unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_users_tg_id",
+            "users",
+            ["tg_id"],
+            unique=False,
+            postgresql_where=sa.text("tg_id IS NOT NULL"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_products_owner_id",
+            "products",
+            ["owner_id"],
+            unique=False,
+            postgresql_include=["id", "product_type_id", "manufactured_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f("ix_products_product_type_id"),
+            "products",
+            ["product_type_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f("ix_fridges_owner_id"), "fridges", ["owner_id"], unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            "ix_fridge_products_product_id",
+            "fridge_products",
+            ["product_id"],
+            unique=False,
+            postgresql_include=["created_at", "deleted_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_fridge_products_product_id_active",
+            "fridge_products",
+            ["product_id"],
+            unique=False,
+            postgresql_where=sa.text("deleted_at IS NULL"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f("ix_fridge_products_fridge_id"),
+            "fridge_products",
+            ["fridge_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_cart_products_owner_id_active",
+            "cart_products",
+            ["owner_id"],
+            unique=False,
+            postgresql_where=sa.text("deleted_at IS NULL"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f("ix_cart_products_product_type_id"),
+            "cart_products",
+            ["product_type_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f("ix_cart_products_product_type_id"), table_name="cart_products", postgresql_concurrently=True
+        )
+        op.drop_index("ix_cart_products_owner_id_active", table_name="cart_products", postgresql_concurrently=True)
+        op.drop_index(op.f("ix_fridge_products_fridge_id"), table_name="fridge_products", postgresql_concurrently=True)
+        op.drop_index(
+            "ix_fridge_products_product_id_active", table_name="fridge_products", postgresql_concurrently=True
+        )
+        op.drop_index("ix_fridge_products_product_id", table_name="fridge_products", postgresql_concurrently=True)
+        op.drop_index(op.f("ix_fridges_owner_id"), table_name="fridges", postgresql_concurrently=True)
+        op.drop_index(op.f("ix_products_product_type_id"), table_name="products", postgresql_concurrently=True)
+        op.drop_index("ix_products_owner_id", table_name="products", postgresql_concurrently=True)
+        op.drop_index("ix_users_tg_id", table_name="users", postgresql_concurrently=True)
+        op.drop_index(op.f("ix_auth_sessions_user_id"), table_name="auth_sessions", postgresql_concurrently=True)
+        op.drop_index(op.f("ix_auth_sessions_refresh_token"), table_name="auth_sessions", postgresql_concurrently=True)
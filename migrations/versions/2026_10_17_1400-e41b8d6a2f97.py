@@ -0,0 +1,49 @@
+"""Delete the rows of users, fridges & products with them, ON DELETE CASCADE
+
+Revision ID: e41b8d6a2f97
+Revises: c7e2a9f4b816
+Create Date: 2026-10-17 14:00:00.000000+00:00
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e41b8d6a2f97"
+down_revision: Union[str, None] = "c7e2a9f4b816"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table) of the foreign keys that cascade
+FOREIGN_KEYS = (
+    ("auth_sessions", "user_id", "users"),
+    ("products", "owner_id", "users"),
+    ("fridges", "owner_id", "users"),
+    ("cart_products", "owner_id", "users"),
+    ("fridge_products", "fridge_id", "fridges"),
+    ("fridge_products", "product_id", "products"),
+)
+
+
+def _replace_foreign_keys(ondelete: str) -> None:
+    # Every foreign key is swapped in one statement, so rows are never unchecked, and is added NOT VALID so that
+    # the lock is short. It is then validated outside of the migration transaction, without blocking writes.
+    with op.get_context().autocommit_block():
+        for table, column, referred_table in FOREIGN_KEYS:
+            name = f"{table}_{column}_fkey"
+            op.execute(
+                f"ALTER TABLE {table} DROP CONSTRAINT {name}, ADD CONSTRAINT {name} FOREIGN KEY ({column}) "
+                f"REFERENCES {referred_table} (id) {ondelete} NOT VALID"
+            )
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def upgrade() -> None:
+    _replace_foreign_keys("ON DELETE CASCADE")
+
+
+def downgrade() -> None:
+    _replace_foreign_keys("ON DELETE NO ACTION")
@@ -1,16 +1,42 @@
-from contextlib import asynccontextmanager, contextmanager
-from typing import AsyncGenerator, Self
+import asyncio
+from contextlib import ExitStack, asynccontextmanager, contextmanager, suppress
+from typing import Any, AsyncGenerator, Callable, Coroutine, Self, TypeVar
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import sessionmaker
 
+from .core.cache import flush_session_activity, listen_for_invalidations
 from .core.config import AppConfig
 from .core.dependencies import constructors as app_depends, fastapi as stubs
+from .core.disconnect import CancelOnDisconnectMiddleware
+from .core.etag import ETAG_HEADER
 from .core.exceptions.handler import register_exception_handlers
+from .core.replica import monitor_replicas
+from .core.sharding import Shard
+from .core.warmup import warm_up_until_ready
+from .lib.schemas.enums.database import IsolationLevel
 from .routers import router
 
 
+_T = TypeVar("_T")
+
+
+def provide(value: _T) -> Callable[[], Coroutine[Any, Any, _T]]:
+    """Wrap an app-scoped value into a dependency override.
+
+    Async providers are awaited inline, while plain lambdas would be dispatched to the threadpool on every request.
+    """
+
+    async def provider() -> _T:
+        return value
+
+    return provider
+
+
 async def add_options_handler(request: Request, call_next) -> JSONResponse:
     if request.method == "OPTIONS":
         return JSONResponse(
@@ -52,20 +78,136 @@ class App:
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=[ETAG_HEADER],
         )
         self.app.middleware("http")(add_options_handler)
+        self.app.add_middleware(CancelOnDisconnectMiddleware)
         # exception handler
         register_exception_handlers(self.app)
 
     @asynccontextmanager
     async def lifespan(self, app: FastAPI) -> AsyncGenerator[None, None]:
-        async with asynccontextmanager(app_depends.redis_pool)(self.config.redis.url) as redis_pool:
-            with contextmanager(app_depends.db_session_maker)(self.config.database.url) as maker:
-                app.dependency_overrides[stubs.app_config_stub] = lambda: self.config
-                app.dependency_overrides[stubs.db_session_maker_stub] = lambda: maker
-                app.dependency_overrides[stubs.redis_conn_pool_stub] = lambda: redis_pool
+        encryptor = app_depends.encryptor(self.config)
+        token_cache = app_depends.token_cache(self.config)
+        revocation_list = app_depends.revocation_list(self.config)
+        activity = app_depends.session_activity_buffer()
+        metrics = app_depends.metrics()
+
+        async with (
+            asynccontextmanager(app_depends.redis_pool)(self.config.redis.url) as redis_pool,
+            asynccontextmanager(app_depends.redis_conn)(redis_pool) as redis,
+        ):
+            rate_limiter = app_depends.rate_limiter(self.config, redis)
+            shard_configs = app_depends.db_shard_configs(self.config.database)
+            engines = [app_depends.db_engine(i) for i in shard_configs]
+            analytics_engines = [app_depends.db_engine(i, i.analytics) for i in shard_configs]
+            registration_engine = app_depends.db_engine(shard_configs[0], shard_configs[0].registration)
+            replica_engines = app_depends.db_replica_engines(self.config.database)
+            with ExitStack() as stack:
+                # Hot standbys do not run SERIALIZABLE transactions
+                replica_makers = [
+                    stack.enter_context(
+                        contextmanager(app_depends.db_session_maker)(i, IsolationLevel.read_committed, read_only=True)
+                    )
+                    for i in replica_engines
+                ]
+                # The replicas only serve the catalog shard
+                shards = app_depends.shard_router(
+                    [
+                        self.__shard(stack, redis, index, i, analytics_i, [] if index else replica_makers)
+                        for index, (i, analytics_i) in enumerate(zip(engines, analytics_engines))
+                    ]
+                )
+                # Registrations lock their email on the catalog shard only
+                registration_maker = stack.enter_context(
+                    contextmanager(app_depends.db_session_maker)(registration_engine, IsolationLevel.read_committed)
+                )
+                app.dependency_overrides[stubs.app_config_stub] = provide(self.config)
+                app.dependency_overrides[stubs.encryptor_stub] = provide(encryptor)
+                app.dependency_overrides[stubs.shard_router_stub] = provide(shards)
+                app.dependency_overrides[stubs.registration_maker_stub] = provide(registration_maker)
+                app.dependency_overrides[stubs.redis_stub] = provide(redis)
+                app.dependency_overrides[stubs.token_cache_stub] = provide(token_cache)
+                app.dependency_overrides[stubs.revocation_list_stub] = provide(revocation_list)
+                app.dependency_overrides[stubs.session_activity_stub] = provide(activity)
+                app.dependency_overrides[stubs.rate_limiter_stub] = provide(rate_limiter)
+                app.dependency_overrides[stubs.metrics_stub] = provide(metrics)
+                # Read by middlewares and health checks, which do not take dependencies
+                app.state.metrics = metrics
+                app.state.ready = not self.config.warm_up.enabled
+
+                tasks = [
+                    asyncio.create_task(listen_for_invalidations(redis, token_cache, revocation_list)),
+                    asyncio.create_task(
+                        flush_session_activity(
+                            [i.maker for i in shards],
+                            activity,
+                            interval=self.config.auth_session.activity_flush_seconds,
+                            batch_size=self.config.auth_session.batch_size,
+                        )
+                    ),
+                ]
+                tasks += [
+                    asyncio.create_task(
+                        monitor_replicas(i.replicas, interval=self.config.database.replica_health_check_seconds)
+                    )
+                    for i in shards
+                ]
+                if self.config.warm_up.enabled:
+                    connections = self.config.warm_up.connections
+                    pool_size = self.config.database.pool_size if connections is None else connections
+                    analytics_pool_size = (
+                        self.config.database.analytics.pool_size if connections is None else connections
+                    )
+                    pools = []
+                    for shard in shards:
+                        pools += [(shard.read_only_maker, pool_size), (shard.analytics_maker, analytics_pool_size)]
+                    pools += [(i, pool_size) for i in replica_makers]
+                    warm_up = asyncio.create_task(
+                        warm_up_until_ready(app.state, redis, pools, retry_seconds=self.config.warm_up.retry_seconds)
+                    )
+                    tasks.append(warm_up)
+                    # Keeps warming up in the background after the timeout, /health/ready gates traffic meanwhile
+                    await asyncio.wait({warm_up}, timeout=self.config.warm_up.timeout_seconds)
+                try:
+                    yield
+                finally:
+                    app.state.ready = False
+                    for task in tasks:
+                        task.cancel()
+                    for task in tasks:
+                        with suppress(asyncio.CancelledError):
+                            await task
+                    encryptor.close()
+                    for engine in engines + analytics_engines + replica_engines + [registration_engine]:
+                        await engine.dispose()
 
-                yield
+    def __shard(
+        self,
+        stack: ExitStack,
+        redis: Redis,
+        index: int,
+        engine: AsyncEngine,
+        analytics_engine: AsyncEngine,
+        replica_makers: list[sessionmaker[Any]],
+    ) -> Shard:
+        def session_maker(engine: AsyncEngine, isolation_level: IsolationLevel, **kwargs: Any) -> sessionmaker[Any]:
+            return stack.enter_context(contextmanager(app_depends.db_session_maker)(engine, isolation_level, **kwargs))
+
+        read_only_maker = session_maker(
+            engine,
+            IsolationLevel.serializable if self.config.database.read_only_deferrable else IsolationLevel.read_committed,
+            read_only=True,
+            deferrable=self.config.database.read_only_deferrable,
+        )
+        return Shard(
+            index=index,
+            maker=session_maker(engine, IsolationLevel.read_committed),
+            read_only_maker=read_only_maker,
+            replicas=app_depends.replica_router(self.config, read_only_maker, replica_makers, redis),
+            analytics_maker=session_maker(analytics_engine, IsolationLevel.read_committed, read_only=True),
+            unit_of_work=app_depends.unit_of_work(self.config, session_maker(engine, IsolationLevel.serializable)),
+        )
 
 
 def app() -> FastAPI:
@@ -1,8 +1,13 @@
+from contextlib import asynccontextmanager
+from typing import Any
+
 from aiogram import Router, types
 from aiogram.filters import CommandObject, CommandStart
 from dishka.integrations.aiogram import FromDishka
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
+from smart_fridge.core.dependencies import constructors as app_depends
+from smart_fridge.core.sharding import ShardRouter
 from smart_fridge.lib.db import user as users_db
 from smart_fridge.lib.schemas.user import UserPatchSchema
 
@@ -11,7 +16,9 @@ router = Router(name=__name__)
 
 
 @router.message(CommandStart(deep_link=True))
-async def handle_start(message: types.Message, command: CommandObject, db: FromDishka[AsyncSession]) -> None:
+async def handle_start(
+    message: types.Message, command: CommandObject, shards: FromDishka[ShardRouter[sessionmaker[Any]]]
+) -> None:
     args = command.args
     if args is None:
         await message.reply("Corrupted link. No <code>/start</code> deep-linking payload.")
@@ -21,7 +28,8 @@ async def handle_start(message: types.Message, command: CommandObject, db: FromD
     assert message.from_user
 
     schema = UserPatchSchema(tg_id=message.from_user.id)
-    await users_db.update_user(db, user_id=int(args), schema=schema)
+    async with asynccontextmanager(app_depends.db_session_autocommit)(shards.get(int(args))) as db:
+        await users_db.update_user(db, user_id=int(args), schema=schema)
 
     await message.reply("<b>Успех</b>! Теперь вы будете получать уведомления о своих продуктах в Telegram!")
 
@@ -0,0 +1,36 @@
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy.orm import sessionmaker
+
+from smart_fridge.core.config import AppConfig
+from smart_fridge.core.dependencies import constructors as app_depends
+from smart_fridge.core.dependencies.aiogram import container
+from smart_fridge.core.sharding import ShardRouter
+from smart_fridge.lib.db import auth_session as auth_session_db
+
+
+logger = logging.getLogger(__name__)
+
+
+async def delete_expired_auth_sessions() -> None:
+    config = await container.get(AppConfig)
+    expired_before = datetime.now(timezone.utc) - timedelta(days=config.jwt.refresh_token_expire_days)
+
+    shards = await container.get(ShardRouter[sessionmaker[Any]])
+
+    total = 0
+    for maker in shards:
+        while True:
+            # Every batch is committed on its own, so locks are short and progress survives a failure
+            async with asynccontextmanager(app_depends.db_session_autocommit)(maker) as db:
+                deleted = await auth_session_db.delete_expired_auth_sessions(
+                    db, expired_before, limit=config.auth_session.batch_size
+                )
+            total += deleted
+            if deleted < config.auth_session.batch_size:
+                break
+
+    logger.info("Deleted %s expired auth sessions", total)
@@ -1,8 +1,13 @@
+from contextlib import asynccontextmanager
+from typing import Any
+
 from aiogram import Bot
 from apscheduler.executors.base import logging
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
+from smart_fridge.core.dependencies import constructors as app_depends
 from smart_fridge.core.dependencies.aiogram import container
+from smart_fridge.core.sharding import ShardRouter
 from smart_fridge.lib.db import user as users_db
 
 
@@ -20,10 +25,10 @@ async def _send_notification(bot: Bot, tg_id: int, days: int) -> None:
 
 
 async def expiration_notifications(bot: Bot) -> None:
-    async with container() as request_container:
-        db = await request_container.get(AsyncSession)
-
-        results = await users_db.get_expiry_users(db)
+    shards = await container.get(ShardRouter[sessionmaker[Any]])
+    for maker in shards:
+        async with asynccontextmanager(app_depends.db_session_autocommit)(maker) as db:
+            results = await users_db.get_expiry_users(db)
         logger.debug("Got expiry users results: %s", results)
         for result in results:
             user, days = result
@@ -1,6 +1,7 @@
 from aiogram import Bot
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from smart_fridge.bot.schedule.jobs.auth_session import delete_expired_auth_sessions
 from smart_fridge.bot.schedule.jobs.expiry import expiration_notifications
 
 
@@ -11,3 +12,8 @@ def set_scheduled_jobs(scheduler: AsyncIOScheduler, bot: Bot) -> None:
         minute=0,
         args=(bot,),
     )
+    scheduler.add_job(
+        delete_expired_auth_sessions,
+        "cron",
+        minute=30,
+    )
@@ -0,0 +1,389 @@
+import asyncio
+import json
+import subprocess
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from secrets import compare_digest
+from statistics import mean, quantiles
+from time import perf_counter
+from typing import Annotated, Any, AsyncGenerator, Awaitable, Callable
+from uuid import uuid4
+
+import typer
+from fastapi import Depends, FastAPI
+from redis.asyncio import ConnectionPool, Redis
+from sqlalchemy import delete, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import ASGIApp, Message
+
+from smart_fridge.app import App, provide
+from smart_fridge.core.config import AppConfig
+from smart_fridge.core.dependencies import constructors as app_depends
+from smart_fridge.core.dependencies.fastapi import AppConfigDependency, EncryptorDependency, RedisDependency
+from smart_fridge.core.exceptions.auth import BadAuthDataException
+from smart_fridge.core.security import Encryptor
+from smart_fridge.lib.db import auth as auth_db, auth_session as auth_session_db, user as user_db
+from smart_fridge.lib.models import UserModel
+from smart_fridge.lib.schemas.auth import TokenCreateSchema, TokenRedisData, TokenSchema
+from smart_fridge.lib.schemas.enums.redis import AuthRedisKeyType
+from smart_fridge.lib.schemas.user import UserCreateSchema
+
+
+app = typer.Typer(help="Micro-benchmarks and diagnostics.")
+
+
+@dataclass(frozen=True, slots=True)
+class AsgiResponse:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+async def asgi_request(
+    application: ASGIApp, method: str, path: str, headers: list[tuple[bytes, bytes]] | None = None, body: bytes = b""
+) -> AsgiResponse:
+    """Send a single in-process request through the ASGI app and return its response."""
+    path, _, query_string = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "root_path": "",
+        "headers": headers or [],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    status = 0
+    response_headers: dict[str, str] = {}
+    chunks: list[bytes] = []
+    received = False
+    response_complete = asyncio.Event()
+
+    async def receive() -> Message:
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Like a server, only report the disconnect once the response is sent
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update((k.decode().lower(), v.decode()) for k, v in message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_complete.set()
+
+    await application(scope, receive, send)
+    return AsgiResponse(status, response_headers, b"".join(chunks))
+
+
+def _redis_pool_stub() -> ConnectionPool:
+    raise NotImplementedError
+
+
+async def _per_request_encryptor(config: Annotated[AppConfig, Depends(app_depends.app_config)]) -> Encryptor:
+    return app_depends.encryptor(config)
+
+
+async def _per_request_redis(pool: Annotated[ConnectionPool, Depends(_redis_pool_stub)]) -> AsyncGenerator[Redis, None]:
+    async for redis in app_depends.redis_conn(pool):
+        yield redis
+
+
+async def _bench_dependencies(iterations: int) -> dict[str, float]:
+    application = App.from_env()
+    fastapi_app: FastAPI = application.app
+
+    async def app_scoped(config: AppConfigDependency, encryptor: EncryptorDependency, redis: RedisDependency) -> None:
+        return None
+
+    async def per_request(
+        config: Annotated[AppConfig, Depends(app_depends.app_config)],
+        encryptor: Annotated[Encryptor, Depends(_per_request_encryptor)],
+        redis: Annotated[Redis, Depends(_per_request_redis)],
+    ) -> None:
+        return None
+
+    fastapi_app.add_api_route("/_bench/app_scoped", app_scoped, status_code=204)
+    fastapi_app.add_api_route("/_bench/per_request", per_request, status_code=204)
+
+    results: dict[str, float] = {}
+    async with application.lifespan(fastapi_app):
+        async with asynccontextmanager(app_depends.redis_pool)(application.config.redis.url) as pool:
+            fastapi_app.dependency_overrides[_redis_pool_stub] = provide(pool)
+            for name in ("per_request", "app_scoped"):
+                path = f"/_bench/{name}"
+                # Warm up routing and pydantic caches before measuring
+                for _ in range(min(iterations, 100)):
+                    await asgi_request(fastapi_app, "GET", path)
+                started = perf_counter()
+                for _ in range(iterations):
+                    await asgi_request(fastapi_app, "GET", path)
+                results[name] = (perf_counter() - started) / iterations * 1_000_000
+    return results
+
+
+@app.command()
+def deps(iterations: Annotated[int, typer.Option("--iterations", "-n")] = 5000) -> None:
+    """Measure dependency resolution cost per request (config, encryptor and Redis client)."""
+    results = asyncio.run(_bench_dependencies(iterations))
+    for name, micros in results.items():
+        typer.echo(f"{name:<12} {micros:>10.1f} us/request")
+    typer.echo(f"{'saved':<12} {results['per_request'] - results['app_scoped']:>10.1f} us/request")
+
+
+class _CountingConnectionPool(ConnectionPool):
+    """Connection pool that counts checkouts, i.e. Redis round trips (a pipeline checks out once)."""
+
+    round_trips = 0
+
+    async def get_connection(self, *args: Any, **kwargs: Any) -> Any:
+        self.round_trips += 1
+        return await super().get_connection(*args, **kwargs)
+
+
+async def _legacy_login(db: AsyncSession, redis: Redis, encryptor: Encryptor, schema: TokenCreateSchema) -> TokenSchema:
+    """Login as it was implemented before the single-statement session insert."""
+    user_model = await user_db.get_user_model(db, email=schema.email)
+    if not compare_digest(Encryptor.hash_password(schema.password), user_model.hashed_password):
+        raise BadAuthDataException
+    auth_session_model = await auth_session_db.create_auth_session(
+        db, user_id=user_model.id, user_ip="127.0.0.1", user_agent="bench"
+    )
+    token_data = TokenRedisData(
+        session_id=auth_session_model.id,
+        user_id=auth_session_model.user_id,
+        encryption_key=Encryptor.hash_password(auth_session_model.user.hashed_password[-32:], digest_size=32),
+    )
+    await redis.set(
+        AuthRedisKeyType.access.format(auth_session_model.access_token),
+        token_data.encode(),
+        ex=encryptor.jwt_expire_minutes * 60,
+    )
+    return TokenSchema(
+        access_token=encryptor.encode_jwt(auth_session_model.access_token),
+        refresh_token=encryptor.encode_jwt(
+            auth_session_model.refresh_token, expires_in=encryptor.jwt_refresh_expire_days
+        ),
+        access_token_expires_in=encryptor.jwt_expire_minutes,
+        refresh_token_expires_in=encryptor.jwt_refresh_expire_days,
+    )
+
+
+async def _current_login(
+    db: AsyncSession, redis: Redis, encryptor: Encryptor, schema: TokenCreateSchema
+) -> TokenSchema:
+    return await auth_db.create_token(db, redis, encryptor, "127.0.0.1", "bench", schema)
+
+
+async def _bench_login(iterations: int) -> dict[str, tuple[float, float, float, float]]:
+    config = AppConfig.from_env()
+    encryptor = app_depends.encryptor(config)
+    engine = app_depends.db_engine(config.database)
+    statements = 0
+
+    def count_statement(*args: Any) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    password = uuid4().hex
+    schema = TokenCreateSchema(email=f"bench-{uuid4().hex[:12]}@example.com", password=password)
+    paths: dict[str, Callable[..., Awaitable[TokenSchema]]] = {"legacy": _legacy_login, "current": _current_login}
+    results: dict[str, tuple[float, float, float, float]] = {}
+
+    pool = _CountingConnectionPool.from_url(config.redis.url)
+    redis = Redis(connection_pool=pool)
+    with contextmanager(app_depends.db_session_maker)(engine) as maker:
+        async with maker() as db:
+            await user_db.create_user(
+                db, encryptor, schema=UserCreateSchema(username="bench", email=schema.email, password=password)
+            )
+            await db.commit()
+        try:
+            for name, login in paths.items():
+                timings, db_round_trips, redis_round_trips = [], 0, 0
+                for _ in range(iterations):
+                    async with maker() as db:
+                        statements_before, redis_before = statements, pool.round_trips
+                        started = perf_counter()
+                        token = await login(db, redis, encryptor, schema)
+                        timings.append((perf_counter() - started) * 1000)
+                        db_round_trips += statements - statements_before
+                        redis_round_trips += pool.round_trips - redis_before
+                        # Sessions are rolled back so the bench leaves no rows behind
+                        await db.rollback()
+                    await redis.delete(AuthRedisKeyType.access.format(encryptor.decode_jwt(token.access_token)["sub"]))
+                results[name] = (
+                    db_round_trips / iterations,
+                    redis_round_trips / iterations,
+                    mean(timings),
+                    quantiles(timings, n=100)[98] if iterations > 1 else timings[0],
+                )
+        finally:
+            async with maker() as db:
+                await db.execute(delete(UserModel).where(UserModel.email == schema.email))
+                await db.commit()
+            await redis.aclose()
+            await pool.aclose()
+            await engine.dispose()
+    return results
+
+
+@app.command()
+def login(iterations: Annotated[int, typer.Option("--iterations", "-n")] = 500) -> None:
+    """Compare round trips and latency of the legacy and current login paths against the configured DB and Redis."""
+    results = asyncio.run(_bench_login(iterations))
+    typer.echo(f"{'path':<10} {'db stmts':>10} {'redis rts':>10} {'mean ms':>10} {'p99 ms':>10}")
+    for name, (statements, round_trips, mean_ms, p99_ms) in results.items():
+        typer.echo(f"{name:<10} {statements:>10.1f} {round_trips:>10.1f} {mean_ms:>10.2f} {p99_ms:>10.2f}")
+
+
+async def _sample_session_memory(sample: int) -> dict[str, float]:
+    config = AppConfig.from_env()
+    redis = Redis.from_url(config.redis.url)
+    try:
+        keys: list[bytes] = []
+        async for key in redis.scan_iter(match=AuthRedisKeyType.access.format("*"), count=1000):
+            keys.append(key)
+            if len(keys) >= sample:
+                break
+        if not keys:
+            return {}
+
+        async with redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.memory_usage(key, samples=0)
+                pipe.strlen(key)
+            results = await pipe.execute()
+        usages = [i for i in results[::2] if i is not None]
+        lengths = results[1::2]
+        return {
+            "sampled keys": len(usages),
+            "value bytes": mean(lengths),
+            "memory bytes (mean)": mean(usages),
+            "memory bytes (max)": max(usages),
+            "MiB per 1M sessions": mean(usages) * 1_000_000 / 2**20,
+        }
+    finally:
+        await redis.aclose()
+
+
+@app.command()
+def sessions(sample: Annotated[int, typer.Option("--sample", "-s")] = 1000) -> None:
+    """Sample access token keys in Redis and report memory usage per session."""
+    results = asyncio.run(_sample_session_memory(sample))
+    if not results:
+        typer.echo("No access token keys found.")
+        return
+    for name, value in results.items():
+        typer.echo(f"{name:<22} {value:>12.1f}")
+
+
+async def _bench_pool(concurrency: int, requests: int, hold_ms: float) -> dict[str, float]:
+    config = AppConfig.from_env()
+    engine = app_depends.db_engine(config.database)
+    waits: list[float] = []
+    timeouts = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, timeouts
+        while remaining > 0:
+            remaining -= 1
+            started = perf_counter()
+            try:
+                async with engine.connect() as conn:
+                    waits.append((perf_counter() - started) * 1000)
+                    # Hold the connection like a request doing hold_ms of database work
+                    await conn.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": hold_ms / 1000})
+            except PoolTimeoutError:
+                timeouts += 1
+
+    try:
+        started = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = perf_counter() - started
+    finally:
+        await engine.dispose()
+
+    percentiles = quantiles(waits, n=100) if len(waits) > 1 else [max(waits, default=0)] * 99
+    return {
+        "checkouts": len(waits),
+        "timeouts": timeouts,
+        "wait p50 ms": percentiles[49],
+        "wait p95 ms": percentiles[94],
+        "wait p99 ms": percentiles[98],
+        "wait max ms": max(waits, default=0),
+        "throughput rps": len(waits) / elapsed,
+    }
+
+
+@app.command()
+def pool(
+    concurrency: Annotated[int, typer.Option("--concurrency", "-c")] = 50,
+    requests: Annotated[int, typer.Option("--requests", "-n")] = 2000,
+    hold_ms: Annotated[float, typer.Option("--hold-ms")] = 5,
+) -> None:
+    """Report connection pool checkout wait times under synthetic load with the configured pool settings."""
+    results = asyncio.run(_bench_pool(concurrency, requests, hold_ms))
+    for name, value in results.items():
+        typer.echo(f"{name:<16} {value:>12.2f}")
+
+
+async def _first_request(warm: bool) -> dict[str, float]:
+    config = AppConfig.from_env()
+    config.warm_up.enabled = warm
+    application = App(config)
+    fastapi_app: FastAPI = application.app
+    results: dict[str, float] = {}
+
+    started = perf_counter()
+    async with application.lifespan(fastapi_app):
+        results["startup ms"] = (perf_counter() - started) * 1000
+        for name in ("first request ms", "second request ms"):
+            started = perf_counter()
+            await asgi_request(fastapi_app, "GET", "/api/v1/product_types/")
+            results[name] = (perf_counter() - started) * 1000
+    return results
+
+
+@app.command(name="first-request", hidden=True)
+def first_request(warm: Annotated[bool, typer.Option("--warm/--cold")] = True) -> None:
+    """Print startup and first request latencies of this process as JSON."""
+    typer.echo(json.dumps(asyncio.run(_first_request(warm))))
+
+
+@app.command()
+def startup() -> None:
+    """Compare first request latency after a cold and a warmed-up startup, each in a fresh process."""
+    results = {}
+    for mode in ("cold", "warm"):
+        # Mapper configuration and compiled statement caches are per process
+        output = subprocess.run(
+            [sys.executable, "-m", "smart_fridge", "bench", "first-request", f"--{mode}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    typer.echo(f"{'':<20} {'cold':>10} {'warm':>10}")
+    for name in results["cold"]:
+        typer.echo(f"{name:<20} {results['cold'][name]:>10.2f} {results['warm'][name]:>10.2f}")
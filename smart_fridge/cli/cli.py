@@ -3,8 +3,12 @@ from typing import Annotated
 import typer
 import uvicorn
 
+from . import bench, shards
+
 
 app = typer.Typer()
+app.add_typer(bench.app, name="bench")
+app.add_typer(shards.app, name="shards")
 
 
 @app.command()
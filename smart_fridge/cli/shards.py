@@ -0,0 +1,235 @@
+import asyncio
+from argparse import Namespace
+from typing import Annotated, Sequence
+
+import typer
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from sqlalchemy import ColumnElement, RowMapping, Table, and_, delete, false, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from smart_fridge.core.config import AppConfig
+from smart_fridge.core.dependencies import constructors as app_depends
+from smart_fridge.core.sharding import ShardRouter, replicate_catalog
+from smart_fridge.lib.models import (
+    AuthSessionModel,
+    CartProductModel,
+    FridgeModel,
+    FridgeProductModel,
+    ProductModel,
+    UserModel,
+)
+from smart_fridge.lib.schemas.enums.database import IsolationLevel
+
+
+app = typer.Typer(help="Manage the database shards.")
+
+# Tables whose ids every shard allocates itself, from disjoint residue classes so that rows can be moved
+SEQUENCE_TABLES: Sequence[Table] = (  # type: ignore[assignment]
+    FridgeModel.__table__,
+    ProductModel.__table__,
+    FridgeProductModel.__table__,
+    CartProductModel.__table__,
+)
+
+
+class MoveConflict(Exception):
+    pass
+
+
+def _owned_by(user_id: int) -> dict[Table, ColumnElement[bool]]:
+    """Rows of the user on its shard, in foreign key order."""
+    products = select(ProductModel.id).where(ProductModel.owner_id == user_id)
+    fridges = select(FridgeModel.id).where(FridgeModel.owner_id == user_id)
+    return {
+        UserModel.__table__: UserModel.id == user_id,  # type: ignore[dict-item]
+        AuthSessionModel.__table__: AuthSessionModel.user_id == user_id,  # type: ignore[dict-item]
+        FridgeModel.__table__: FridgeModel.owner_id == user_id,  # type: ignore[dict-item]
+        ProductModel.__table__: ProductModel.owner_id == user_id,  # type: ignore[dict-item]
+        FridgeProductModel.__table__: or_(  # type: ignore[dict-item]
+            FridgeProductModel.product_id.in_(products), FridgeProductModel.fridge_id.in_(fridges)
+        ),
+        CartProductModel.__table__: CartProductModel.owner_id == user_id,  # type: ignore[dict-item]
+    }
+
+
+def _shard_urls(config: AppConfig) -> list[str]:
+    return [i.url for i in app_depends.db_shard_configs(config.database)]
+
+
+async def _configure_sequences(engines: list[AsyncEngine], stride: int) -> None:
+    """Make shard k allocate ids k, k + stride, k + 2 * stride... above every id in use on any shard.
+
+    Sequences already stepping by the stride are left as they are, so this only affects new shards.
+    """
+    sequence = (
+        "SELECT s.increment_by, coalesce(s.last_value, 0), pg_get_serial_sequence(:table, 'id') FROM pg_sequences s "
+        "WHERE format('%I.%I', s.schemaname, s.sequencename) = pg_get_serial_sequence(:table, 'id')"
+    )
+    pending = []
+    highest = 0
+    for index, engine in enumerate(engines):
+        async with engine.connect() as conn:
+            for table in SEQUENCE_TABLES:
+                increment, last_value, name = (await conn.execute(text(sequence), {"table": table.name})).one()
+                max_id = await conn.scalar(select(table.c.id).order_by(table.c.id.desc()).limit(1)) or 0
+                highest = max(highest, last_value, max_id)
+                if increment != stride:
+                    pending.append((index, name))
+
+    base = (highest // stride + 1) * stride
+    for index, name in pending:
+        async with engines[index].begin() as conn:
+            await conn.execute(text(f"ALTER SEQUENCE {name} INCREMENT BY {stride} RESTART WITH {base + index}"))
+        typer.echo(f"Shard {index}: {name} allocates {base + index} + k * {stride}")
+
+
+async def _raise_for_conflict(conn: AsyncConnection, user: RowMapping) -> None:
+    """Raise if the target shard holds another user with the id of the user, or an active one with its email.
+
+    The user row would not be copied, and the rows of the user would then be attached to the other one or fail
+    their foreign keys. The user itself, copied by an interrupted move, is no conflict.
+    """
+    same_email: ColumnElement[bool] = false()
+    if user["deleted_at"] is None:
+        same_email = and_(func.lower(UserModel.email) == user["email"].lower(), UserModel.deleted_at.is_(None))
+    query = select(UserModel.id, UserModel.email).where(or_(UserModel.id == user["id"], same_email))
+    for other_id, other_email in (await conn.execute(query)).all():
+        if other_id != user["id"] or other_email != user["email"]:
+            raise MoveConflict(
+                f"User {user['id']} conflicts with user {other_id} <{other_email}> on the target shard, "
+                "resolve it by hand and run the rebalance again"
+            )
+
+
+async def _move_user(source: AsyncEngine, target: AsyncEngine, user_id: int) -> int:
+    """Copy the rows of the user to the target shard, then delete them from the source one.
+
+    Row ids are unique across shards, so the copy is idempotent and an interrupted move can be run again. The
+    other rows of the user are deleted with it by the source database, with ON DELETE CASCADE.
+
+    Raises:
+        MoveConflict: If the target shard holds another user with the id or the email of the user.
+    """
+    owned = _owned_by(user_id)
+    async with source.connect() as conn:
+        rows = {table: (await conn.execute(select(table).where(i))).mappings().all() for table, i in owned.items()}
+    async with target.begin() as conn:
+        for user in rows[UserModel.__table__]:  # type: ignore[index]
+            await _raise_for_conflict(conn, user)
+        for table, values in rows.items():
+            if values:
+                await conn.execute(insert(table).values([dict(i) for i in values]).on_conflict_do_nothing())
+    async with source.begin() as conn:
+        await conn.execute(delete(UserModel).where(UserModel.id == user_id))
+    return sum(len(i) for i in rows.values())
+
+
+async def _sync_catalog(engines: list[AsyncEngine]) -> None:
+    makers = [next(app_depends.db_session_maker(i, IsolationLevel.read_committed)) for i in engines]
+    await replicate_catalog(makers[0], makers[1:])
+
+
+def _engines(config: AppConfig) -> list[AsyncEngine]:
+    return [app_depends.db_engine(i) for i in app_depends.db_shard_configs(config.database)]
+
+
+async def _dispose(engines: list[AsyncEngine]) -> None:
+    for engine in engines:
+        await engine.dispose()
+
+
+@app.command()
+def migrate(revision: Annotated[str, typer.Argument()] = "head") -> None:
+    """Apply the migrations to every shard, then give the shards disjoint id sequences.
+
+    Run it from the directory of alembic.ini, before deploying a new shard.
+    """
+    config = AppConfig.from_env()
+    urls = _shard_urls(config)
+    if len(urls) > config.database.shard_id_stride:
+        raise typer.BadParameter(f"At most {config.database.shard_id_stride} shards are supported")
+
+    for index, url in enumerate(urls):
+        typer.echo(f"Shard {index}: upgrading to {revision}")
+        command.upgrade(AlembicConfig("alembic.ini", cmd_opts=Namespace(x=[f"url={url}"])), revision)
+
+    async def main() -> None:
+        engines = _engines(config)
+        try:
+            await _configure_sequences(engines, config.database.shard_id_stride)
+            await _sync_catalog(engines)
+        finally:
+            await _dispose(engines)
+
+    if len(urls) > 1:
+        asyncio.run(main())
+
+
+@app.command("sync-catalog")
+def sync_catalog() -> None:
+    """Copy the product types of the catalog shard to the other shards."""
+    config = AppConfig.from_env()
+
+    async def main() -> None:
+        engines = _engines(config)
+        try:
+            await _sync_catalog(engines)
+        finally:
+            await _dispose(engines)
+
+    asyncio.run(main())
+    typer.echo(f"Copied the catalog to {len(_shard_urls(config)) - 1} shards")
+
+
+@app.command()
+def rebalance(
+    dry_run: Annotated[bool, typer.Option(help="Only count the users to move.")] = False,
+    batch_size: Annotated[int, typer.Option(min=1, help="Users read per query.")] = 1000,
+) -> None:
+    """Move every user, with their rows, to the shard their id hashes to.
+
+    Run it once the app is deployed with a new shard in `DATABASE__SHARD_URLS`. Jump consistent hashing
+    only moves users to the new shard, about 1 / N of them. Until a user is moved, their rows are not
+    visible to the app.
+    """
+    config = AppConfig.from_env()
+
+    async def main() -> None:
+        engines = _engines(config)
+        shards: ShardRouter[AsyncEngine] = ShardRouter(engines)
+        moved: dict[tuple[int, int], tuple[int, int]] = {}
+        try:
+            if not dry_run:
+                await _sync_catalog(engines)
+            for source, engine in enumerate(engines):
+                last_id = -1
+                while True:
+                    async with engine.connect() as conn:
+                        query = (
+                            select(UserModel.id).where(UserModel.id > last_id).order_by(UserModel.id).limit(batch_size)
+                        )
+                        user_ids = (await conn.scalars(query)).all()
+                    for user_id in user_ids:
+                        target = shards.index(user_id)
+                        if target == source:
+                            continue
+                        rows = 0 if dry_run else await _move_user(engine, engines[target], user_id)
+                        users, total = moved.get((source, target), (0, 0))
+                        moved[(source, target)] = (users + 1, total + rows)
+                    if len(user_ids) < batch_size:
+                        break
+                    last_id = user_ids[-1]
+        finally:
+            await _dispose(engines)
+
+        for (source, target), (users, rows) in sorted(moved.items()):
+            typer.echo(f"Shard {source} -> {target}: {users} users" + ("" if dry_run else f", {rows} rows"))
+        typer.echo(f"{'Would move' if dry_run else 'Moved'} {sum(i[0] for i in moved.values())} users")
+
+    try:
+        asyncio.run(main())
+    except MoveConflict as e:
+        typer.echo(f"FAILED: {e}", err=True)
+        raise typer.Exit(1)
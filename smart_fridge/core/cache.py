@@ -0,0 +1,225 @@
+import asyncio
+import heapq
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
+from time import time
+from typing import Any, Sequence
+from uuid import UUID
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+from smart_fridge.core.security import Encryptor
+from smart_fridge.lib.db import auth_session as auth_session_db
+from smart_fridge.lib.schemas.auth import TokenRedisData
+from smart_fridge.lib.schemas.enums.redis import AuthRedisChannelType, AuthRedisKeyType
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """Bounded per-worker LRU cache of resolved access tokens.
+
+    Entries are keyed by a digest of the raw bearer token, so raw tokens are never kept in memory,
+    and expire after `ttl` seconds or at the JWT `exp`, whichever comes first.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: int = 60) -> None:
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__entries: OrderedDict[str, tuple[TokenRedisData, str, float]] = OrderedDict()
+        self.__digests: dict[str, str] = {}
+        self.__tombstones: dict[str, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.__max_size > 0 and self.__ttl > 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return Encryptor.hash_text(token, digest_size=16)
+
+    def get(self, digest: str) -> TokenRedisData | None:
+        entry = self.__entries.get(digest)
+        if entry is None:
+            return None
+
+        data, access_token_id, expires_at = entry
+        if expires_at <= time():
+            self.__pop(digest)
+            return None
+
+        self.__entries.move_to_end(digest)
+        return data
+
+    def set(self, digest: str, access_token_id: str, data: TokenRedisData, expires_at: float) -> None:
+        if not self.enabled:
+            return
+
+        now = time()
+        # A request that read the token from Redis right before it was revoked must not resurrect it
+        tombstone = self.__tombstones.get(access_token_id)
+        if tombstone is not None:
+            if tombstone > now:
+                return
+            del self.__tombstones[access_token_id]
+
+        self.__entries[digest] = (data, access_token_id, min(expires_at, now + self.__ttl))
+        self.__entries.move_to_end(digest)
+        self.__digests[access_token_id] = digest
+
+        while len(self.__entries) > self.__max_size:
+            self.__pop(next(iter(self.__entries)))
+
+    def invalidate(self, access_token_id: str) -> None:
+        now = time()
+        if len(self.__tombstones) >= self.__max_size:
+            self.__tombstones = {k: v for k, v in self.__tombstones.items() if v > now}
+        self.__tombstones[access_token_id] = now + self.__ttl
+
+        digest = self.__digests.get(access_token_id)
+        if digest is not None:
+            self.__pop(digest)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.__digests.clear()
+
+    def __pop(self, digest: str) -> None:
+        entry = self.__entries.pop(digest, None)
+        if entry is not None:
+            self.__digests.pop(entry[1], None)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+class RevocationList:
+    """In-memory mirror of the Redis sorted set of access tokens revoked before their expiry.
+
+    Only self-contained access tokens need it: their claims are trusted until `exp`, so logout and
+    refresh have to blacklist the old token id for the rest of its lifetime. Revoked ids are seldom
+    looked up again, so expired entries are pruned by expiry on every `add` rather than on lookup.
+    """
+
+    def __init__(self, ttl: int = 1800) -> None:
+        self.__ttl = ttl
+        self.__entries: dict[str, float] = {}
+        # (expires_at, access_token_id), holding stale items for ids revoked again until they are popped
+        self.__expiry: list[tuple[float, str]] = []
+
+    def add(self, access_token_id: str, expires_at: float | None = None) -> None:
+        self.__prune()
+        expires_at = expires_at or time() + self.__ttl
+        self.__entries[access_token_id] = expires_at
+        heapq.heappush(self.__expiry, (expires_at, access_token_id))
+
+    def __prune(self) -> None:
+        now = time()
+        while self.__expiry and self.__expiry[0][0] <= now:
+            expires_at, access_token_id = heapq.heappop(self.__expiry)
+            if self.__entries.get(access_token_id) == expires_at:
+                del self.__entries[access_token_id]
+
+    def is_revoked(self, access_token_id: str) -> bool:
+        expires_at = self.__entries.get(access_token_id)
+        if expires_at is None:
+            return False
+        if expires_at <= time():
+            del self.__entries[access_token_id]
+            return False
+        return True
+
+    async def load(self, redis: Redis) -> None:
+        now = time()
+        entries = await redis.zrangebyscore(AuthRedisKeyType.revoked.value, now, "+inf", withscores=True)
+        self.__entries = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in entries}
+        self.__expiry = [(v, k) for k, v in self.__entries.items()]
+        heapq.heapify(self.__expiry)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+class SessionActivityBuffer:
+    """Per-worker write-behind buffer of the last activity time of each auth session.
+
+    Requests only overwrite an in-memory timestamp; the database is updated in batches by
+    `flush_session_activity`, so the write rate does not grow with the request rate.
+    """
+
+    def __init__(self) -> None:
+        self.__entries: dict[UUID, float] = {}
+
+    def touch(self, session_id: UUID) -> None:
+        self.__entries[session_id] = time()
+
+    def drain(self) -> dict[UUID, datetime]:
+        entries, self.__entries = self.__entries, {}
+        return {k: datetime.fromtimestamp(v, timezone.utc) for k, v in entries.items()}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+
+async def flush_session_activity(
+    makers: Sequence[sessionmaker[Any]],
+    buffer: SessionActivityBuffer,
+    *,
+    interval: float = 30,
+    batch_size: int = 1000,
+) -> None:
+    """Periodically write buffered session activity to the database of every shard until cancelled.
+
+    Pending activity is flushed one last time on cancellation, so a graceful shutdown loses nothing.
+    Each shard only updates the sessions it holds.
+    """
+
+    async def flush() -> None:
+        activity = buffer.drain()
+        items = iter(activity.items())
+        while batch := dict(islice(items, batch_size)):
+            for maker in makers:
+                try:
+                    async with maker() as db:
+                        await auth_session_db.update_last_online(db, batch)
+                        await db.commit()
+                except SQLAlchemyError:
+                    logger.warning("Failed to flush activity of %s auth sessions", len(batch), exc_info=True)
+
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush()
+    finally:
+        await flush()
+
+
+async def listen_for_invalidations(
+    redis: Redis, cache: TokenCache, revoked: RevocationList, *, reconnect_delay: float = 1.0
+) -> None:
+    """Drop revoked access tokens from the local cache and revocation mirror as other workers publish them.
+
+    Runs until cancelled. Messages missed while disconnected cannot be replayed, so the cache is cleared
+    and the revocation list is reloaded from Redis on every (re)subscription.
+    """
+    while True:
+        try:
+            async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(AuthRedisChannelType.invalidate.value)
+                cache.clear()
+                await revoked.load(redis)
+                async for message in pubsub.listen():
+                    data = message.get("data")
+                    access_token_id = data.decode() if isinstance(data, bytes) else str(data)
+                    cache.invalidate(access_token_id)
+                    revoked.add(access_token_id)
+        except RedisError:
+            logger.warning("Auth invalidation channel disconnected, retrying in %ss", reconnect_delay, exc_info=True)
+            cache.clear()
+            await asyncio.sleep(reconnect_delay)
@@ -26,22 +26,110 @@ class BaseConfig(BaseSettings):
 
 class SecurityConfig(BaseSettings):
     secret_key: str
+    # Threads running password hashing, JWT and Fernet work off the event loop
+    max_workers: int = Field(default=4, gt=0)
+    fernet_cache_size: int = Field(default=128, ge=0)
 
 
 class JWTConfig(BaseSettings):
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=30)
     refresh_token_expire_days: int = Field(default=30)
+    # Put session claims into access tokens and only consult the revocation list on validation
+    self_contained_access_token: bool = Field(default=False)
 
 
-class DatabaseConfig(BaseSettings):
+class DatabasePoolConfig(BaseSettings):
+    # Connections kept open per worker, and extra ones opened under load. 0 opens a connection per session,
+    # which suits a connection pooler next to the app
+    pool_size: int = Field(default=5, ge=0)
+    max_overflow: int = Field(default=10, ge=0)
+    # Seconds to wait for a free connection before failing the request
+    pool_timeout: float = Field(default=30, gt=0)
+    # Seconds after which Postgres cancels a statement, None keeps the server default
+    statement_timeout: float | None = Field(default=None, gt=0)
+
+
+class AnalyticsDatabasePoolConfig(DatabasePoolConfig):
+    pool_size: int = Field(default=2, ge=0)
+    max_overflow: int = Field(default=2, ge=0)
+    # Fail fast instead of queueing behind long range queries
+    pool_timeout: float = Field(default=5, gt=0)
+    statement_timeout: float | None = Field(default=30, gt=0)
+
+
+class BotDatabasePoolConfig(DatabasePoolConfig):
+    pool_size: int = Field(default=2, ge=0)
+    max_overflow: int = Field(default=2, ge=0)
+    statement_timeout: float | None = Field(default=300, gt=0)
+
+
+class RegistrationDatabasePoolConfig(DatabasePoolConfig):
+    pool_size: int = Field(default=2, ge=0)
+    max_overflow: int = Field(default=2, ge=0)
+
+
+class DatabaseConfig(DatabasePoolConfig):
     url: str
+    # Seconds after which connections are replaced, -1 keeps them forever
+    pool_recycle: int = Field(default=-1, ge=-1)
+    pool_pre_ping: bool = Field(default=False)
+    # asyncpg prepared statement cache, ignored with `transaction_pooling`
+    statement_cache_size: int = Field(default=100, ge=0)
+    command_timeout: float | None = Field(default=None, gt=0)
+    # `url` points at PgBouncer in transaction pooling mode: no prepared statement caches, prepared statements
+    # with unique names, and no session state, so consecutive transactions may run on different servers
+    transaction_pooling: bool = Field(default=False)
+    # Retries of SERIALIZABLE units of work failing with a serialization failure or a deadlock
+    serialization_retries: int = Field(default=3, ge=0)
+    serialization_retry_backoff: float = Field(default=0.05, ge=0)
+    # Run GET requests as SERIALIZABLE READ ONLY DEFERRABLE, waiting for a safe snapshot instead of READ COMMITTED
+    read_only_deferrable: bool = Field(default=False)
+    # Streaming replicas serving read-only routes round-robin, e.g. '["postgresql+asyncpg://..."]'
+    replica_urls: list[str] = Field(default_factory=list)
+    replica_health_check_seconds: float = Field(default=5, gt=0)
+    # Seconds a user's reads stay on the primary after they write, above the usual replication lag
+    read_your_writes_seconds: float = Field(default=2, gt=0)
+    # Databases of the other shards, users are spread over `url` and these by a hash of their id
+    shard_urls: list[str] = Field(default_factory=list)
+    # Shards allocate row ids from disjoint residue classes modulo the stride, which bounds the number of shards
+    shard_id_stride: int = Field(default=64, ge=1)
+    # Bulkhead pools, so slow statistics queries and bot scans cannot starve the CRUD pool above
+    analytics: AnalyticsDatabasePoolConfig = Field(default_factory=AnalyticsDatabasePoolConfig)
+    bot: BotDatabasePoolConfig = Field(default_factory=BotDatabasePoolConfig)
+    # Catalog shard connections holding the email lock of a registration while its shard writes the user
+    registration: RegistrationDatabasePoolConfig = Field(default_factory=RegistrationDatabasePoolConfig)
 
 
 class RedisConfig(BaseSettings):
     url: str
 
 
+class AuthCacheConfig(BaseSettings):
+    max_size: int = Field(default=10000, ge=0)
+    ttl_seconds: int = Field(default=60, ge=0)
+
+
+class AuthSessionConfig(BaseSettings):
+    # How often buffered last_online timestamps are written to the database
+    activity_flush_seconds: int = Field(default=30, gt=0)
+    # Maximum number of rows touched by one batched UPDATE or DELETE
+    batch_size: int = Field(default=1000, gt=0)
+
+
+class RateLimitConfig(BaseSettings):
+    enabled: bool = Field(default=True)
+
+
+class WarmUpConfig(BaseSettings):
+    enabled: bool = Field(default=True)
+    # Connections opened per pool on startup, None opens the whole pool_size
+    connections: int | None = Field(default=None, ge=0)
+    # Seconds startup waits for the warm-up before serving, /health/ready stays 503 until it is done
+    timeout_seconds: float = Field(default=30, ge=0)
+    retry_seconds: float = Field(default=5, gt=0)
+
+
 class BotConfig(BaseSettings):
     token: str
 
@@ -52,3 +140,7 @@ class AppConfig(BaseConfig):
     database: DatabaseConfig
     redis: RedisConfig
     bot: BotConfig
+    auth_cache: AuthCacheConfig = Field(default_factory=AuthCacheConfig)
+    auth_session: AuthSessionConfig = Field(default_factory=AuthSessionConfig)
+    rate_limit: RateLimitConfig = Field(default_factory=RateLimitConfig)
+    warm_up: WarmUpConfig = Field(default_factory=WarmUpConfig)
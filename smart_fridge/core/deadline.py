@@ -0,0 +1,77 @@
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Awaitable, Callable, Self
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+from smart_fridge.core.exceptions.deadline import DeadlineExceededException
+
+
+# Seconds the client is willing to wait, it can only shorten the budget of the route
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+@dataclass(frozen=True, slots=True)
+class Deadline:
+    """Latency budget of a request, shared by its database transactions and Redis calls."""
+
+    budget: float
+    expires_at: float
+
+    @classmethod
+    def after(cls, budget: float) -> Self:
+        return cls(budget, monotonic() + budget)
+
+    def remaining(self) -> float:
+        return self.expires_at - monotonic()
+
+    def check(self) -> float:
+        """Return the remaining seconds, or raise when the budget is spent."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededException(budget=self.budget)
+        return remaining
+
+
+# Deadline of the request being handled by the current task, None outside of requests with a budget
+current_deadline: ContextVar[Deadline | None] = ContextVar("current_deadline", default=None)
+
+
+async def _run(func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+    # Bounds a Redis round trip by the deadline of the current request, if any
+    deadline = current_deadline.get()
+    if deadline is None:
+        return await func(*args, **kwargs)
+    try:
+        async with asyncio.timeout(deadline.check()):
+            return await func(*args, **kwargs)
+    except TimeoutError:
+        raise DeadlineExceededException(budget=deadline.budget)
+
+
+class DeadlineRedis(Redis):
+    """Redis client whose commands and pipelines time out when the deadline of the current request runs out."""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        return await _run(super().execute_command, *args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> "DeadlinePipeline":
+        return DeadlinePipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class DeadlinePipeline(Pipeline):
+    """Pipeline whose execution times out when the deadline of the current request runs out.
+
+    Queued commands are only sent by `execute`, commands run right away while watching keys go through
+    `immediate_execute_command`.
+    """
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        result: list[Any] = await _run(super().execute, raise_on_error)
+        return result
+
+    async def immediate_execute_command(self, *args: Any, **options: Any) -> Any:
+        return await _run(super().immediate_execute_command, *args, **options)
@@ -3,37 +3,33 @@ from typing import Any, AsyncGenerator
 from aiogram.types import TelegramObject
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from dishka import Provider, Scope, make_async_container
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import sessionmaker
 
 from smart_fridge.core.config import AppConfig
+from smart_fridge.core.sharding import ShardRouter
+from smart_fridge.lib.schemas.enums.database import IsolationLevel
 
 from . import constructors as app_depends
 
 
-async def provide_db_session(maker: sessionmaker[Any]) -> AsyncGenerator[AsyncSession, None]:
-    generator = app_depends.db_session_autocommit(maker)
-    session = await anext(generator)
+async def db_engines(config: AppConfig) -> AsyncGenerator[list[AsyncEngine], None]:
+    # The bot's own bulkhead pool on every shard, so hourly scans never take connections from the API
+    engines = [app_depends.db_engine(i, config.database.bot) for i in app_depends.db_shard_configs(config.database)]
+    yield engines
+    for engine in engines:
+        await engine.dispose()
 
-    yield session
 
-    try:
-        await anext(generator)
-    except StopAsyncIteration:
-        pass
-    else:
-        raise RuntimeError("Database session not closed (db dependency generator is not closed).")
-
-
-def db_session_maker(config: AppConfig) -> sessionmaker[Any]:
-    return next(app_depends.db_session_maker(config.database.url))
+def db_shard_router(engines: list[AsyncEngine]) -> ShardRouter[sessionmaker[Any]]:
+    return ShardRouter([next(app_depends.db_session_maker(i, IsolationLevel.read_committed)) for i in engines])
 
 
 provider = Provider()
 provider.from_context(provides=TelegramObject, scope=Scope.REQUEST)
 provider.provide(AppConfig.from_env, scope=Scope.APP, provides=AppConfig)
-provider.provide(db_session_maker, scope=Scope.APP, provides=sessionmaker[Any])
-provider.provide(provide_db_session, scope=Scope.REQUEST, provides=AsyncSession)
+provider.provide(db_engines, scope=Scope.APP, provides=list[AsyncEngine])
+provider.provide(db_shard_router, scope=Scope.APP, provides=ShardRouter[sessionmaker[Any]])
 provider.provide(lambda: AsyncIOScheduler(), scope=Scope.APP, provides=AsyncIOScheduler)
 
 container = make_async_container(provider)
@@ -1,33 +1,137 @@
-from json import loads as json_loads
+import logging
 from typing import Any, AsyncGenerator, Generator
-from uuid import UUID
+from uuid import UUID, uuid4
 
+from cryptography.fernet import InvalidToken
 from jwt import InvalidTokenError
 from redis.asyncio import ConnectionPool, Redis
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-from smart_fridge.core.config import AppConfig
+from smart_fridge.core.cache import RevocationList, SessionActivityBuffer, TokenCache
+from smart_fridge.core.config import AppConfig, DatabaseConfig, DatabasePoolConfig
+from smart_fridge.core.deadline import DeadlineRedis
 from smart_fridge.core.exceptions.abc import UnauthorizedException
+from smart_fridge.core.metrics import Metrics
+from smart_fridge.core.rate_limit import RateLimiter
+from smart_fridge.core.replica import ReplicaRouter
 from smart_fridge.core.security import Encryptor
+from smart_fridge.core.sharding import Shard, ShardRouter
+from smart_fridge.core.transaction import (
+    STATEMENT_TIMEOUT_OPTION,
+    TRANSACTION_POOLING_OPTION,
+    ReadOnlySession,
+    UnitOfWork,
+)
+from smart_fridge.lib.db import auth as auth_db
 from smart_fridge.lib.schemas.auth import TokenRedisData
+from smart_fridge.lib.schemas.enums.database import IsolationLevel
 from smart_fridge.lib.schemas.enums.redis import AuthRedisKeyType
 
 
-def db_engine(database_url: str) -> AsyncEngine:
-    return create_async_engine(database_url, isolation_level="SERIALIZABLE")
+logger = logging.getLogger(__name__)
+
+
+def db_engine(config: DatabaseConfig | str, pool: DatabasePoolConfig | None = None) -> AsyncEngine:
+    config = config if isinstance(config, DatabaseConfig) else DatabaseConfig(url=config)
+    # Bulkhead pools share the connection settings but not the connections
+    pool = pool or config
+    connect_args: dict[str, Any] = {
+        "statement_cache_size": config.statement_cache_size,
+        "command_timeout": config.command_timeout,
+    }
+    pool_args: dict[str, Any] = {
+        "pool_size": pool.pool_size,
+        "max_overflow": pool.max_overflow,
+        "pool_timeout": pool.pool_timeout,
+        "pool_recycle": config.pool_recycle,
+    }
+    if config.transaction_pooling:
+        # Statements are prepared and run in the same transaction, so on the same server connection, but
+        # named ones would collide with those other clients prepared there
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = _prepared_statement_name
+    elif pool.statement_timeout is not None:
+        # Startup parameters, which transaction-pooling proxies reject, `_apply_deadline` sets it per transaction
+        connect_args["server_settings"] = {"statement_timeout": str(int(pool.statement_timeout * 1000))}
+    if pool.pool_size == 0:
+        pool_args = {"poolclass": NullPool}
+    engine = create_async_engine(
+        config.url,
+        isolation_level="SERIALIZABLE",
+        pool_pre_ping=config.pool_pre_ping,
+        connect_args=connect_args,
+        execution_options={
+            STATEMENT_TIMEOUT_OPTION: pool.statement_timeout,
+            TRANSACTION_POOLING_OPTION: config.transaction_pooling,
+        },
+        **pool_args,
+    )
+    logger.info(
+        "Database pool: %s, size=%s, max_overflow=%s, timeout=%ss, recycle=%ss, pre_ping=%s, "
+        "statement_cache_size=%s, command_timeout=%s, statement_timeout=%ss, transaction_pooling=%s",
+        type(engine.pool).__name__,
+        pool.pool_size,
+        pool.max_overflow,
+        pool.pool_timeout,
+        config.pool_recycle,
+        config.pool_pre_ping,
+        connect_args["statement_cache_size"],
+        config.command_timeout,
+        pool.statement_timeout,
+        config.transaction_pooling,
+    )
+    return engine
+
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
 
 
 def db_session_maker(
-    engine: AsyncEngine | str,
+    engine: AsyncEngine | DatabaseConfig | str,
+    isolation_level: IsolationLevel | None = None,
+    *,
+    read_only: bool = False,
+    deferrable: bool = False,
 ) -> Generator[sessionmaker[Any], None, None]:
     engine = engine if isinstance(engine, AsyncEngine) else db_engine(engine)
-    maker = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)  # type: ignore[call-overload]
+    options: dict[str, Any] = {}
+    if isolation_level is not None:
+        options["isolation_level"] = isolation_level.value
+    if read_only:
+        options["postgresql_readonly"] = True
+        options["postgresql_deferrable"] = deferrable
+    if options:
+        # Option engines share the pool of the parent engine
+        engine = engine.execution_options(**options)
+    maker = sessionmaker(  # type: ignore[call-overload]
+        engine,
+        expire_on_commit=False,
+        class_=AsyncSession,
+        sync_session_class=ReadOnlySession if read_only else Session,
+    )
     yield maker
     maker.close_all()
 
 
+def db_replica_engines(config: DatabaseConfig) -> list[AsyncEngine]:
+    return [db_engine(config.model_copy(update={"url": url})) for url in config.replica_urls]
+
+
+def db_shard_configs(config: DatabaseConfig) -> list[DatabaseConfig]:
+    return [config] + [config.model_copy(update={"url": url, "replica_urls": []}) for url in config.shard_urls]
+
+
+def replica_router(
+    config: AppConfig, primary: sessionmaker[Any], replicas: list[sessionmaker[Any]], redis: Redis
+) -> ReplicaRouter:
+    return ReplicaRouter(primary, replicas, redis, pin_seconds=config.database.read_your_writes_seconds)
+
+
 async def db_session(maker: sessionmaker[Any]) -> AsyncGenerator[AsyncSession, None]:
     session = maker()
     try:
@@ -54,6 +158,28 @@ async def db_session_autocommit(
         await session.close()
 
 
+async def db_session_read_only(maker: sessionmaker[Any]) -> AsyncGenerator[AsyncSession, None]:
+    session = maker()
+    try:
+        yield session
+    finally:
+        # Nothing was written, ending the transaction with a rollback skips the COMMIT round trip
+        await session.rollback()
+        await session.close()
+
+
+def unit_of_work(config: AppConfig, maker: sessionmaker[Any]) -> UnitOfWork:
+    return UnitOfWork(
+        maker,
+        retries=config.database.serialization_retries,
+        backoff=config.database.serialization_retry_backoff,
+    )
+
+
+def shard_router(shards: list[Shard]) -> ShardRouter[Shard]:
+    return ShardRouter(shards)
+
+
 def app_config() -> AppConfig:
     return AppConfig.from_env()
 
@@ -63,6 +189,9 @@ def encryptor(config: AppConfig) -> Encryptor:
         secret_key=config.security.secret_key,
         jwt_algorithm=config.jwt.algorithm,
         expire_minutes=config.jwt.access_token_expire_minutes,
+        refresh_expire_days=config.jwt.refresh_token_expire_days,
+        max_workers=config.security.max_workers,
+        fernet_cache_size=config.security.fernet_cache_size,
     )
 
 
@@ -73,21 +202,87 @@ async def redis_pool(redis_url: str) -> AsyncGenerator[ConnectionPool, None]:
 
 
 async def redis_conn(pool: ConnectionPool) -> AsyncGenerator[Redis, None]:
-    conn = Redis(connection_pool=pool)
+    conn = DeadlineRedis(connection_pool=pool)
     try:
         yield conn
     finally:
         await conn.aclose()
 
 
-async def get_token_data(encryptor: Encryptor, redis: Redis, token: str) -> TokenRedisData:
+def token_cache(config: AppConfig) -> TokenCache:
+    return TokenCache(max_size=config.auth_cache.max_size, ttl=config.auth_cache.ttl_seconds)
+
+
+def revocation_list(config: AppConfig) -> RevocationList:
+    return RevocationList(ttl=config.jwt.access_token_expire_minutes * 60)
+
+
+def session_activity_buffer() -> SessionActivityBuffer:
+    return SessionActivityBuffer()
+
+
+def metrics() -> Metrics:
+    return Metrics()
+
+
+def rate_limiter(config: AppConfig, redis: Redis) -> RateLimiter:
+    return RateLimiter(redis, enabled=config.rate_limit.enabled)
+
+
+async def get_token_data(
+    encryptor: Encryptor,
+    redis: Redis,
+    token: str,
+    cache: TokenCache | None = None,
+    revoked: RevocationList | None = None,
+    activity: SessionActivityBuffer | None = None,
+) -> TokenRedisData:
+    token_data = await _get_cached_token_data(encryptor, redis, token, cache, revoked)
+    if activity is not None:
+        activity.touch(token_data.session_id)
+    return token_data
+
+
+async def _get_cached_token_data(
+    encryptor: Encryptor, redis: Redis, token: str, cache: TokenCache | None, revoked: RevocationList | None
+) -> TokenRedisData:
+    if cache is None or not cache.enabled:
+        token_data, _ = await _load_token_data(encryptor, redis, token, revoked)
+        return token_data
+
+    digest = TokenCache.digest(token)
+    cached = cache.get(digest)
+    if cached is not None:
+        return cached
+
+    token_data, payload = await _load_token_data(encryptor, redis, token, revoked)
+    cache.set(digest, str(payload.get("sub")), token_data, expires_at=payload["exp"])
+    return token_data
+
+
+async def _load_token_data(
+    encryptor: Encryptor, redis: Redis, token: str, revoked: RevocationList | None = None
+) -> tuple[TokenRedisData, dict[str, Any]]:
     payload = _decode_jwt(encryptor, token)
-    str_data = await redis.get(AuthRedisKeyType.access.format(payload.get("sub")))
+    access_token_id = str(payload.get("sub"))
+
+    # Self-contained tokens carry their own session data and only need the revocation check
+    if "sid" in payload:
+        if revoked is not None and revoked.is_revoked(access_token_id):
+            raise UnauthorizedException(detail_="Invalid token")
+        try:
+            token_data = auth_db.parse_token_claims(encryptor, payload)
+        except (InvalidToken, ValueError, TypeError, KeyError):
+            raise UnauthorizedException(detail_="Invalid token")
+        if token_data is not None:
+            return token_data, payload
+
+    data = await redis.get(AuthRedisKeyType.access.format(access_token_id))
 
-    if str_data is None:
+    if data is None:
         raise UnauthorizedException(detail_="Invalid token")
 
-    return TokenRedisData.model_construct(**json_loads(str_data))
+    return TokenRedisData.decode(data), payload
 
 
 def get_refresh_token(encryptor: Encryptor, token: str) -> UUID:
@@ -1,20 +1,47 @@
-from typing import Annotated, Any, AsyncGenerator
+import asyncio
+from functools import partial
+from json import JSONDecodeError
+from math import ceil
+from typing import Annotated, Any, AsyncGenerator, Awaitable, Callable, Coroutine
 from uuid import UUID
 
 from fastapi import Cookie, Depends, Header, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from redis.asyncio import ConnectionPool, Redis as AbstractRedis
+from redis.asyncio import Redis as AbstractRedis
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 
+from smart_fridge.core.cache import RevocationList, SessionActivityBuffer, TokenCache
 from smart_fridge.core.config import AppConfig
+from smart_fridge.core.deadline import DEADLINE_HEADER, Deadline, current_deadline
+from smart_fridge.core.etag import parse_if_match
+from smart_fridge.core.exceptions.abc import ForbiddenException, UnauthorizedException
+from smart_fridge.core.exceptions.rate_limit import RateLimitExceededException
+from smart_fridge.core.metrics import Metrics
+from smart_fridge.core.rate_limit import RateLimit, RateLimiter
+from smart_fridge.core.sharding import Shard, ShardRouter, allocate_user_id, locate, lock_email, replicate_catalog
+from smart_fridge.core.transaction import UnitOfWork, has_written, is_connected
+from smart_fridge.lib.db import auth_session as auth_session_db, user as user_db
 from smart_fridge.lib.schemas.auth import TokenRedisData
+from smart_fridge.lib.schemas.enums.rate_limit import RateLimitKeyType
 
 from ..security import Encryptor
 from . import constructors as app_depends
 
 
-def db_session_maker_stub() -> sessionmaker[Any]:
+# Id of the request's user, None when anonymous, see `get_user_id_lookup`
+UserIdLookup = Callable[[], Awaitable[int | None]]
+
+
+def shard_router_stub() -> ShardRouter[Shard]:
+    raise NotImplementedError
+
+
+def registration_maker_stub() -> sessionmaker[Any]:
+    raise NotImplementedError
+
+
+def metrics_stub() -> Metrics:
     raise NotImplementedError
 
 
@@ -22,47 +49,33 @@ def app_config_stub() -> AppConfig:
     raise NotImplementedError
 
 
-async def db_session(
-    request: Request,
-    maker: Annotated[sessionmaker[Any], Depends(db_session_maker_stub)],
-) -> AsyncGenerator[AsyncSession, None]:
-    generator = app_depends.db_session_autocommit(maker)
-    session = await anext(generator)
-    request.state.db = session
+def redis_stub() -> AbstractRedis:
+    raise NotImplementedError
 
-    yield session
 
-    try:
-        await anext(generator)
-    except StopAsyncIteration:
-        pass
-    else:
-        raise RuntimeError("Database session not closed (db dependency generator is not closed).")
+def encryptor_stub() -> Encryptor:
+    raise NotImplementedError
 
 
-def redis_conn_pool_stub() -> ConnectionPool:
+def token_cache_stub() -> TokenCache:
     raise NotImplementedError
 
 
-async def redis_conn(
-    request: Request, conn_pool: Annotated[ConnectionPool, Depends(redis_conn_pool_stub)]
-) -> AsyncGenerator[AbstractRedis, None]:
-    generator = app_depends.redis_conn(conn_pool)
-    redis = await anext(generator)
-    request.state.redis = redis
+def revocation_list_stub() -> RevocationList:
+    raise NotImplementedError
 
-    yield redis
 
-    try:
-        await anext(generator)
-    except StopAsyncIteration:
-        pass
-    else:
-        raise RuntimeError("Redis session not closed (redis dependency generator is not closed).")
+def session_activity_stub() -> SessionActivityBuffer:
+    raise NotImplementedError
 
 
-def encryptor(config: Annotated[AppConfig, Depends(app_depends.app_config)]) -> Encryptor:
-    return app_depends.encryptor(config)
+def rate_limiter_stub() -> RateLimiter:
+    raise NotImplementedError
+
+
+async def redis_conn(request: Request, redis: Annotated[AbstractRedis, Depends(redis_stub)]) -> AbstractRedis:
+    request.state.redis = redis
+    return redis
 
 
 def get_client_host(request: Request) -> str:
@@ -70,25 +83,354 @@ def get_client_host(request: Request) -> str:
     return client.host if client else ""
 
 
-async def get_token_data(
-    encryptor: Annotated[Encryptor, Depends(encryptor)],
+async def get_token_data_optional(
+    request: Request,
+    encryptor: Annotated[Encryptor, Depends(encryptor_stub)],
     redis: Annotated[AbstractRedis, Depends(redis_conn)],
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(HTTPBearer())],
+    cache: Annotated[TokenCache, Depends(token_cache_stub)],
+    revoked: Annotated[RevocationList, Depends(revocation_list_stub)],
+    activity: Annotated[SessionActivityBuffer, Depends(session_activity_stub)],
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(HTTPBearer(auto_error=False))],
+) -> TokenRedisData | None:
+    if credentials is None:
+        return None
+    token_data: TokenRedisData | None = getattr(request.state, "token_data", None)
+    if token_data is None:
+        token_data = await app_depends.get_token_data(
+            encryptor, redis, credentials.credentials, cache, revoked, activity
+        )
+        request.state.token_data = token_data
+    return token_data
+
+
+async def get_token_data(
+    token_data: Annotated[TokenRedisData | None, Depends(get_token_data_optional)],
 ) -> TokenRedisData:
-    return await app_depends.get_token_data(encryptor, redis, credentials.credentials)
+    # Shares the cached optional lookup with dependencies that only need the user when there is one
+    if token_data is None:
+        raise ForbiddenException(detail_="Not authenticated")
+    return token_data
+
+
+async def get_user_id_lookup(
+    request: Request,
+    encryptor: Annotated[Encryptor, Depends(encryptor_stub)],
+    redis: Annotated[AbstractRedis, Depends(redis_conn)],
+    cache: Annotated[TokenCache, Depends(token_cache_stub)],
+    revoked: Annotated[RevocationList, Depends(revocation_list_stub)],
+    activity: Annotated[SessionActivityBuffer, Depends(session_activity_stub)],
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(HTTPBearer(auto_error=False))],
+) -> UserIdLookup:
+    """Build a lookup of the request's user id, for shard routing, replica pinning and rate limiting.
+
+    The token is only resolved when the lookup is called, and an invalid one gives None instead of rejecting
+    the request: anonymous routes must accept a stale header, routes requiring a user reject it anyway.
+    """
+
+    async def lookup() -> int | None:
+        try:
+            token_data = await get_token_data_optional(request, encryptor, redis, cache, revoked, activity, credentials)
+        except UnauthorizedException:
+            return None
+        return token_data.user_id if token_data is not None else None
+
+    return lookup
 
 
 def get_refresh_token(
-    encryptor: Annotated[Encryptor, Depends(encryptor)],
+    encryptor: Annotated[Encryptor, Depends(encryptor_stub)],
     refresh_token: Annotated[str | None, Cookie()],
 ) -> UUID:
     return app_depends.get_refresh_token(encryptor, refresh_token or "")
 
 
+async def get_shard(
+    request: Request,
+    shards: Annotated[ShardRouter[Shard], Depends(shard_router_stub)],
+    user_id: Annotated[UserIdLookup, Depends(get_user_id_lookup)],
+) -> Shard:
+    # Anonymous routes locate the shard of their user beforehand, see `locate_shard_by_email`
+    shard: Shard | None = getattr(request.state, "shard", None)
+    if shard is not None:
+        return shard
+    if not shards.sharded:
+        return shards.catalog
+    return shards.get(await user_id())
+
+
+async def db_session(
+    request: Request,
+    shard: Annotated[Shard, Depends(get_shard)],
+    metrics: Annotated[Metrics, Depends(metrics_stub)],
+    user_id: Annotated[UserIdLookup, Depends(get_user_id_lookup)],
+) -> AsyncGenerator[AsyncSession, None]:
+    # Sessions check out a connection on their first statement, not here
+    generator = app_depends.db_session_autocommit(shard.maker)
+    session = await anext(generator)
+    request.state.db = session
+
+    try:
+        yield session
+
+        try:
+            await anext(generator)
+        except StopAsyncIteration:
+            pass
+        else:
+            raise RuntimeError("Database session not closed (db dependency generator is not closed).")
+    finally:
+        _count_db_usage(metrics, session)
+        # Closes the session when the request failed or was cancelled, a no-op otherwise
+        await generator.aclose()
+
+    if has_written(session):
+        await _pin(shard, user_id)
+
+
+async def db_session_read_only(
+    request: Request,
+    shard: Annotated[Shard, Depends(get_shard)],
+    metrics: Annotated[Metrics, Depends(metrics_stub)],
+    user_id: Annotated[UserIdLookup, Depends(get_user_id_lookup)],
+) -> AsyncGenerator[AsyncSession, None]:
+    # The user only matters for their read-your-writes pin, which is not checked without healthy replicas
+    maker = await shard.replicas.get(await user_id() if shard.replicas.healthy else None)
+    generator = app_depends.db_session_read_only(maker)
+    session = await anext(generator)
+    request.state.db = session
+    try:
+        yield session
+    finally:
+        _count_db_usage(metrics, session)
+        await generator.aclose()
+
+
+async def db_session_analytics(
+    request: Request,
+    shard: Annotated[Shard, Depends(get_shard)],
+    metrics: Annotated[Metrics, Depends(metrics_stub)],
+) -> AsyncGenerator[AsyncSession, None]:
+    generator = app_depends.db_session_read_only(shard.analytics_maker)
+    session = await anext(generator)
+    request.state.db = session
+    try:
+        yield session
+    finally:
+        _count_db_usage(metrics, session)
+        await generator.aclose()
+
+
+def _count_db_usage(metrics: Metrics, session: AsyncSession) -> None:
+    metrics.db_requests_total.inc()
+    if not is_connected(session):
+        metrics.db_requests_unused_total.inc()
+
+
+async def unit_of_work(
+    shard: Annotated[Shard, Depends(get_shard)],
+    user_id: Annotated[UserIdLookup, Depends(get_user_id_lookup)],
+) -> AsyncGenerator[UnitOfWork, None]:
+    uow = shard.unit_of_work.copy()
+    yield uow
+    if uow.written:
+        await _pin(shard, user_id)
+
+
+async def _pin(shard: Shard, user_id: UserIdLookup) -> None:
+    # Pins the user who wrote to the primary of the shard, the token is not resolved without replicas
+    if not shard.replicas.replicas:
+        return
+    value = await user_id()
+    if value is not None:
+        await shard.replicas.pin(value)
+
+
+async def catalog_shard(
+    request: Request, shards: Annotated[ShardRouter[Shard], Depends(shard_router_stub)]
+) -> AsyncGenerator[None, None]:
+    """Route a request writing the global tables to the catalog shard, and copy them to the other shards.
+
+    Declare it on the route, so it exits after the database session has committed.
+    """
+    request.state.shard = shards.catalog
+    yield
+    if shards.sharded:
+        await replicate_catalog(shards.catalog.maker, [i.maker for i in shards][1:])
+
+
+async def locate_shard_by_email(
+    request: Request, shards: Annotated[ShardRouter[Shard], Depends(shard_router_stub)]
+) -> None:
+    """Route an anonymous request to the shard of the user with the email of its body."""
+    if not shards.sharded:
+        return
+    email = await _get_body_email(request)
+    if email is None:
+        return
+    index = await _locate_email(shards, email)
+    if index is not None:
+        request.state.shard = shards[index]
+
+
+async def locate_shard_by_refresh_token(
+    request: Request,
+    shards: Annotated[ShardRouter[Shard], Depends(shard_router_stub)],
+    refresh_token: Annotated[UUID, Depends(get_refresh_token)],
+) -> None:
+    """Route an anonymous request to the shard of the auth session of its refresh token."""
+    if not shards.sharded:
+        return
+    index = await locate(
+        [i.read_only_maker for i in shards],
+        partial(auth_session_db.is_refresh_token_exists, refresh_token=refresh_token),
+    )
+    if index is not None:
+        request.state.shard = shards[index]
+
+
+async def new_user_id(
+    request: Request,
+    shards: Annotated[ShardRouter[Shard], Depends(shard_router_stub)],
+    maker: Annotated[sessionmaker[Any], Depends(registration_maker_stub)],
+) -> AsyncGenerator[int | None, None]:
+    """Pick the id of a user being registered, and route the request to the shard it hashes to.
+
+    None lets the database assign it: when not sharded, or when the email is taken on some shard, where the
+    registration then fails. The email stays locked on the catalog shard until the dependency exits, after
+    the user is committed, so a concurrent registration with the same email then finds it taken. The lock is
+    held by a connection of the catalog's registration pool: one of its main pool could wait on the unit of
+    work, for another connection of the pool it holds.
+    """
+    if not shards.sharded:
+        yield None
+        return
+    email = await _get_body_email(request)
+    # The catalog is probed and the id allocated on the locked session, taking no other connection
+    async with maker() as db:
+        index = None
+        if email is not None:
+            await lock_email(db, email)
+            index = await _locate_email(shards, email, db)
+        if index is not None:
+            request.state.shard = shards[index]
+            yield None
+            return
+        user_id = await allocate_user_id(db)
+        request.state.shard = shards.get(user_id)
+        yield user_id
+
+
+async def _locate_email(shards: ShardRouter[Shard], email: str, db: AsyncSession | None = None) -> int | None:
+    # Probes the catalog shard on `db` when given, instead of a connection of its own
+    probe = partial(user_db.is_email_exists, email=email)
+    makers = [i.read_only_maker for i in shards]
+    if db is None:
+        return await locate(makers, probe)
+    found, index = await asyncio.gather(probe(db), locate(makers[1:], probe))
+    if found:
+        return 0
+    return index + 1 if index is not None else None
+
+
+async def _get_body_email(request: Request) -> str | None:
+    try:
+        body = await request.json()
+    except (JSONDecodeError, UnicodeDecodeError):
+        return None
+    email = body.get("email") if isinstance(body, dict) else None
+    return email if isinstance(email, str) else None
+
+
+def deadline(seconds: float) -> Callable[..., Coroutine[Any, Any, Deadline]]:
+    """Build a dependency giving the request a latency budget of `seconds`.
+
+    Clients can only shorten it with the `X-Request-Timeout` header. The remaining budget bounds the
+    statement_timeout of the request's transactions and its Redis calls. A route-level declaration
+    overrides the one of its router, since route dependencies are resolved last.
+    """
+
+    async def dependency(
+        request: Request,
+        timeout: Annotated[float | None, Header(alias=DEADLINE_HEADER, gt=0)] = None,
+    ) -> Deadline:
+        value = Deadline.after(min(seconds, timeout) if timeout is not None else seconds)
+        request.state.deadline = value
+        current_deadline.set(value)
+        return value
+
+    return dependency
+
+
+def rate_limit(*policies: RateLimit) -> Callable[..., Coroutine[Any, Any, None]]:
+    """Build a dependency enforcing the policies that match the request's route and method.
+
+    Declare it before the other dependencies of a route (e.g. on `include_router`), so rejected requests
+    never check out a database session. Policies keyed by user fall back to the client IP for anonymous
+    requests, and for invalid tokens, which the routes requiring a user reject after it.
+    """
+
+    async def get_key(request: Request, key: RateLimitKeyType, user_id: UserIdLookup | None) -> str | None:
+        if key is RateLimitKeyType.user and user_id is not None:
+            value = await user_id()
+            if value is not None:
+                return str(value)
+        if key is RateLimitKeyType.email:
+            email = await _get_body_email(request)
+            return Encryptor.hash_text(email.lower(), digest_size=16) if email is not None else None
+        return get_client_host(request)
+
+    async def check(request: Request, limiter: RateLimiter, user_id: UserIdLookup | None) -> None:
+        route = request.scope.get("route")
+        path = getattr(route, "path", request.url.path)
+        buckets = []
+        for policy in policies:
+            if policy.matches(request.method, path):
+                value = await get_key(request, policy.key, user_id)
+                if value is not None:
+                    buckets.append((policy, value))
+
+        retry_after = await limiter.hit(buckets)
+        if retry_after > 0:
+            seconds = ceil(retry_after)
+            raise RateLimitExceededException(headers_={"Retry-After": str(seconds)}, retry_after=seconds)
+
+    if not any(policy.key is RateLimitKeyType.user for policy in policies):
+
+        async def dependency(request: Request, limiter: Annotated[RateLimiter, Depends(rate_limiter_stub)]) -> None:
+            await check(request, limiter, None)
+
+        return dependency
+
+    async def user_dependency(
+        request: Request,
+        limiter: Annotated[RateLimiter, Depends(rate_limiter_stub)],
+        user_id: Annotated[UserIdLookup, Depends(get_user_id_lookup)],
+    ) -> None:
+        await check(request, limiter, user_id)
+
+    return user_dependency
+
+
+def get_if_match(if_match: Annotated[str | None, Header()] = None) -> int | None:
+    return parse_if_match(if_match)
+
+
 ClientHostDependency = Annotated[str, Depends(get_client_host)]
 UserAgentDependency = Annotated[str, Header()]
 TokenDataDependency = Annotated[TokenRedisData, Depends(get_token_data)]
 RefreshTokenDependency = Annotated[UUID, Depends(get_refresh_token)]
-EncryptorDependency = Annotated[Encryptor, Depends(encryptor)]
+# Id of the user being registered, None when the database assigns it
+NewUserIdDependency = Annotated[int | None, Depends(new_user_id)]
+# Version from the If-Match header, None to update any version
+IfMatchDependency = Annotated[int | None, Depends(get_if_match)]
+EncryptorDependency = Annotated[Encryptor, Depends(encryptor_stub)]
+AppConfigDependency = Annotated[AppConfig, Depends(app_config_stub)]
+# READ COMMITTED session, enough for reads and single-row writes
 DatabaseDependency = Annotated[AsyncSession, Depends(db_session)]
+# READ ONLY transaction ended with a rollback on a replica, or the primary after the user's writes
+ReadOnlyDatabaseDependency = Annotated[AsyncSession, Depends(db_session_read_only)]
+# READ ONLY transaction from the analytics bulkhead pool, for heavy reporting queries
+AnalyticsDatabaseDependency = Annotated[AsyncSession, Depends(db_session_analytics)]
+# SERIALIZABLE transactions retried on serialization failures, for check-then-write invariants
+SerializableUnitOfWorkDependency = Annotated[UnitOfWork, Depends(unit_of_work)]
 RedisDependency = Annotated[AbstractRedis, Depends(redis_conn)]
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from typing import Collection
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool, Pool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from smart_fridge.core.metrics import Metrics
+from smart_fridge.core.transaction import TRANSACTION_POOLING_OPTION, get_executing_connection
+
+
+logger = logging.getLogger(__name__)
+
+# Status logged for requests whose client went away, as nginx does
+CLIENT_CLOSED_REQUEST = 499
+# Seconds to wait for the connection a cancel request is sent on
+CANCEL_CONNECT_TIMEOUT = 5
+
+# Unpooled engines sending the cancel requests, by the pool of the connections they cancel statements of
+_cancel_engines: WeakKeyDictionary[Pool, AsyncEngine] = WeakKeyDictionary()
+
+
+def _cancel_engine(engine: AsyncEngine) -> AsyncEngine:
+    """Return an engine opening a new connection per cancel request, even when the pool is exhausted."""
+    cancel_engine = _cancel_engines.get(engine.pool)
+    if cancel_engine is None:
+        cancel_engine = create_async_engine(
+            engine.url, poolclass=NullPool, connect_args={"timeout": CANCEL_CONNECT_TIMEOUT}
+        )
+        _cancel_engines[engine.pool] = cancel_engine
+    return cancel_engine
+
+
+async def cancel_running_statement(session: AsyncSession) -> bool:
+    """Ask Postgres to cancel the statement the session is running, if any.
+
+    The statement then fails with query_canceled in the task using the session, which rolls back and
+    returns its connection to the pool as after any database error. Cancelling that task instead would
+    interrupt asyncpg mid-protocol and make SQLAlchemy discard the connection.
+
+    The cancel request is sent on a connection of its own: disconnects pile up when the database is slow,
+    which is when the pool of the session is exhausted.
+    """
+    connection = get_executing_connection(session)
+    # Behind a transaction-pooling proxy the backend pid is the proxy's, and may be another client's backend
+    if connection is None or connection.get_execution_options().get(TRANSACTION_POOLING_OPTION, False):
+        return False
+    pid = connection.connection.driver_connection.get_server_pid()  # type: ignore[union-attr]
+    try:
+        async with _cancel_engine(AsyncEngine(connection.engine)).connect() as conn:
+            return bool(await conn.scalar(text("SELECT pg_cancel_backend(:pid)"), {"pid": pid}))
+    except SQLAlchemyError:
+        logger.warning("Failed to cancel the statement of backend %s", pid, exc_info=True)
+        return False
+
+
+class CancelOnDisconnectMiddleware:
+    """Stop working on a request as soon as its client disconnects.
+
+    The middleware becomes the only reader of `receive` and forwards messages to the app, so it notices
+    `http.disconnect` while the handler is still awaiting the database. A running statement is cancelled
+    in Postgres, otherwise the handler task is cancelled.
+
+    Only safe methods are cancelled by default: cancelling a write could interrupt its COMMIT and leave
+    its outcome unknown. Servers also report `http.disconnect` once the response is sent, so disconnects
+    after the response has started are forwarded to the app but cancel nothing, e.g. background tasks.
+    """
+
+    def __init__(self, app: ASGIApp, methods: Collection[str] = ("GET", "HEAD")) -> None:
+        self.app = app
+        self.methods = frozenset(methods)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+
+        # Shared with `request.state` of the handler
+        state = scope.setdefault("state", {})
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        responded = False
+
+        async def send_response(message: Message) -> None:
+            nonlocal responded
+            if message["type"] == "http.response.start":
+                responded = True
+            await send(message)
+
+        async def run() -> None:
+            await self.app(scope, messages.get, send_response)
+
+        async def watch() -> None:
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    break
+            if responded:
+                return
+
+            state["disconnected"] = True
+            session = state.get("db")
+            if session is not None and await cancel_running_statement(session):
+                metrics: Metrics | None = getattr(scope["app"].state, "metrics", None)
+                if metrics is not None:
+                    metrics.db_queries_cancelled_total.inc()
+            else:
+                handler.cancel()
+            logger.info("Client disconnected, cancelled %s %s", scope["method"], scope["path"])
+
+        handler: asyncio.Task[None] = asyncio.create_task(run())
+        watcher = asyncio.create_task(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not state.get("disconnected"):
+                raise
+        finally:
+            watcher.cancel()
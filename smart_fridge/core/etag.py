@@ -0,0 +1,29 @@
+from fastapi import Response
+
+from smart_fridge.core.exceptions.abc import PreconditionFailedException
+
+
+ETAG_HEADER = "ETag"
+
+
+def format_etag(version: int) -> str:
+    """Strong entity tag of a row version."""
+    return f'"{version}"'
+
+
+def set_etag(response: Response, version: int) -> None:
+    response.headers[ETAG_HEADER] = format_etag(version)
+
+
+def parse_if_match(value: str | None) -> int | None:
+    """Return the row version an `If-Match` header requires, None when any version matches.
+
+    Only a single strong entity tag, as returned by `format_etag`, can match: weak tags never match
+    with the strong comparison `If-Match` uses, and other servers' tags never match our versions.
+    """
+    if value is None or value.strip() == "*":
+        return None
+    tag = value.strip()
+    if len(tag) < 3 or tag[0] != '"' or tag[-1] != '"' or not tag[1:-1].isdigit():
+        raise PreconditionFailedException(detail_="If-Match does not match the current version")
+    return int(tag[1:-1])
@@ -240,12 +240,24 @@ class ConflictException(AbstractException):
     status_code = status.HTTP_409_CONFLICT
 
 
+class PreconditionFailedException(AbstractException):
+    """412 Precondition Failed."""
+
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+
+
 class UnprocessableEntityException(AbstractException):
     """422 Unprocessable Entity."""
 
     status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
+class TooManyRequestsException(AbstractException):
+    """429 Too Many Requests."""
+
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+
+
 class InternalServerErrorException(AbstractException):
     """500 Internal Server Error."""
 
@@ -1,4 +1,4 @@
-from .abc import AbstractException, ForbiddenException, NotFoundException
+from .abc import AbstractException, ForbiddenException, NotFoundException, PreconditionFailedException
 
 
 class CartProductException(AbstractException):
@@ -11,3 +11,7 @@ class CartProductNotFoundException(CartProductException, NotFoundException):
 
 class CartProductForbiddenException(CartProductException, ForbiddenException):
     detail = "cart product forbidden"
+
+
+class CartProductVersionMismatchException(CartProductException, PreconditionFailedException):
+    detail = "cart product was modified"
@@ -0,0 +1,14 @@
+from .abc import AbstractException, ServiceUnavailableException
+
+
+class DeadlineException(AbstractException):
+    """Base request deadline exception."""
+
+
+class DeadlineExceededException(DeadlineException, ServiceUnavailableException):
+    """Request deadline exceeded."""
+
+    auto_additional_info_fields = ["budget"]
+    log_exception = False
+
+    detail = "Request did not complete within its budget of {budget} seconds"
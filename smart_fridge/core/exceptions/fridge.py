@@ -1,4 +1,4 @@
-from .abc import AbstractException, ForbiddenException, NotFoundException
+from .abc import AbstractException, ForbiddenException, NotFoundException, PreconditionFailedException
 
 
 class FridgeException(AbstractException):
@@ -11,3 +11,7 @@ class FridgeNotFoundException(FridgeException, NotFoundException):
 
 class FridgeForbiddenException(FridgeException, ForbiddenException):
     detail = "fridge forbidden"
+
+
+class FridgeVersionMismatchException(FridgeException, PreconditionFailedException):
+    detail = "fridge was modified"
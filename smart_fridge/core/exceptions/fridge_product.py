@@ -1,4 +1,10 @@
-from .abc import AbstractException, ConflictException, ForbiddenException, NotFoundException
+from .abc import (
+    AbstractException,
+    ConflictException,
+    ForbiddenException,
+    NotFoundException,
+    PreconditionFailedException,
+)
 
 
 class FridgeProductException(AbstractException):
@@ -17,3 +23,7 @@ class FridgeProductlAlreadyExistsException(FridgeProductException, ConflictExcep
     auto_additional_info_fields = ["product_id"]
 
     detail = "Fridge product with product id {product_id} already exists"
+
+
+class FridgeProductVersionMismatchException(FridgeProductException, PreconditionFailedException):
+    detail = "fridge product was modified"
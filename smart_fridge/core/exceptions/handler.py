@@ -3,9 +3,13 @@ from uuid import UUID, uuid4
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import HTTPException, RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import DBAPIError
 
+from ..disconnect import CLIENT_CLOSED_REQUEST
+from ..transaction import QUERY_CANCELED_SQLSTATE
 from .abc import AbstractException
+from .deadline import DeadlineExceededException
 from .schema import ErrorSchema
 
 
@@ -43,6 +47,17 @@ async def unknown_exception_handler(request: Request, exc: Exception, id_: UUID
     )
 
 
+async def database_exception_handler(request: Request, exc: DBAPIError) -> Response:
+    if getattr(request.state, "disconnected", False):
+        # The statement was cancelled because nobody waits for the response anymore
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    # statement_timeout set from the request deadline cancelled the query
+    deadline = getattr(request.state, "deadline", None)
+    if deadline is not None and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED_SQLSTATE:
+        return await abstract_exception_handler(request, DeadlineExceededException(budget=deadline.budget))
+    return await unknown_exception_handler(request, exc)
+
+
 async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
     id_ = uuid4()
 
@@ -93,6 +108,7 @@ async def not_found_exception_handler(request: Request, exc: HTTPException) -> J
 def register_exception_handlers(app: FastAPI) -> None:
     app.add_exception_handler(AbstractException, abstract_exception_handler)  # type: ignore[arg-type]
     app.add_exception_handler(HTTPException, http_exception_handler)  # type: ignore[arg-type]
+    app.add_exception_handler(DBAPIError, database_exception_handler)  # type: ignore[arg-type]
     app.add_exception_handler(RequestValidationError, request_validation_exception_handler)  # type: ignore[arg-type]
     app.add_exception_handler(Exception, unknown_exception_handler)
     app.add_exception_handler(404, not_found_exception_handler)  # type: ignore[arg-type]
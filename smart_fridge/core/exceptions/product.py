@@ -1,4 +1,4 @@
-from .abc import AbstractException, ForbiddenException, NotFoundException
+from .abc import AbstractException, ForbiddenException, NotFoundException, PreconditionFailedException
 
 
 class ProductException(AbstractException):
@@ -11,3 +11,7 @@ class ProductNotFoundException(ProductException, NotFoundException):
 
 class ProductForbiddenException(ProductException, ForbiddenException):
     detail = "product forbidden"
+
+
+class ProductVersionMismatchException(ProductException, PreconditionFailedException):
+    detail = "product was modified"
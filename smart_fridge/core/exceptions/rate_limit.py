@@ -0,0 +1,14 @@
+from .abc import AbstractException, TooManyRequestsException
+
+
+class RateLimitException(AbstractException):
+    """Base rate limit exception."""
+
+
+class RateLimitExceededException(RateLimitException, TooManyRequestsException):
+    """Rate limit exceeded."""
+
+    auto_additional_info_fields = ["retry_after"]
+    log_exception = False
+
+    detail = "Too many requests, retry in {retry_after} seconds"
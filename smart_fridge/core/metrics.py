@@ -0,0 +1,35 @@
+from dataclasses import dataclass, field, fields
+
+
+@dataclass(slots=True)
+class Counter:
+    """Per-worker monotonically increasing counter."""
+
+    description: str
+    value: int = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+@dataclass(slots=True)
+class Metrics:
+    """Per-worker counters, exposed in the Prometheus text format."""
+
+    db_requests_total: Counter = field(
+        default_factory=lambda: Counter("Requests that declared a database session dependency")
+    )
+    db_requests_unused_total: Counter = field(
+        default_factory=lambda: Counter("Requests that completed without checking out a database connection")
+    )
+    db_queries_cancelled_total: Counter = field(
+        default_factory=lambda: Counter("Running statements cancelled because their client disconnected")
+    )
+
+    def render(self, prefix: str = "smart_fridge") -> str:
+        lines = []
+        for i in fields(self):
+            counter: Counter = getattr(self, i.name)
+            name = f"{prefix}_{i.name}"
+            lines += [f"# HELP {name} {counter.description}", f"# TYPE {name} counter", f"{name} {counter.value}"]
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from smart_fridge.core.exceptions.deadline import DeadlineExceededException
+from smart_fridge.lib.schemas.enums.rate_limit import RateLimitKeyType
+from smart_fridge.lib.schemas.enums.redis import RateLimitRedisKeyType
+
+
+logger = logging.getLogger(__name__)
+
+# Generic cell rate algorithm over any number of buckets, evaluated atomically in one call.
+# A request is admitted only if every bucket admits it, otherwise no bucket is charged.
+# ARGV holds an (emission interval, tolerance) pair per key, the result is the wait in seconds.
+_GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local retry_after = 0
+local tats = {}
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[i * 2 - 1])
+    local tolerance = tonumber(ARGV[i * 2])
+    local tat = math.max(tonumber(redis.call('GET', key)) or now, now)
+    local wait = tat - tolerance - now
+    if wait > retry_after then
+        retry_after = wait
+    end
+    tats[i] = tat + interval
+end
+if retry_after > 0 then
+    return tostring(retry_after)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(tats[i]), 'PX', math.ceil((tats[i] - now) * 1000))
+end
+return '0'
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """Allow `limit` requests per `period` seconds for each value of `key`.
+
+    `path` restricts the policy to routes whose path ends with it, `methods` to the given HTTP methods.
+    """
+
+    name: str
+    limit: int
+    period: float
+    key: RateLimitKeyType
+    path: str | None = None
+    methods: frozenset[str] | None = None
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.path is None or path.endswith(self.path)) and (self.methods is None or method in self.methods)
+
+
+class RateLimiter:
+    """GCRA rate limiter keeping its state in Redis, one script call per request."""
+
+    def __init__(self, redis: Redis, *, enabled: bool = True) -> None:
+        self.__script = redis.register_script(_GCRA_SCRIPT)
+        self.__enabled = enabled
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    async def hit(self, buckets: Sequence[tuple[RateLimit, str]]) -> float:
+        """Charge one request to every bucket.
+
+        Args:
+            buckets: Pairs of a policy and the key value the request is accounted to.
+
+        Returns:
+            float: Seconds to wait before retrying, 0 if the request is allowed. Redis errors, and Redis calls
+                running out of the request deadline, allow the request.
+        """
+        if not self.__enabled or not buckets:
+            return 0
+
+        keys: list[str] = []
+        args: list[Any] = []
+        for policy, value in buckets:
+            interval = policy.period / policy.limit
+            keys.append(RateLimitRedisKeyType.bucket.format(policy.name, value))
+            args.extend((interval, policy.period - interval))
+
+        try:
+            return float(await self.__script(keys=keys, args=args))
+        except (RedisError, DeadlineExceededException):
+            logger.warning("Rate limiter is unavailable, allowing the request", exc_info=True)
+            return 0
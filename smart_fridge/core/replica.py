@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from itertools import count
+from typing import Any, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import sessionmaker
+
+from smart_fridge.lib.schemas.enums.redis import DatabaseRedisKeyType
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaRouter:
+    """Pick the session maker of read-only transactions: a healthy replica, chosen round-robin, or the primary.
+
+    A user who has just written is pinned to the primary for `pin_seconds`, so they read their own writes
+    while the replicas catch up. The pin lives in Redis to be shared between workers.
+    """
+
+    def __init__(
+        self,
+        primary: sessionmaker[Any],
+        replicas: Sequence[sessionmaker[Any]],
+        redis: Redis,
+        *,
+        pin_seconds: float = 2,
+    ) -> None:
+        self.__primary = primary
+        self.__replicas = list(replicas)
+        self.__healthy = list(replicas)
+        self.__redis = redis
+        self.__pin_ms = int(pin_seconds * 1000)
+        self.__counter = count()
+
+    @property
+    def replicas(self) -> int:
+        return len(self.__replicas)
+
+    @property
+    def healthy(self) -> int:
+        return len(self.__healthy)
+
+    async def get(self, user_id: int | None = None) -> sessionmaker[Any]:
+        healthy = self.__healthy
+        if not healthy:
+            return self.__primary
+        if user_id is not None:
+            try:
+                if await self.__redis.exists(DatabaseRedisKeyType.primary_pin.format(user_id)):
+                    return self.__primary
+            except RedisError:
+                logger.warning("Read-your-writes pin is unavailable, reading from the primary", exc_info=True)
+                return self.__primary
+        return healthy[next(self.__counter) % len(healthy)]
+
+    async def pin(self, user_id: int) -> None:
+        if not self.__replicas:
+            return
+        try:
+            await self.__redis.set(DatabaseRedisKeyType.primary_pin.format(user_id), 1, px=self.__pin_ms)
+        except RedisError:
+            logger.warning("Failed to pin reads of user %s to the primary", user_id, exc_info=True)
+
+    async def check(self, timeout: float = 5) -> None:
+        results = await asyncio.gather(*(self.__ping(i, timeout) for i in self.__replicas))
+        healthy = [i for i, ok in zip(self.__replicas, results) if ok]
+        if len(healthy) != len(self.__healthy):
+            logger.warning("Healthy database replicas: %s of %s", len(healthy), len(self.__replicas))
+        self.__healthy = healthy
+
+    @staticmethod
+    async def __ping(maker: sessionmaker[Any], timeout: float) -> bool:
+        try:
+            async with maker() as db:
+                await asyncio.wait_for(db.execute(text("SELECT 1")), timeout)
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError):
+            logger.debug("Database replica health check failed", exc_info=True)
+            return False
+        return True
+
+
+async def monitor_replicas(router: ReplicaRouter, *, interval: float = 5) -> None:
+    """Periodically health-check the replicas of the router until cancelled."""
+    if not router.replicas:
+        return
+    while True:
+        await router.check(timeout=interval)
+        await asyncio.sleep(interval)
@@ -1,20 +1,37 @@
+import asyncio
 from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
 from hashlib import blake2b
-from typing import Any
+from typing import Any, Callable, TypeVar
 
 from cryptography.fernet import Fernet
 from jwt import decode as jwt_decode, encode as jwt_encode
 
 
+_T = TypeVar("_T")
+
+
 class Encryptor:
     """Encryptor class for handling encryption, decryption, JWT encoding/decoding, and hashing."""
 
-    def __init__(self, secret_key: str, jwt_algorithm: str, expire_minutes: int = 15, refresh_expire_days: int = 30):
+    def __init__(
+        self,
+        secret_key: str,
+        jwt_algorithm: str,
+        expire_minutes: int = 15,
+        refresh_expire_days: int = 30,
+        max_workers: int = 4,
+        fernet_cache_size: int = 128,
+    ):
         self.__secret_key = secret_key
         self.__jwt_algorithm = jwt_algorithm
         self.__expire_minutes = expire_minutes
         self.__refresh_expire_days = refresh_expire_days
+        self.__max_workers = max_workers
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__get_fernet = lru_cache(maxsize=fernet_cache_size)(self.__create_fernet)
 
     @property
     def jwt_expire_minutes(self) -> int:
@@ -25,14 +42,15 @@ class Encryptor:
         return self.__refresh_expire_days
 
     def encrypt_text(self, text: str, key: str = "") -> str:
-        return Fernet(self.__get_encryption_key(key)).encrypt(text.encode()).decode()
+        return self.__get_fernet(key).encrypt(text.encode()).decode()
 
     def decrypt_text(self, text: str, key: str = "") -> str:
-        return Fernet(self.__get_encryption_key(key)).decrypt(text).decode()
+        return self.__get_fernet(key).decrypt(text).decode()
 
-    def encode_jwt(self, data: Any, expires_in: int | None = None) -> str:
+    def encode_jwt(self, data: Any, expires_in: int | None = None, claims: dict[str, Any] | None = None) -> str:
         return jwt_encode(
             {
+                **(claims or {}),
                 "sub": str(data),
                 "exp": datetime.now(timezone.utc) + timedelta(minutes=expires_in or self.__expire_minutes),
             },
@@ -59,5 +77,22 @@ class Encryptor:
             salt=Encryptor.hash_text(password[::2], digest_size=8),
         )
 
+    async def run(self, func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+        """Run CPU-bound crypto work in the bounded thread pool instead of on the event loop.
+
+        Group several operations into one call where possible, each call costs a thread hand-off.
+        """
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="encryptor")
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, partial(func, *args, **kwargs))
+
+    def close(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+    def __create_fernet(self, key: str) -> Fernet:
+        return Fernet(self.__get_encryption_key(key))
+
     def __get_encryption_key(self, key: str) -> bytes:
         return urlsafe_b64encode(Encryptor.hash_text(f"{key}{self.__secret_key}", digest_size=16).encode())
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Any, Awaitable, Callable, Generic, Iterator, Sequence, TypeVar
+
+from sqlalchemy import Table, delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from smart_fridge.core.replica import ReplicaRouter
+from smart_fridge.core.transaction import UnitOfWork
+from smart_fridge.lib.models import ProductTypeModel
+
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Global tables, written on the catalog shard and copied to the others
+CATALOG_TABLES: Sequence[Table] = (ProductTypeModel.__table__,)  # type: ignore[assignment]
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash: going from N to N + 1 buckets only moves 1 / (N + 1) of the keys, to the new one."""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def shard_index(user_id: int, shards: int) -> int:
+    digest = blake2b(str(user_id).encode(), digest_size=8).digest()
+    return jump_hash(int.from_bytes(digest, "big"), shards)
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """Session makers of one shard's database."""
+
+    index: int
+    # READ COMMITTED on the primary
+    maker: sessionmaker[Any]
+    # READ ONLY on the primary
+    read_only_maker: sessionmaker[Any]
+    # READ ONLY on a replica of the shard, or its primary
+    replicas: ReplicaRouter
+    analytics_maker: sessionmaker[Any]
+    # SERIALIZABLE on the primary
+    unit_of_work: UnitOfWork
+
+
+class ShardRouter(Generic[_T]):
+    """Pick the shard holding a user's rows by a stable hash of the user id.
+
+    Users, their auth sessions, products, fridges, fridge products and cart products live on the shard of
+    their owner. The first shard is the catalog shard: it allocates user ids and is the source of the global
+    tables, which are copied to every shard so that foreign keys and joins stay local. With a single shard
+    every user is routed to it.
+    """
+
+    def __init__(self, shards: Sequence[_T]) -> None:
+        if not shards:
+            raise ValueError("At least one shard is required")
+        self.__shards = list(shards)
+
+    def __len__(self) -> int:
+        return len(self.__shards)
+
+    def __iter__(self) -> Iterator[_T]:
+        return iter(self.__shards)
+
+    def __getitem__(self, index: int) -> _T:
+        return self.__shards[index]
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.__shards) > 1
+
+    @property
+    def catalog(self) -> _T:
+        return self.__shards[0]
+
+    def index(self, user_id: int) -> int:
+        return shard_index(user_id, len(self.__shards))
+
+    def get(self, user_id: int | None) -> _T:
+        """Return the shard of the user, the catalog shard for anonymous requests."""
+        if user_id is None:
+            return self.catalog
+        return self.__shards[self.index(user_id)]
+
+
+async def locate(makers: Sequence[sessionmaker[Any]], probe: Callable[[AsyncSession], Awaitable[bool]]) -> int | None:
+    """Run the probe on every shard at once and return the index of the first one it matched on."""
+
+    async def run(maker: sessionmaker[Any]) -> bool:
+        async with maker() as db:
+            try:
+                return await probe(db)
+            finally:
+                await db.rollback()
+
+    results = await asyncio.gather(*(run(i) for i in makers))
+    return next((i for i, found in enumerate(results) if found), None)
+
+
+async def allocate_user_id(db: AsyncSession) -> int:
+    """Take the id of a new user from the sequence of the catalog shard, which is then unique across shards.
+
+    The user is inserted with it on the shard it hashes to.
+    """
+    return int(await db.scalar(text("SELECT nextval(pg_get_serial_sequence('users', 'id'))")))
+
+
+async def lock_email(db: AsyncSession, email: str) -> None:
+    """Serialize the registrations of an email until the transaction of the session ends.
+
+    Each shard's unique index only covers its own users, so registrations with the same email would
+    otherwise both find it free and land on different shards. Take it on the catalog shard.
+    """
+    await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(lower(:email)))"), {"email": email})
+
+
+async def replicate_catalog(source: sessionmaker[Any], targets: Sequence[sessionmaker[Any]]) -> None:
+    """Copy the global tables of the catalog shard to the other shards.
+
+    The catalog is small, so every row is upserted and rows deleted from the catalog are deleted from the
+    shards. A row still referenced on a shard stays there and is logged.
+    """
+    async with source() as db:
+        catalog = {table: (await db.execute(select(table))).mappings().all() for table in CATALOG_TABLES}
+        await db.rollback()
+
+    async def copy(maker: sessionmaker[Any]) -> None:
+        async with maker() as db:
+            for table, rows in catalog.items():
+                ids = [row["id"] for row in rows]
+                if rows:
+                    query = insert(table).values([dict(row) for row in rows])
+                    query = query.on_conflict_do_update(
+                        index_elements=[table.c.id], set_={i.name: query.excluded[i.name] for i in table.c}
+                    )
+                    await db.execute(query)
+                try:
+                    async with db.begin_nested():
+                        await db.execute(delete(table).where(table.c.id.not_in(ids)))
+                except IntegrityError:
+                    logger.warning("Rows deleted from %s are still referenced on a shard", table.name, exc_info=True)
+            await db.commit()
+
+    await asyncio.gather(*(copy(i) for i in targets))
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Concatenate, ParamSpec, TypeVar
+
+from sqlalchemy import Connection, Engine, ExceptionContext, event
+from sqlalchemy.exc import DBAPIError, InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+
+from smart_fridge.core.deadline import current_deadline
+
+
+logger = logging.getLogger(__name__)
+
+_P = ParamSpec("_P")
+_T = TypeVar("_T")
+
+# serialization_failure, deadlock_detected
+RETRYABLE_SQLSTATES = frozenset({"40001", "40P01"})
+# Raised when statement_timeout cancels a statement
+QUERY_CANCELED_SQLSTATE = "57014"
+# Engine execution option holding the statement_timeout of its pool in seconds
+STATEMENT_TIMEOUT_OPTION = "pool_statement_timeout"
+# Engine execution option set when the engine connects through a transaction-pooling proxy
+TRANSACTION_POOLING_OPTION = "transaction_pooling"
+
+
+def is_retryable(exc: DBAPIError) -> bool:
+    return getattr(exc.orig, "sqlstate", None) in RETRYABLE_SQLSTATES
+
+
+@event.listens_for(Session, "after_begin")
+def _mark_connected(session: Session, transaction: Any, connection: Connection) -> None:
+    session.info["connection"] = connection
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_deadline(session: Session, transaction: Any, connection: Connection) -> None:
+    options = connection.get_execution_options()
+    limit = options.get(STATEMENT_TIMEOUT_OPTION)
+    # Behind a transaction-pooling proxy the statement_timeout of the pool is not a setting of the session,
+    # since server connections are shared, so every transaction sets it
+    timeout = limit if options.get(TRANSACTION_POOLING_OPTION, False) else None
+    deadline = current_deadline.get()
+    if deadline is not None:
+        remaining = deadline.check()
+        # Skip the round trip when the statement_timeout of the pool is already tighter
+        if limit is None or remaining < limit:
+            timeout = remaining
+    if timeout is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(timeout * 1000), 1)}")
+
+
+def is_connected(session: AsyncSession | Session) -> bool:
+    """Whether the session has checked out a connection since it was created.
+
+    Sessions only check out a connection on their first statement, so this is False for requests that
+    returned or failed before touching the database.
+    """
+    return "connection" in session.info
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session: Session, flush_context: Any) -> None:
+    session.info["written"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_written(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["written"] = True
+
+
+def has_written(session: AsyncSession | Session) -> bool:
+    """Whether the session has flushed changes or executed an INSERT, UPDATE or DELETE since it was created."""
+    return bool(session.info.get("written", False))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _mark_executing(conn: Connection, *args: Any) -> None:
+    conn.info["executing"] = True
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _unmark_executing(conn: Connection, *args: Any) -> None:
+    conn.info["executing"] = False
+
+
+@event.listens_for(Engine, "handle_error")
+def _unmark_executing_on_error(context: ExceptionContext) -> None:
+    if context.connection is not None and not context.connection.closed:
+        context.connection.info["executing"] = False
+
+
+def get_executing_connection(session: AsyncSession | Session) -> Connection | None:
+    """Return the connection of the session while one of its statements is running.
+
+    Only reads state recorded by events, so it is safe to call from another task than the one using the session.
+    """
+    connection: Connection | None = session.info.get("connection")
+    if connection is None or connection.closed or connection.invalidated:
+        return None
+    return connection if connection.info.get("executing", False) else None
+
+
+class ReadOnlySession(Session):
+    """Session of READ ONLY transactions, refusing to flush instead of sending writes Postgres would reject."""
+
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def _refuse_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    raise InvalidRequestError("Read-only database session cannot flush pending changes")
+
+
+class UnitOfWork:
+    """Run a function in its own transaction, retrying it on serialization failures and deadlocks.
+
+    The function receives a fresh session on every attempt and must not have side effects outside
+    the database, since it may run more than once. The transaction is committed when it returns.
+    """
+
+    def __init__(self, maker: sessionmaker[Any], *, retries: int = 3, backoff: float = 0.05) -> None:
+        self.__maker = maker
+        self.__retries = retries
+        self.__backoff = backoff
+        self.__written = False
+
+    @property
+    def written(self) -> bool:
+        """Whether a transaction that wrote has been committed."""
+        return self.__written
+
+    def copy(self) -> "UnitOfWork":
+        """Return a unit of work on the same session maker, to track the writes of a single request."""
+        return UnitOfWork(self.__maker, retries=self.__retries, backoff=self.__backoff)
+
+    async def __call__(
+        self, func: Callable[Concatenate[AsyncSession, _P], Awaitable[_T]], *args: _P.args, **kwargs: _P.kwargs
+    ) -> _T:
+        attempt = 0
+        while True:
+            session: AsyncSession = self.__maker()
+            try:
+                result = await func(session, *args, **kwargs)
+                await session.commit()
+                self.__written = self.__written or has_written(session)
+                return result
+            except DBAPIError as e:
+                await session.rollback()
+                if not is_retryable(e) or attempt >= self.__retries:
+                    raise
+                # Full jitter keeps concurrent retries of the same conflict from colliding again
+                delay = random.uniform(0, self.__backoff * 2**attempt)
+                attempt += 1
+                logger.info("Retrying transaction after %s (attempt %s)", e.orig.sqlstate, attempt)  # type: ignore
+                await asyncio.sleep(delay)
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                await session.close()
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import configure_mappers, sessionmaker
+from starlette.datastructures import State
+
+from smart_fridge.core.exceptions.abc import AbstractException
+from smart_fridge.lib.db import (
+    cart_product as cart_products_db,
+    fridge as fridges_db,
+    fridge_product as fridge_products_db,
+    product as products_db,
+    product_type as product_types_db,
+    statistics as statistics_db,
+    user as user_db,
+)
+from smart_fridge.lib.schemas.fridge_product import FridgeProductFilterSchema
+from smart_fridge.lib.schemas.pagination import PaginationRequest
+from smart_fridge.lib.schemas.statistics import StatisticsFilterSchema
+
+
+logger = logging.getLogger(__name__)
+
+# Nobody has this id, the queries only need to be compiled, prepared and have their types introspected
+_NO_USER = 0
+
+# Hot read paths, run on every warmed connection since asyncpg prepares statements per connection
+WARM_UP_QUERIES: Sequence[Callable[[AsyncSession], Awaitable[Any]]] = (
+    lambda db: user_db.get_user_model_by_id(db, user_id=_NO_USER),
+    lambda db: product_types_db.get_product_types(db),
+    lambda db: fridges_db.get_fridges(db, _NO_USER),
+    lambda db: products_db.get_products(db, _NO_USER),
+    lambda db: cart_products_db.get_cart_products(db, _NO_USER),
+    lambda db: fridge_products_db.get_fridge_products(db, FridgeProductFilterSchema(), PaginationRequest(), _NO_USER),
+    lambda db: statistics_db.get_stats(
+        db,
+        _NO_USER,
+        StatisticsFilterSchema(date_from=datetime.now(timezone.utc), date_to=datetime.now(timezone.utc)),
+    ),
+)
+
+
+async def _warm_connection(maker: sessionmaker[Any]) -> None:
+    async with maker() as db:
+        for query in WARM_UP_QUERIES:
+            try:
+                await query(db)
+            except AbstractException:
+                pass
+        await db.rollback()
+
+
+async def warm_up(redis: Redis, pools: Sequence[tuple[sessionmaker[Any], int]]) -> None:
+    """Pay the first-request costs up front.
+
+    Configures the mappers, opens the Redis connection, and opens `connections` connections of every
+    read-only session maker at once. Each connection runs the hot queries, so SQLAlchemy caches their
+    compiled forms and asyncpg prepares them and introspects their types.
+    """
+    started = perf_counter()
+    configure_mappers()
+    await redis.ping()
+    await asyncio.gather(*(_warm_connection(maker) for maker, connections in pools for _ in range(connections)))
+    logger.info("Warmed up in %.0f ms", (perf_counter() - started) * 1000)
+
+
+async def warm_up_until_ready(
+    state: State, redis: Redis, pools: Sequence[tuple[sessionmaker[Any], int]], *, retry_seconds: float = 5
+) -> None:
+    """Retry the warm-up until it succeeds, then mark the app as ready."""
+    while True:
+        try:
+            await warm_up(redis, pools)
+        except (SQLAlchemyError, RedisError, OSError):
+            logger.warning("Warm-up failed, retrying in %ss", retry_seconds, exc_info=True)
+            await asyncio.sleep(retry_seconds)
+        else:
+            state.ready = True
+            return
@@ -1,4 +1,4 @@
-from secrets import compare_digest
+from typing import Any
 from uuid import UUID, uuid4
 
 from redis.asyncio import Redis
@@ -9,22 +9,6 @@ from smart_fridge.core.security import Encryptor
 from smart_fridge.lib.db import auth_session as auth_session_db, user as user_db
 from smart_fridge.lib.models import AuthSessionModel
 from smart_fridge.lib.schemas.auth import TokenCreateSchema, TokenRedisData, TokenSchema
-from smart_fridge.lib.schemas.enums.redis import AuthRedisKeyType
-
-
-def raise_user_password(password: str, password_hash: str) -> None:
-    """Raise an exception if the provided password does not match the hashed password.
-
-    Args:
-        password (str): The plain text password to check.
-        password_hash (str): The hashed password to compare against.
-
-    Raises:
-        BadAuthDataException: If the passwords do not match.
-    """
-    hashed_password = Encryptor.hash_password(password)
-    if not compare_digest(hashed_password, password_hash):
-        raise BadAuthDataException
 
 
 async def create_token(
@@ -34,6 +18,8 @@ async def create_token(
     user_ip: str,
     user_agent: str | None,
     schema: TokenCreateSchema,
+    *,
+    self_contained: bool = False,
 ) -> TokenSchema:
     """Create a new authentication token for the user.
 
@@ -44,40 +30,50 @@ async def create_token(
         user_ip (str): IP address of the user.
         user_agent (str | None): User agent string of the user.
         schema (TokenCreateSchema): Schema containing user credentials.
+        self_contained (bool): Put the session claims into the access token instead of storing them in Redis.
 
     Returns:
         TokenSchema: Contains the generated access and refresh tokens and their expiration times.
-    """
-    user_model = await user_db.get_user_model(db, email=schema.email)
-    raise_user_password(schema.password, user_model.hashed_password)
 
-    auth_session_model = await auth_session_db.create_auth_session(
+    Raises:
+        BadAuthDataException: If no user matches the email and password.
+    """
+    # The password hash is deterministic, so it is matched in the same statement that creates the session
+    hashed_password, encryption_key = await encryptor.run(_hash_credentials, schema.password)
+    auth_session_model = await auth_session_db.create_auth_session_for_credentials(
         db,
-        user_id=user_model.id,
+        email=schema.email,
+        hashed_password=hashed_password,
         user_ip=user_ip,
         user_agent=user_agent,
+        encryption_key=encryption_key,
     )
+    if auth_session_model is None:
+        raise BadAuthDataException
 
+    token_data = _get_token_data(auth_session_model)
     await _create_access_token(
         redis,
-        auth_session_model,
+        auth_session_model.user_id,
+        None if self_contained else token_data,
         access_token_id=auth_session_model.access_token,
         expires_in=encryptor.jwt_expire_minutes,
     )
 
-    return TokenSchema(
-        access_token=encryptor.encode_jwt(auth_session_model.access_token),
-        refresh_token=encryptor.encode_jwt(
-            auth_session_model.refresh_token,
-            expires_in=encryptor.jwt_refresh_expire_days,
-        ),
-        access_token_expires_in=encryptor.jwt_expire_minutes,
-        refresh_token_expires_in=encryptor.jwt_refresh_expire_days,
+    return await encryptor.run(
+        _create_token_schema, encryptor, auth_session_model, token_data if self_contained else None
     )
 
 
 async def refresh_token(
-    db: AsyncSession, redis: Redis, encryptor: Encryptor, user_ip: str, user_agent: str | None, token_id: UUID
+    db: AsyncSession,
+    redis: Redis,
+    encryptor: Encryptor,
+    user_ip: str,
+    user_agent: str | None,
+    token_id: UUID,
+    *,
+    self_contained: bool = False,
 ) -> TokenSchema:
     """Refresh the authentication token for the user.
 
@@ -88,29 +84,114 @@ async def refresh_token(
         user_ip (str): IP address of the user.
         user_agent (str | None): User agent string of the user.
         token_id (UUID): The ID of the refresh token to be refreshed.
+        self_contained (bool): Put the session claims into the access token instead of storing them in Redis.
 
     Returns:
         TokenSchema: Contains the new access and refresh tokens and their expiration times.
     """
-    auth_session_model = await auth_session_db.get_auth_session_model(
-        db,
-        refresh_token=token_id,
-        join_user=True,
+    auth_session_model, old_access_token = await auth_session_db.rotate_auth_session_tokens(
+        db, token_id, user_ip, user_agent
+    )
+    if auth_session_model.encryption_key is None:
+        # Sessions created before the key was stored fall back to deriving it from the user once
+        user_model = await user_db.get_user_model_by_id(db, user_id=auth_session_model.user_id)
+        auth_session_model.encryption_key = await encryptor.run(_get_encryption_key, user_model.hashed_password)
+        await db.flush()
+
+    token_data = _get_token_data(auth_session_model)
+    await _create_access_token(
+        redis,
+        auth_session_model.user_id,
+        None if self_contained else token_data,
+        access_token_id=auth_session_model.access_token,
+        old_access_token_id=old_access_token,
+        expires_in=encryptor.jwt_expire_minutes,
+    )
+
+    return await encryptor.run(
+        _create_token_schema, encryptor, auth_session_model, token_data if self_contained else None
     )
 
-    await redis.delete(AuthRedisKeyType.access.format(auth_session_model.access_token))
 
-    auth_session_model.user_ip = user_ip
-    auth_session_model.user_agent = user_agent
+def get_token_claims(encryptor: Encryptor, token_data: TokenRedisData) -> dict[str, Any]:
+    """Build the access token claims of a self-contained access token.
 
-    auth_session_model.access_token = await _create_access_token(
-        redis, auth_session_model, expires_in=encryptor.jwt_expire_minutes
+    Args:
+        encryptor (Encryptor): Instance of the Encryptor for encryption.
+        token_data (TokenRedisData): Session data to embed into the token.
+
+    Returns:
+        dict[str, Any]: JWT claims. The encryption key is encrypted, as JWT payloads are only signed.
+    """
+    return {
+        "sid": str(token_data.session_id),
+        "uid": token_data.user_id,
+        "ek": encryptor.encrypt_text(token_data.encryption_key),
+    }
+
+
+def parse_token_claims(encryptor: Encryptor, payload: dict[str, Any]) -> TokenRedisData | None:
+    """Restore session data from the claims of a self-contained access token.
+
+    Args:
+        encryptor (Encryptor): Instance of the Encryptor for decryption.
+        payload (dict[str, Any]): Decoded JWT payload.
+
+    Returns:
+        TokenRedisData | None: Session data, or None if the token is not self-contained.
+    """
+    if "sid" not in payload:
+        return None
+    return TokenRedisData(
+        session_id=UUID(payload["sid"]),
+        user_id=int(payload["uid"]),
+        encryption_key=encryptor.decrypt_text(payload["ek"]),
     )
-    auth_session_model.refresh_token = uuid4()
-    await db.flush()
 
+
+def _get_token_data(auth_session_model: AuthSessionModel) -> TokenRedisData:
+    """Build the session data bound to the access token.
+
+    Args:
+        auth_session_model (AuthSessionModel): The authentication session model with a stored encryption key.
+
+    Returns:
+        TokenRedisData: Session data of the access token.
+    """
+    # Set by login, and by refresh for sessions created before the column existed
+    assert auth_session_model.encryption_key is not None
+    return TokenRedisData(
+        session_id=auth_session_model.id,
+        user_id=auth_session_model.user_id,
+        encryption_key=auth_session_model.encryption_key,
+    )
+
+
+def _get_encryption_key(hashed_password: str) -> str:
+    return Encryptor.hash_password(hashed_password[-32:], digest_size=32)
+
+
+def _hash_credentials(password: str) -> tuple[str, str]:
+    hashed_password = Encryptor.hash_password(password)
+    return hashed_password, _get_encryption_key(hashed_password)
+
+
+def _create_token_schema(
+    encryptor: Encryptor, auth_session_model: AuthSessionModel, token_data: TokenRedisData | None = None
+) -> TokenSchema:
+    """Encode the access and refresh tokens of the session.
+
+    Args:
+        encryptor (Encryptor): Instance of the Encryptor for encoding.
+        auth_session_model (AuthSessionModel): The authentication session model.
+        token_data (TokenRedisData | None): Session data to embed into a self-contained access token.
+
+    Returns:
+        TokenSchema: Contains the access and refresh tokens and their expiration times.
+    """
+    claims = get_token_claims(encryptor, token_data) if token_data is not None else None
     return TokenSchema(
-        access_token=encryptor.encode_jwt(auth_session_model.access_token),
+        access_token=encryptor.encode_jwt(auth_session_model.access_token, claims=claims),
         refresh_token=encryptor.encode_jwt(
             auth_session_model.refresh_token,
             expires_in=encryptor.jwt_refresh_expire_days,
@@ -121,27 +202,34 @@ async def refresh_token(
 
 
 async def _create_access_token(
-    redis: Redis, auth_session_model: AuthSessionModel, *, access_token_id: UUID | None = None, expires_in: int = 30
+    redis: Redis,
+    user_id: int,
+    token_data: TokenRedisData | None,
+    *,
+    access_token_id: UUID | None = None,
+    old_access_token_id: UUID | None = None,
+    expires_in: int = 30,
 ) -> UUID:
-    """Create and store a new access token in Redis.
+    """Create and store a new access token in Redis and index it under its user.
 
     Args:
         redis (Redis): Redis client for token storage.
-        auth_session_model (AuthSessionModel): The authentication session model containing user information.
+        user_id (int): ID of the token owner.
+        token_data (TokenRedisData | None): Session data bound to the access token, None for self-contained tokens.
         access_token_id (UUID | None): Optional ID for the access token; generates a new one if not provided.
+        old_access_token_id (UUID | None): ID of the access token being replaced, revoked in the same transaction.
         expires_in (int): Expiration time in minutes for the access token.
 
     Returns:
         UUID: The ID of the created access token.
     """
     access_token_id = access_token_id or uuid4()
-    await redis.set(
-        AuthRedisKeyType.access.format(access_token_id),
-        TokenRedisData(
-            session_id=auth_session_model.id,
-            user_id=auth_session_model.user_id,
-            encryption_key=Encryptor.hash_password(auth_session_model.user.hashed_password[-32:], digest_size=32),
-        ).model_dump_json(),
-        ex=expires_in * 60,
+    await auth_session_db.store_access_token(
+        redis,
+        user_id,
+        access_token_id,
+        token_data,
+        old_access_token_id=old_access_token_id,
+        expires_in=expires_in,
     )
     return access_token_id
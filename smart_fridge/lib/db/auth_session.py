@@ -1,14 +1,18 @@
-from uuid import UUID
+from datetime import datetime, timezone
+from time import time
+from uuid import UUID, uuid4
 
 from redis.asyncio import Redis
-from sqlalchemy import select
+from redis.asyncio.client import Pipeline
+from sqlalchemy import DateTime, Uuid as SqlUUID, column, delete, func, insert, literal, select, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from smart_fridge.core.exceptions.auth_session import AuthSessionNotFoundException
-from smart_fridge.lib.models import AuthSessionModel
+from smart_fridge.lib.models import AuthSessionModel, UserModel
+from smart_fridge.lib.schemas.auth import TokenRedisData
 from smart_fridge.lib.schemas.auth_session import AuthSessionSchema
-from smart_fridge.lib.schemas.enums.redis import AuthRedisKeyType
+from smart_fridge.lib.schemas.enums.redis import AuthRedisChannelType, AuthRedisKeyType
 
 
 async def get_auth_session_model(
@@ -51,7 +55,9 @@ async def get_auth_session_model(
     return result
 
 
-async def create_auth_session(db: AsyncSession, user_id: int, user_ip: str, user_agent: str | None) -> AuthSessionModel:
+async def create_auth_session(
+    db: AsyncSession, user_id: int, user_ip: str, user_agent: str | None, encryption_key: str | None = None
+) -> AuthSessionModel:
     """Create a new authentication session in the database.
 
     Args:
@@ -59,6 +65,7 @@ async def create_auth_session(db: AsyncSession, user_id: int, user_ip: str, user
         user_id (int): ID of the user for whom the session is created.
         user_ip (str): IP address of the user.
         user_agent (str | None): User agent string of the user's device.
+        encryption_key (str | None): Key derived from the user's password hash.
 
     Returns:
         AuthSessionModel: The created authentication session model.
@@ -67,12 +74,116 @@ async def create_auth_session(db: AsyncSession, user_id: int, user_ip: str, user
         user_id=user_id,
         user_ip=user_ip,
         user_agent=user_agent,
+        encryption_key=encryption_key,
     )
     db.add(auth_session_model)
     await db.flush()
     return auth_session_model
 
 
+async def create_auth_session_for_credentials(
+    db: AsyncSession,
+    email: str,
+    hashed_password: str,
+    user_ip: str,
+    user_agent: str | None,
+    encryption_key: str,
+) -> AuthSessionModel | None:
+    """Create an authentication session for a user matching the credentials in a single statement.
+
+    The user is looked up by `lower(email)` among users that are not deleted, and the session is
+    inserted from that lookup with `INSERT ... SELECT ... RETURNING`.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        email (str): User email, matched case-insensitively.
+        hashed_password (str): Hash of the password provided by the user.
+        user_ip (str): IP address of the user.
+        user_agent (str | None): User agent string of the user's device.
+        encryption_key (str): Key derived from the user's password hash.
+
+    Returns:
+        AuthSessionModel | None: The created authentication session model, or None if no user matches.
+    """
+    user = (
+        select(UserModel.id)
+        .where(
+            func.lower(UserModel.email) == email.lower(),
+            UserModel.deleted_at.is_(None),
+            UserModel.hashed_password == hashed_password,
+        )
+        .order_by(UserModel.id)
+        .limit(1)
+        .cte("login_user")
+    )
+    values = {
+        "id": uuid4(),
+        "user_ip": user_ip,
+        "user_agent": user_agent,
+        "access_token": uuid4(),
+        "refresh_token": uuid4(),
+        "encryption_key": encryption_key,
+        "created_at": datetime.now(timezone.utc),
+    }
+    columns = AuthSessionModel.__table__.c
+    query = (
+        insert(AuthSessionModel)
+        .from_select(
+            ["user_id", *values],
+            select(user.c.id, *(literal(value, columns[key].type) for key, value in values.items())),
+        )
+        .returning(AuthSessionModel)
+    )
+    return (await db.execute(query)).scalar_one_or_none()
+
+
+async def rotate_auth_session_tokens(
+    db: AsyncSession, refresh_token: UUID, user_ip: str, user_agent: str | None
+) -> tuple[AuthSessionModel, UUID | None]:
+    """Issue new access and refresh tokens for a session in a single statement.
+
+    The session row is locked and updated with one `UPDATE ... RETURNING`, which also returns the
+    access token being replaced so it can be revoked.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        refresh_token (UUID): Current refresh token of the session.
+        user_ip (str): IP address of the user.
+        user_agent (str | None): User agent string of the user's device.
+
+    Returns:
+        tuple[AuthSessionModel, UUID | None]: The updated session model and its previous access token.
+
+    Raises:
+        AuthSessionNotFoundException: If no session has the given refresh token.
+    """
+    old = (
+        select(AuthSessionModel.id, AuthSessionModel.access_token)
+        .where(AuthSessionModel.refresh_token == refresh_token)
+        .with_for_update()
+        .cte("old")
+    )
+    query = (
+        update(AuthSessionModel)
+        .where(AuthSessionModel.id == old.c.id)
+        .values(
+            user_ip=user_ip,
+            user_agent=user_agent,
+            access_token=uuid4(),
+            refresh_token=uuid4(),
+            last_online=func.now(),
+        )
+        .returning(AuthSessionModel, old.c.access_token)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    result = (await db.execute(query)).one_or_none()
+
+    if result is None:
+        raise AuthSessionNotFoundException
+
+    return result[0], result[1]
+
+
 async def get_auth_session(db: AsyncSession, auth_session_id: UUID, user_id: int) -> AuthSessionSchema:
     """Retrieve an authentication session schema by its ID.
 
@@ -88,7 +199,82 @@ async def get_auth_session(db: AsyncSession, auth_session_id: UUID, user_id: int
     return AuthSessionSchema.model_construct(**auth_session_model.to_dict())
 
 
-async def delete_auth_session(db: AsyncSession, redis: Redis, session: UUID | AuthSessionModel, user_id: int) -> None:
+async def is_refresh_token_exists(db: AsyncSession, refresh_token: UUID) -> bool:
+    """Check if an authentication session has the refresh token.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        refresh_token (UUID): Refresh token to look for.
+
+    Returns:
+        bool: True if a session has it, False otherwise.
+    """
+    query = select(AuthSessionModel.id).where(AuthSessionModel.refresh_token == refresh_token)
+    return (await db.execute(query)).scalar_one_or_none() is not None
+
+
+async def update_last_online(db: AsyncSession, activity: dict[UUID, datetime]) -> None:
+    """Write buffered last activity timestamps of sessions with one batched `UPDATE ... FROM (VALUES ...)`.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        activity (dict[UUID, datetime]): Last activity per session ID.
+    """
+    if not activity:
+        return
+
+    batch = (
+        values(
+            column("id", SqlUUID(native_uuid=True, as_uuid=True)),
+            column("last_online", DateTime(timezone=True)),
+            name="activity",
+        )
+        .data(list(activity.items()))
+        .alias("activity")
+    )
+    query = (
+        update(AuthSessionModel)
+        .where(AuthSessionModel.id == batch.c.id, AuthSessionModel.last_online < batch.c.last_online)
+        .values(last_online=batch.c.last_online)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(query)
+
+
+async def delete_expired_auth_sessions(db: AsyncSession, expired_before: datetime, *, limit: int = 1000) -> int:
+    """Delete a bounded batch of sessions that were last used before the given time.
+
+    A session cannot have been refreshed after its last activity, so the refresh token of such a
+    session has expired. `created_at` never exceeds `last_online`, which lets the index on
+    `created_at` narrow the candidates.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        expired_before (datetime): Sessions last used before this time are deleted.
+        limit (int): Maximum number of sessions deleted in one call.
+
+    Returns:
+        int: Number of deleted sessions.
+    """
+    expired = (
+        select(AuthSessionModel.id)
+        .where(AuthSessionModel.created_at < expired_before, AuthSessionModel.last_online < expired_before)
+        .order_by(AuthSessionModel.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    query = (
+        delete(AuthSessionModel)
+        .where(AuthSessionModel.id.in_(expired.scalar_subquery()))
+        .returning(AuthSessionModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    return len((await db.execute(query)).all())
+
+
+async def delete_auth_session(
+    db: AsyncSession, redis: Redis, session: UUID | AuthSessionModel, user_id: int, *, expires_in: int = 30
+) -> None:
     """Delete an authentication session from the database and Redis.
 
     Args:
@@ -96,6 +282,7 @@ async def delete_auth_session(db: AsyncSession, redis: Redis, session: UUID | Au
         redis (Redis): Redis client for session management.
         session (UUID | AuthSessionModel): The session ID or the session model to delete.
         user_id (int): ID of the user associated with the session.
+        expires_in (int): Access token lifetime in minutes, for how long the token has to stay revoked.
 
     Raises:
         AuthSessionNotFoundException: If the session cannot be found.
@@ -105,6 +292,110 @@ async def delete_auth_session(db: AsyncSession, redis: Redis, session: UUID | Au
         if isinstance(session, AuthSessionModel)
         else (await get_auth_session_model(db, session_id=session, user_id=user_id))
     )
-    await redis.delete(AuthRedisKeyType.access.format(auth_session_model.access_token))
+    await invalidate_access_token(
+        redis, auth_session_model.access_token, user_id=auth_session_model.user_id, expires_in=expires_in
+    )
     await db.delete(auth_session_model)
     await db.flush()
+
+
+async def delete_user_auth_sessions(db: AsyncSession, redis: Redis, user_id: int, *, expires_in: int = 30) -> int:
+    """Delete every authentication session of a user and revoke all their access tokens.
+
+    The sessions are removed with a single `DELETE ... RETURNING`, and the access keys listed in the
+    user's Redis index are unlinked and revoked in one pipeline, without scanning the keyspace.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        redis (Redis): Redis client for session management.
+        user_id (int): ID of the user whose sessions are deleted.
+        expires_in (int): Access token lifetime in minutes, for how long the tokens have to stay revoked.
+
+    Returns:
+        int: Number of deleted sessions.
+    """
+    query = delete(AuthSessionModel).where(AuthSessionModel.user_id == user_id).returning(AuthSessionModel.access_token)
+    deleted = (await db.execute(query)).scalars().all()
+
+    index_key = AuthRedisKeyType.user_access.format(user_id)
+    indexed = await redis.smembers(index_key)  # type: ignore[misc]
+    access_token_ids = {str(i) for i in deleted if i is not None} | {
+        i.decode() if isinstance(i, bytes) else i for i in indexed
+    }
+
+    now = time()
+    async with redis.pipeline(transaction=False) as pipe:
+        if access_token_ids:
+            pipe.unlink(*(AuthRedisKeyType.access.format(i) for i in access_token_ids), index_key)
+            pipe.zadd(AuthRedisKeyType.revoked.value, dict.fromkeys(access_token_ids, now + expires_in * 60))
+            pipe.zremrangebyscore(AuthRedisKeyType.revoked.value, "-inf", now)
+            for access_token_id in access_token_ids:
+                pipe.publish(AuthRedisChannelType.invalidate.value, access_token_id)
+        else:
+            pipe.unlink(index_key)
+        await pipe.execute()
+
+    return len(deleted)
+
+
+async def invalidate_access_token(
+    redis: Redis, access_token_id: UUID | None, *, user_id: int | None = None, expires_in: int = 30
+) -> None:
+    """Revoke an access token and evict it from every worker's token cache.
+
+    The Redis session key is deleted and the token id is added to the revocation set until it would have
+    expired, so self-contained access tokens are rejected as well.
+
+    Args:
+        redis (Redis): Redis client for session management.
+        access_token_id (UUID | None): ID of the access token to invalidate.
+        user_id (int | None): ID of the token owner, to drop the token from their access key index.
+        expires_in (int): Access token lifetime in minutes.
+    """
+    if access_token_id is None:
+        return
+
+    async with redis.pipeline(transaction=False) as pipe:
+        _revoke_access_token(pipe, access_token_id, user_id, expires_in)
+        await pipe.execute()
+
+
+async def store_access_token(
+    redis: Redis,
+    user_id: int,
+    access_token_id: UUID,
+    token_data: TokenRedisData | None,
+    *,
+    old_access_token_id: UUID | None = None,
+    expires_in: int = 30,
+) -> None:
+    """Store an access token and add it to the user's access key index in a single MULTI/EXEC round trip.
+
+    Args:
+        redis (Redis): Redis client for session management.
+        user_id (int): ID of the token owner.
+        access_token_id (UUID): ID of the new access token.
+        token_data (TokenRedisData | None): Session data of the new token, None for self-contained tokens.
+        old_access_token_id (UUID | None): ID of the access token being replaced, revoked atomically.
+        expires_in (int): Access token lifetime in minutes.
+    """
+    index_key = AuthRedisKeyType.user_access.format(user_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        if old_access_token_id is not None:
+            _revoke_access_token(pipe, old_access_token_id, user_id, expires_in)
+        if token_data is not None:
+            pipe.set(AuthRedisKeyType.access.format(access_token_id), token_data.encode(), ex=expires_in * 60)
+        # The index outlives its newest token, stale members are harmless and go away with it
+        pipe.sadd(index_key, str(access_token_id))
+        pipe.expire(index_key, expires_in * 60)
+        await pipe.execute()
+
+
+def _revoke_access_token(pipe: Pipeline, access_token_id: UUID, user_id: int | None, expires_in: int) -> None:
+    now = time()
+    pipe.delete(AuthRedisKeyType.access.format(access_token_id))
+    if user_id is not None:
+        pipe.srem(AuthRedisKeyType.user_access.format(user_id), str(access_token_id))
+    pipe.zadd(AuthRedisKeyType.revoked.value, {str(access_token_id): now + expires_in * 60})
+    pipe.zremrangebyscore(AuthRedisKeyType.revoked.value, "-inf", now)
+    pipe.publish(AuthRedisChannelType.invalidate.value, str(access_token_id))
@@ -1,10 +1,14 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from smart_fridge.core.exceptions.cart_product import CartProductForbiddenException, CartProductNotFoundException
+from smart_fridge.core.exceptions.cart_product import (
+    CartProductForbiddenException,
+    CartProductNotFoundException,
+    CartProductVersionMismatchException,
+)
 from smart_fridge.lib.models import CartProductModel
 from smart_fridge.lib.schemas.cart_product import (
     CartProductCreateSchema,
@@ -28,6 +32,27 @@ def _raise_for_user_access(cart_product_model: CartProductModel, user_id: int) -
         raise CartProductForbiddenException
 
 
+async def _raise_for_unmatched(db: AsyncSession, cart_product_id: int, user_id: int) -> None:
+    """Raise the reason an ownership-scoped update or delete of the cart product matched no row.
+
+    Returns when the user owns the cart product, for updates to raise a version mismatch.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        cart_product_id (int): The ID of the cart product the statement was scoped to.
+        user_id (int): The ID of the user the statement was scoped to.
+
+    Raises:
+        CartProductNotFoundException: If the cart product does not exist.
+        CartProductForbiddenException: If the user does not own the cart product.
+    """
+    owner_id = await db.scalar(select(CartProductModel.owner_id).where(CartProductModel.id == cart_product_id))
+    if owner_id is None:
+        raise CartProductNotFoundException
+    if not owner_id == user_id:
+        raise CartProductForbiddenException
+
+
 async def create_cart_product(db: AsyncSession, user_id: int, schema: CartProductCreateSchema) -> CartProductSchema:
     """Create a new cart product for the user.
 
@@ -111,7 +136,11 @@ async def get_cart_product_model(
 
 
 async def update_cart_product(
-    db: AsyncSession, cart_product_id: int, schema: CartProductUpdateSchema | CartProductPatchSchema, user_id: int
+    db: AsyncSession,
+    cart_product_id: int,
+    schema: CartProductUpdateSchema | CartProductPatchSchema,
+    user_id: int,
+    version: int | None = None,
 ) -> CartProductSchema:
     """Update an existing cart product.
 
@@ -120,20 +149,28 @@ async def update_cart_product(
         cart_product_id (int): The ID of the cart product to update.
         schema (CartProductUpdateSchema | CartProductPatchSchema): The schema containing updated cart product data.
         user_id (int): The ID of the user.
+        version (int | None): The version the client has seen, None to update any version.
 
     Returns:
         CartProductSchema: The updated cart product schema.
 
     Raises:
+        CartProductNotFoundException: If the cart product does not exist.
         CartProductForbiddenException: If the user does not own the cart product.
+        CartProductVersionMismatchException: If the cart product was updated since the client has seen it.
     """
-    cart_product_model = await get_cart_product_model(db, cart_product_id=cart_product_id)
-    _raise_for_user_access(cart_product_model, user_id)
-
-    for field, value in schema.iterate_set_fields():
-        setattr(cart_product_model, field, value)
-
-    await db.flush()
+    query = (
+        update(CartProductModel)
+        .where(CartProductModel.id == cart_product_id, CartProductModel.owner_id == user_id)
+        .values(**dict(schema.iterate_set_fields()), version=CartProductModel.version + 1)
+        .returning(CartProductModel)
+    )
+    if version is not None:
+        query = query.where(CartProductModel.version == version)
+    cart_product_model = (await db.execute(query)).scalar_one_or_none()
+    if cart_product_model is None:
+        await _raise_for_unmatched(db, cart_product_id, user_id)
+        raise CartProductVersionMismatchException
     return CartProductSchema.model_construct(**cart_product_model.to_dict())
 
 
@@ -146,9 +183,14 @@ async def delete_cart_product(db: AsyncSession, cart_product_id: int, user_id: i
         user_id (int): The ID of the user.
 
     Raises:
+        CartProductNotFoundException: If the cart product does not exist.
         CartProductForbiddenException: If the user does not own the cart product.
     """
-    cart_product_model = await get_cart_product_model(db, cart_product_id)
-    _raise_for_user_access(cart_product_model, user_id)
-    cart_product_model.deleted_at = datetime.now(timezone.utc)
-    await db.flush()
+    query = (
+        update(CartProductModel)
+        .where(CartProductModel.id == cart_product_id, CartProductModel.owner_id == user_id)
+        .values(deleted_at=datetime.now(timezone.utc))
+        .returning(CartProductModel.id)
+    )
+    if (await db.execute(query)).scalar_one_or_none() is None:
+        await _raise_for_unmatched(db, cart_product_id, user_id)
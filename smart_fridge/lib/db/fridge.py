@@ -1,8 +1,12 @@
-from sqlalchemy import select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from smart_fridge.core.exceptions.fridge import FridgeForbiddenException, FridgeNotFoundException
+from smart_fridge.core.exceptions.fridge import (
+    FridgeForbiddenException,
+    FridgeNotFoundException,
+    FridgeVersionMismatchException,
+)
 from smart_fridge.lib.models import FridgeModel
 from smart_fridge.lib.schemas.fridge import FridgeCreateSchema, FridgePatchSchema, FridgeSchema, FridgeUpdateSchema
 
@@ -21,6 +25,27 @@ def _raise_for_user_access(fridge_model: FridgeModel, user_id: int) -> None:
         raise FridgeForbiddenException
 
 
+async def _raise_for_unmatched(db: AsyncSession, fridge_id: int, user_id: int) -> None:
+    """Raise the reason an ownership-scoped update or delete of the fridge matched no row.
+
+    Returns when the user owns the fridge, for updates to raise a version mismatch.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        fridge_id (int): The ID of the fridge the statement was scoped to.
+        user_id (int): The ID of the user the statement was scoped to.
+
+    Raises:
+        FridgeNotFoundException: If the fridge does not exist.
+        FridgeForbiddenException: If the user does not own the fridge.
+    """
+    owner_id = await db.scalar(select(FridgeModel.owner_id).where(FridgeModel.id == fridge_id))
+    if owner_id is None:
+        raise FridgeNotFoundException
+    if not owner_id == user_id:
+        raise FridgeForbiddenException
+
+
 async def create_fridge(db: AsyncSession, user_id: int, schema: FridgeCreateSchema) -> FridgeSchema:
     """Create a new fridge for the specified user.
 
@@ -75,7 +100,11 @@ async def get_fridge(db: AsyncSession, fridge_id: int, user_id: int) -> FridgeSc
 
 
 async def update_fridge(
-    db: AsyncSession, fridge_id: int, schema: FridgeUpdateSchema | FridgePatchSchema, user_id: int
+    db: AsyncSession,
+    fridge_id: int,
+    schema: FridgeUpdateSchema | FridgePatchSchema,
+    user_id: int,
+    version: int | None = None,
 ) -> FridgeSchema:
     """Update an existing fridge with new data.
 
@@ -84,20 +113,28 @@ async def update_fridge(
         fridge_id (int): The ID of the fridge to update.
         schema (FridgeUpdateSchema | FridgePatchSchema): The schema containing updated fridge data.
         user_id (int): The ID of the user updating the fridge.
+        version (int | None): The version the client has seen, None to update any version.
 
     Returns:
         FridgeSchema: The updated fridge schema.
 
     Raises:
+        FridgeNotFoundException: If the fridge does not exist.
         FridgeForbiddenException: If the user does not own the fridge.
+        FridgeVersionMismatchException: If the fridge was updated since the client has seen it.
     """
-    fridge_model = await get_fridge_model(db, fridge_id=fridge_id)
-    _raise_for_user_access(fridge_model, user_id)
-
-    for field, value in schema.iterate_set_fields():
-        setattr(fridge_model, field, value)
-
-    await db.flush()
+    query = (
+        update(FridgeModel)
+        .where(FridgeModel.id == fridge_id, FridgeModel.owner_id == user_id)
+        .values(**dict(schema.iterate_set_fields()), version=FridgeModel.version + 1)
+        .returning(FridgeModel)
+    )
+    if version is not None:
+        query = query.where(FridgeModel.version == version)
+    fridge_model = (await db.execute(query)).scalar_one_or_none()
+    if fridge_model is None:
+        await _raise_for_unmatched(db, fridge_id, user_id)
+        raise FridgeVersionMismatchException
     return FridgeSchema.model_construct(**fridge_model.to_dict())
 
 
@@ -110,12 +147,17 @@ async def delete_fridge(db: AsyncSession, fridge_id: int, user_id: int) -> None:
         user_id (int): The ID of the user requesting the deletion.
 
     Raises:
+        FridgeNotFoundException: If the fridge does not exist.
         FridgeForbiddenException: If the user does not own the fridge.
     """
-    fridge_model = await get_fridge_model(db, fridge_id)
-    _raise_for_user_access(fridge_model, user_id)
-    await db.delete(fridge_model)
-    await db.flush()
+    # The fridge products of the fridge are deleted by the database, through ON DELETE CASCADE
+    query = (
+        delete(FridgeModel)
+        .where(FridgeModel.id == fridge_id, FridgeModel.owner_id == user_id)
+        .returning(FridgeModel.id)
+    )
+    if (await db.execute(query)).scalar_one_or_none() is None:
+        await _raise_for_unmatched(db, fridge_id, user_id)
 
 
 async def get_fridge_model(db: AsyncSession, fridge_id: int, join_products: bool = False) -> FridgeModel:
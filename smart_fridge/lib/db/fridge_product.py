@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import func, select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload, selectinload
 
@@ -8,6 +8,7 @@ from smart_fridge.core.exceptions.fridge_product import (
     FridgeProductForbiddenException,
     FridgeProductlAlreadyExistsException,
     FridgeProductNotFoundException,
+    FridgeProductVersionMismatchException,
 )
 from smart_fridge.lib.models import FridgeProductModel
 from smart_fridge.lib.models.product import ProductModel
@@ -82,7 +83,12 @@ async def get_fridge_products(
         FridgeProductModel.deleted_at.is_(None),
     )
 
-    subquery = select(FridgeProductModel.id).where(*query_filter).group_by(FridgeProductModel.id)
+    subquery = (
+        select(FridgeProductModel.id)
+        .join(ProductModel, ProductModel.id == FridgeProductModel.product_id)
+        .where(*query_filter)
+        .group_by(FridgeProductModel.id)
+    )
     query = (
         select(FridgeProductModel)
         .options(
@@ -105,7 +111,11 @@ async def get_fridge_products(
 
 
 async def update_fridge_product(
-    db: AsyncSession, fridge_product_id: int, schema: FridgeProductUpdateSchema | FridgeProductPatchSchema, user_id: int
+    db: AsyncSession,
+    fridge_product_id: int,
+    schema: FridgeProductUpdateSchema | FridgeProductPatchSchema,
+    user_id: int,
+    version: int | None = None,
 ) -> FridgeProductSchema:
     """Update an existing fridge product for a given user.
 
@@ -114,17 +124,32 @@ async def update_fridge_product(
         fridge_product_id (int): ID of the fridge product to update.
         schema (FridgeProductUpdateSchema | FridgeProductPatchSchema): Schema containing updated product details.
         user_id (int): ID of the user requesting the update.
+        version (int | None): The version the client has seen, None to update any version.
 
     Returns:
         FridgeProductSchema: The updated fridge product schema.
-    """
-    fridge_product_model = await get_fridge_product_model(db, fridge_product_id=fridge_product_id)
-    _raise_for_user_access(fridge_product_model, user_id)
-
-    for field, value in schema.iterate_set_fields():
-        setattr(fridge_product_model, field, value)
 
-    await db.flush()
+    Raises:
+        FridgeProductNotFoundException: If the fridge product does not exist.
+        FridgeProductForbiddenException: If the user does not own the product of the fridge product.
+        FridgeProductVersionMismatchException: If the fridge product was updated since the client has seen it.
+    """
+    query = (
+        update(FridgeProductModel)
+        .where(
+            FridgeProductModel.id == fridge_product_id,
+            FridgeProductModel.product_id == ProductModel.id,
+            ProductModel.owner_id == user_id,
+        )
+        .values(**dict(schema.iterate_set_fields()), version=FridgeProductModel.version + 1)
+        .returning(FridgeProductModel)
+    )
+    if version is not None:
+        query = query.where(FridgeProductModel.version == version)
+    fridge_product_model = (await db.execute(query)).scalar_one_or_none()
+    if fridge_product_model is None:
+        await _raise_for_unmatched(db, fridge_product_id, user_id)
+        raise FridgeProductVersionMismatchException
     return FridgeProductSchema.model_construct(**fridge_product_model.to_dict())
 
 
@@ -135,11 +160,23 @@ async def delete_fridge_product(db: AsyncSession, fridge_product_id: int, user_i
         db (AsyncSession): Async SQLAlchemy session.
         fridge_product_id (int): ID of the fridge product to delete.
         user_id (int): ID of the user requesting the deletion.
+
+    Raises:
+        FridgeProductNotFoundException: If the fridge product does not exist.
+        FridgeProductForbiddenException: If the user does not own the product of the fridge product.
     """
-    fridge_product_model = await get_fridge_product_model(db, fridge_product_id, join_product=True)
-    _raise_for_user_access(fridge_product_model, user_id)
-    fridge_product_model.deleted_at = datetime.now(timezone.utc)
-    await db.flush()
+    query = (
+        update(FridgeProductModel)
+        .where(
+            FridgeProductModel.id == fridge_product_id,
+            FridgeProductModel.product_id == ProductModel.id,
+            ProductModel.owner_id == user_id,
+        )
+        .values(deleted_at=datetime.now(timezone.utc))
+        .returning(FridgeProductModel.id)
+    )
+    if (await db.execute(query)).scalar_one_or_none() is None:
+        await _raise_for_unmatched(db, fridge_product_id, user_id)
 
 
 async def get_fridge_product_model(
@@ -212,3 +249,29 @@ def _raise_for_user_access(fridge_product_model: FridgeProductModel, user_id: in
     """
     if not fridge_product_model.product.owner_id == user_id:
         raise FridgeProductForbiddenException
+
+
+async def _raise_for_unmatched(db: AsyncSession, fridge_product_id: int, user_id: int) -> None:
+    """Raise the reason an ownership-scoped update or delete of the fridge product matched no row.
+
+    Returns when the user owns the fridge product, for updates to raise a version mismatch.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        fridge_product_id (int): ID of the fridge product the statement was scoped to.
+        user_id (int): ID of the user the statement was scoped to.
+
+    Raises:
+        FridgeProductNotFoundException: If the fridge product does not exist.
+        FridgeProductForbiddenException: If the user does not own the product of the fridge product.
+    """
+    query = (
+        select(ProductModel.owner_id)
+        .join(FridgeProductModel, FridgeProductModel.product_id == ProductModel.id)
+        .where(FridgeProductModel.id == fridge_product_id)
+    )
+    owner_id = await db.scalar(query)
+    if owner_id is None:
+        raise FridgeProductNotFoundException
+    if not owner_id == user_id:
+        raise FridgeProductForbiddenException
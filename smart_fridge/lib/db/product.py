@@ -1,9 +1,13 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from smart_fridge.core.exceptions.product import ProductForbiddenException, ProductNotFoundException
+from smart_fridge.core.exceptions.product import (
+    ProductForbiddenException,
+    ProductNotFoundException,
+    ProductVersionMismatchException,
+)
 from smart_fridge.lib.models import ProductModel
 from smart_fridge.lib.schemas.product import ProductCreateSchema, ProductPatchSchema, ProductSchema, ProductUpdateSchema
 
@@ -19,6 +23,28 @@ def _raise_for_user_access(product_model: ProductModel, user_id: int) -> None:
         raise ProductForbiddenException
 
 
+async def _raise_for_unmatched(db: AsyncSession, product_id: int, user_id: int) -> None:
+    """Raise the reason an ownership-scoped update or delete of the product matched no row.
+
+    Only run when the statement matched nothing, so that successful ones take a single round trip. Returns
+    when the user owns the product, for updates to raise a version mismatch.
+
+    Args:
+        db (AsyncSession): Async SQLAlchemy session.
+        product_id (int): The ID of the product the statement was scoped to.
+        user_id (int): The ID of the user the statement was scoped to.
+
+    Raises:
+        ProductNotFoundException: If the product does not exist.
+        ProductForbiddenException: If the user does not own the product.
+    """
+    owner_id = await db.scalar(select(ProductModel.owner_id).where(ProductModel.id == product_id))
+    if owner_id is None:
+        raise ProductNotFoundException
+    if not owner_id == user_id:
+        raise ProductForbiddenException
+
+
 async def create_product(db: AsyncSession, user_id: int, schema: ProductCreateSchema) -> ProductSchema:
     """Create a new product in the database.
 
@@ -70,7 +96,11 @@ async def get_product(db: AsyncSession, product_id: int, user_id: int) -> Produc
 
 
 async def update_product(
-    db: AsyncSession, product_id: int, schema: ProductUpdateSchema | ProductPatchSchema, user_id: int
+    db: AsyncSession,
+    product_id: int,
+    schema: ProductUpdateSchema | ProductPatchSchema,
+    user_id: int,
+    version: int | None = None,
 ) -> ProductSchema:
     """Update an existing product with new data.
 
@@ -79,17 +109,28 @@ async def update_product(
         product_id (int): The ID of the product to update.
         schema (ProductUpdateSchema | ProductPatchSchema): The schema containing updated product data.
         user_id (int): The ID of the user updating the product.
+        version (int | None): The version the client has seen, None to update any version.
 
     Returns:
         ProductSchema: The updated product schema.
-    """
-    product_model = await get_product_model(db, product_id=product_id)
-    _raise_for_user_access(product_model, user_id)
 
-    for field, value in schema.iterate_set_fields():
-        setattr(product_model, field, value)
-
-    await db.flush()
+    Raises:
+        ProductNotFoundException: If the product does not exist.
+        ProductForbiddenException: If the user does not own the product.
+        ProductVersionMismatchException: If the product was updated since the client has seen it.
+    """
+    query = (
+        update(ProductModel)
+        .where(ProductModel.id == product_id, ProductModel.owner_id == user_id)
+        .values(**dict(schema.iterate_set_fields()), version=ProductModel.version + 1)
+        .returning(ProductModel)
+    )
+    if version is not None:
+        query = query.where(ProductModel.version == version)
+    product_model = (await db.execute(query)).scalar_one_or_none()
+    if product_model is None:
+        await _raise_for_unmatched(db, product_id, user_id)
+        raise ProductVersionMismatchException
     return ProductSchema.model_construct(**product_model.to_dict())
 
 
@@ -130,11 +171,19 @@ async def delete_product(db: AsyncSession, product_id: int, user_id: int) -> Non
         db (AsyncSession): Async SQLAlchemy session.
         product_id (int): The ID of the product to delete.
         user_id (int): The ID of the user requesting the deletion.
+
+    Raises:
+        ProductNotFoundException: If the product does not exist.
+        ProductForbiddenException: If the user does not own the product.
     """
-    product_model = await get_product_model(db, product_id)
-    _raise_for_user_access(product_model, user_id)
-    await db.delete(product_model)
-    await db.flush()
+    # The fridge product of the product is deleted by the database, through ON DELETE CASCADE
+    query = (
+        delete(ProductModel)
+        .where(ProductModel.id == product_id, ProductModel.owner_id == user_id)
+        .returning(ProductModel.id)
+    )
+    if (await db.execute(query)).scalar_one_or_none() is None:
+        await _raise_for_unmatched(db, product_id, user_id)
 
 
 async def get_product_model(db: AsyncSession, product_id: int) -> ProductModel:
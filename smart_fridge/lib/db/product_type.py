@@ -1,4 +1,4 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from smart_fridge.core.exceptions.product_type import ProductTypeNotFoundException
@@ -69,13 +69,23 @@ async def update_product_type(
 
     Returns:
         ProductTypeSchema: The updated product type.
-    """
-    product_type_model = await get_product_type_model(db, product_type_id=product_type_id)
 
-    for field, value in schema.iterate_set_fields():
-        setattr(product_type_model, field, value)
-
-    await db.flush()
+    Raises:
+        ProductTypeNotFoundException: If the product type with the given ID does not exist.
+    """
+    values = dict(schema.iterate_set_fields())
+    if not values:
+        return await get_product_type(db, product_type_id)
+
+    query = (
+        update(ProductTypeModel)
+        .where(ProductTypeModel.id == product_type_id)
+        .values(**values)
+        .returning(ProductTypeModel)
+    )
+    product_type_model = (await db.execute(query)).scalar_one_or_none()
+    if product_type_model is None:
+        raise ProductTypeNotFoundException
     return ProductTypeSchema.model_construct(**product_type_model.to_dict())
 
 
@@ -1,11 +1,13 @@
 from datetime import datetime, timezone
 from typing import AsyncGenerator, Sequence
 
+from redis.asyncio import Redis
 from sqlalchemy import asc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from smart_fridge.core.exceptions.user import UserEmailAlreadyExistsException, UserNotFoundException
 from smart_fridge.core.security import Encryptor
+from smart_fridge.lib.db import auth_session as auth_session_db
 from smart_fridge.lib.models import UserModel
 from smart_fridge.lib.models.fridge_product import FridgeProductModel
 from smart_fridge.lib.models.product import ProductModel
@@ -41,23 +43,29 @@ async def raise_for_user_email(db: AsyncSession, email: str) -> None:
         raise UserEmailAlreadyExistsException(email=email)
 
 
-async def create_user(db: AsyncSession, *, schema: UserCreateSchema) -> UserSchema:
+async def create_user(
+    db: AsyncSession, encryptor: Encryptor, *, schema: UserCreateSchema, user_id: int | None = None
+) -> UserSchema:
     """Create a new user in the database.
 
     Args:
         db (AsyncSession): Async SQLAlchemy session.
+        encryptor (Encryptor): Encryptor whose thread pool hashes the password.
         schema (UserCreateSchema): User creation schema containing user data.
+        user_id (int | None): ID allocated on the catalog shard, None to let the database assign it.
 
     Returns:
         UserSchema: The created user schema.
     """
     await raise_for_user_email(db, schema.email)
 
-    hashed_password = Encryptor.hash_password(schema.password)
+    hashed_password = await encryptor.run(Encryptor.hash_password, schema.password)
     user_model = UserModel(
         **schema.model_dump(exclude={"password"}),
         hashed_password=hashed_password,
     )
+    if user_id is not None:
+        user_model.id = user_id
     db.add(user_model)
     await db.flush()
     return UserSchema.model_construct(**user_model.to_dict())
@@ -140,17 +148,20 @@ async def update_user(db: AsyncSession, *, user_id: int, schema: UserUpdateSchem
     return UserSchema.model_construct(**user_model.to_dict())
 
 
-async def delete_user(db: AsyncSession, *, user_id: int) -> None:
-    """Delete a user by marking them as deleted.
+async def delete_user(db: AsyncSession, redis: Redis, *, user_id: int, expires_in: int = 30) -> None:
+    """Delete a user by marking them as deleted and revoke all their sessions.
 
     Args:
         db (AsyncSession): Async SQLAlchemy session.
+        redis (Redis): Redis client for session management.
         user_id (int): User ID to delete.
+        expires_in (int): Access token lifetime in minutes, for how long the tokens have to stay revoked.
     """
     user_model = await get_user_model_by_id(db, user_id=user_id)
     user_model.deleted_at = datetime.now(timezone.utc)
 
     await db.flush()
+    await auth_session_db.delete_user_auth_sessions(db, redis, user_id, expires_in=expires_in)
 
 
 async def get_expiry_users(db: AsyncSession) -> Sequence[tuple[UserModel, int]]:
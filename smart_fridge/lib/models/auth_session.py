@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 from uuid import UUID as PyUUID, uuid4
 
-from sqlalchemy import DateTime, ForeignKey, String, Uuid as SqlUUID
+from sqlalchemy import DateTime, ForeignKey, String, Uuid as SqlUUID, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .abc import AbstractModel
@@ -23,7 +23,7 @@ class AuthSessionModel(AbstractModel):
         id (Mapped[PyUUID]): Unique identifier for the authentication session, 
             automatically generated as a UUID and serves as the primary key.
         user_id (Mapped[int]): Foreign key referencing the user's ID in the 'users' table, 
-            indicating which user this authentication session belongs to. This field is mandatory.
+            indicating which user this authentication session belongs to. This field is mandatory and indexed.
         user_ip (Mapped[str]): IP address of the user during the authentication session, 
             stored as a string. This field is mandatory.
         user_agent (Mapped[str | None]): User agent string from the user's device, 
@@ -35,8 +35,14 @@ class AuthSessionModel(AbstractModel):
         refresh_token (Mapped[PyUUID | None]): Refresh token for the session, 
             used to obtain new access tokens without requiring the user to log in again. 
             This field is optional and can be null, allowing for sessions without a refresh token.
+            It is unique and indexed.
+        encryption_key (Mapped[str | None]): Key derived from the user's password hash, stored so that
+            refreshing the session does not need to join the user. This field is optional and is null
+            for sessions created before it was introduced.
+        last_online (Mapped[datetime]): Timestamp of the last request or token refresh made with the session,
+            written in batches. This field is mandatory.
         created_at (Mapped[datetime]): Timestamp indicating when the authentication session was created, 
-            automatically set to the current time in UTC. This field is mandatory.
+            automatically set to the current time in UTC. This field is mandatory and indexed for cleanup.
 
     Relationships:
         user (Mapped["UserModel"]): Relationship to the UserModel, 
@@ -44,16 +50,26 @@ class AuthSessionModel(AbstractModel):
     """
     __tablename__ = "auth_sessions"
     id: Mapped[PyUUID] = mapped_column("id", SqlUUID(native_uuid=True, as_uuid=True), primary_key=True, default=uuid4)
-    user_id: Mapped[int] = mapped_column("user_id", ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        "user_id", ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     user_ip: Mapped[str] = mapped_column("user_ip", String(128), nullable=False)
     user_agent: Mapped[str | None] = mapped_column("user_agent", String(256), nullable=True)
     access_token: Mapped[PyUUID | None] = mapped_column(
         "access_token", SqlUUID(native_uuid=True, as_uuid=True), nullable=True, default=uuid4
     )
     refresh_token: Mapped[PyUUID | None] = mapped_column(
-        "refresh_token", SqlUUID(native_uuid=True, as_uuid=True), nullable=True, default=uuid4
+        "refresh_token", SqlUUID(native_uuid=True, as_uuid=True), nullable=True, default=uuid4, unique=True, index=True
+    )
+    encryption_key: Mapped[str | None] = mapped_column("encryption_key", String(64), nullable=True)
+    last_online: Mapped[datetime] = mapped_column(
+        "last_online",
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
     )
     created_at: Mapped[datetime] = mapped_column(
-        "created_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc)
+        "created_at", DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), index=True
     )
     user: Mapped["UserModel"] = relationship("UserModel")
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .abc import AbstractModel
@@ -22,24 +22,33 @@ class CartProductModel(AbstractModel):
         id (Mapped[int]): Unique identifier for the cart product, 
             automatically generated as an integer and serves as the primary key.
         owner_id (Mapped[int]): Foreign key referencing the user's ID in the 'users' table, 
-            indicating which user owns this cart product. This field is mandatory.
+            indicating which user owns this cart product. This field is mandatory and indexed for the
+            cart products not deleted.
         product_type_id (Mapped[int]): Foreign key referencing the product type's ID in the 
             'product_types' table, indicating the type of product being added to the cart. 
-            This field is mandatory.
+            This field is mandatory and indexed.
         created_at (Mapped[datetime]): Timestamp indicating when the cart product was created, 
             automatically set to the current time in UTC. This field is mandatory.
         deleted_at (Mapped[datetime | None]): Timestamp indicating when the cart product was 
             deleted from the cart, if applicable. This field is optional and can be null, 
             allowing for soft deletion.
+        version (Mapped[int]): Row version, incremented by every update and returned as the ETag,
+            so that concurrent updates are detected with If-Match. This field is mandatory.
     
     Relationships:
         product_type (Mapped["ProductTypeModel"]): Relationship to the ProductTypeModel, 
             allowing access to the details of the product type associated with this cart product.
     """
     __tablename__ = "cart_products"
+    __table_args__ = (
+        Index("ix_cart_products_owner_id_active", "owner_id", postgresql_where=text("deleted_at IS NULL")),
+    )
     id: Mapped[int] = mapped_column("id", Integer(), primary_key=True, autoincrement=True)
-    owner_id: Mapped[int] = mapped_column("owner_id", ForeignKey("users.id"), nullable=False)
-    product_type_id: Mapped[int] = mapped_column("product_type_id", ForeignKey("product_types.id"), nullable=False)
+    owner_id: Mapped[int] = mapped_column("owner_id", ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_type_id: Mapped[int] = mapped_column(
+        "product_type_id", ForeignKey("product_types.id"), nullable=False, index=True
+    )
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    version: Mapped[int] = mapped_column("version", Integer(), nullable=False, default=1, server_default="1")
     product_type: Mapped["ProductTypeModel"] = relationship("ProductTypeModel", back_populates="cart_products")
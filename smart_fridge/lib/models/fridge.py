@@ -22,23 +22,29 @@ class FridgeModel(AbstractModel):
         id (Mapped[int]): Unique identifier for the fridge, 
             automatically generated as an integer and serves as the primary key.
         owner_id (Mapped[int]): Foreign key referencing the user's ID in the 'users' table, 
-            indicating which user owns this fridge. This field is mandatory.
+            indicating which user owns this fridge. This field is mandatory and indexed.
         name (Mapped[str]): Name of the fridge, allowing users to identify their fridge 
             easily. This field is mandatory and should be a string.
+        version (Mapped[int]): Row version, incremented by every update and returned as the ETag,
+            so that concurrent updates are detected with If-Match. This field is mandatory.
         fridge_products (Mapped[list["FridgeProductModel"]]): Relationship to the FridgeProductModel, 
             representing the products stored in this fridge. This field allows for a one-to-many 
             relationship, where a fridge can contain multiple products. The cascade option 
             ensures that related fridge products are deleted if the fridge is deleted, 
-            and orphaned products are also removed.
+            and orphaned products are also removed. The database deletes them with ON DELETE CASCADE,
+            without loading them.
         owner (Mapped["UserModel"]): Relationship to the UserModel, allowing access to the 
             details of the user who owns this fridge. This field provides a way to navigate 
             back to the user from the fridge model.
     """
     __tablename__ = "fridges"
     id: Mapped[int] = mapped_column("id", Integer(), primary_key=True, autoincrement=True)
-    owner_id: Mapped[int] = mapped_column("owner_id", ForeignKey("users.id"), nullable=False)
+    owner_id: Mapped[int] = mapped_column(
+        "owner_id", ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
     name: Mapped[str]
+    version: Mapped[int] = mapped_column("version", Integer(), nullable=False, default=1, server_default="1")
     fridge_products: Mapped[list["FridgeProductModel"]] = relationship(
-        "FridgeProductModel", back_populates="fridge", cascade="all, delete-orphan"
+        "FridgeProductModel", back_populates="fridge", cascade="all, delete-orphan", passive_deletes=True
     )
     owner: Mapped["UserModel"] = relationship("UserModel")
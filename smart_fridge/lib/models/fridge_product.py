@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .abc import AbstractModel
@@ -25,15 +25,18 @@ class FridgeProductModel(AbstractModel):
             automatically generated as an integer and serves as the primary key.
         fridge_id (Mapped[int]): Foreign key referencing the fridge's ID in the 
             'fridges' table, indicating which fridge contains this product. 
-            This field is mandatory.
+            This field is mandatory and indexed.
         product_id (Mapped[int]): Foreign key referencing the product's ID in the 
             'products' table, indicating which product is stored in the fridge. 
-            This field is mandatory.
+            This field is mandatory and indexed twice: covering the timestamps statistics filter on,
+            and for the fridge products not deleted only.
         created_at (Mapped[datetime]): Timestamp indicating when the fridge product was created, 
             automatically set to the current time in UTC. This field is mandatory.
         deleted_at (Mapped[datetime | None]): Timestamp indicating when the fridge product was 
             deleted from the fridge, if applicable. This field is optional and can be null, 
             allowing for soft deletion.
+        version (Mapped[int]): Row version, incremented by every update and returned as the ETag,
+            so that concurrent updates are detected with If-Match. This field is mandatory.
     
     Relationships:
         fridge (Mapped["FridgeModel"]): Relationship to the FridgeModel, 
@@ -42,10 +45,17 @@ class FridgeProductModel(AbstractModel):
             allowing access to the details of the product stored in the fridge.
     """
     __tablename__ = "fridge_products"
+    __table_args__ = (
+        Index("ix_fridge_products_product_id", "product_id", postgresql_include=["created_at", "deleted_at"]),
+        Index("ix_fridge_products_product_id_active", "product_id", postgresql_where=text("deleted_at IS NULL")),
+    )
     id: Mapped[int] = mapped_column("id", Integer(), primary_key=True, autoincrement=True)
-    fridge_id: Mapped[int] = mapped_column("fridge_id", ForeignKey("fridges.id"), nullable=False)
-    product_id: Mapped[int] = mapped_column("product_id", ForeignKey("products.id"), nullable=False)
+    fridge_id: Mapped[int] = mapped_column(
+        "fridge_id", ForeignKey("fridges.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    product_id: Mapped[int] = mapped_column("product_id", ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    version: Mapped[int] = mapped_column("version", Integer(), nullable=False, default=1, server_default="1")
     fridge: Mapped["FridgeModel"] = relationship("FridgeModel", back_populates="fridge_products")
     product: Mapped["ProductModel"] = relationship("ProductModel", back_populates="fridge_product")
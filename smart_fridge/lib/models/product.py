@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Index, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .abc import AbstractModel
@@ -23,9 +23,10 @@ class ProductModel(AbstractModel):
         id (Mapped[int]): Unique identifier for the product, 
             automatically generated as an integer and serves as the primary key.
         product_type_id (Mapped[int]): Foreign key referencing the product type's ID in the 
-            'product_types' table, indicating the type of product. This field is mandatory.
+            'product_types' table, indicating the type of product. This field is mandatory and indexed.
         owner_id (Mapped[int]): Foreign key referencing the user's ID in the 'users' table, 
-            indicating which user owns this product. This field is mandatory.
+            indicating which user owns this product. This field is mandatory and indexed, the index
+            covers the columns statistics and expiry queries read.
         amount (Mapped[float]): The quantity of the product available in stock. 
             This field is mandatory and should be a non-negative value.
         manufactured_at (Mapped[datetime]): Timestamp indicating when the product was 
@@ -33,21 +34,32 @@ class ProductModel(AbstractModel):
         opened_at (Mapped[datetime | None]): Timestamp indicating when the product was 
             opened or made available for use, if applicable. This field is optional and can be null, 
             allowing for products that have not yet been opened.
+        version (Mapped[int]): Row version, incremented by every update and returned as the ETag,
+            so that concurrent updates are detected with If-Match. This field is mandatory.
 
     Relationships:
         product_type (Mapped["ProductTypeModel"]): Relationship to the ProductTypeModel, 
             allowing access to the details of the product type associated with this product.
         fridge_product (Mapped["FridgeProductModel"]): Relationship to the FridgeProductModel, 
             allowing access to the details of the fridge product associated with this product.
+            It is deleted with the product by the database, with ON DELETE CASCADE.
     """
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_owner_id", "owner_id", postgresql_include=["id", "product_type_id", "manufactured_at"]),
+    )
     id: Mapped[int] = mapped_column("id", Integer(), primary_key=True, autoincrement=True)
-    product_type_id: Mapped[int] = mapped_column("product_type_id", ForeignKey("product_types.id"), nullable=False)
-    owner_id: Mapped[int] = mapped_column("owner_id", ForeignKey("users.id"), nullable=False)
+    product_type_id: Mapped[int] = mapped_column(
+        "product_type_id", ForeignKey("product_types.id"), nullable=False, index=True
+    )
+    owner_id: Mapped[int] = mapped_column("owner_id", ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     amount: Mapped[float]
     manufactured_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
     opened_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    version: Mapped[int] = mapped_column("version", Integer(), nullable=False, default=1, server_default="1")
     product_type: Mapped["ProductTypeModel"] = relationship("ProductTypeModel", back_populates="products")
-    fridge_product: Mapped["FridgeProductModel"] = relationship("FridgeProductModel", back_populates="product")
+    fridge_product: Mapped["FridgeProductModel"] = relationship(
+        "FridgeProductModel", back_populates="product", cascade="all, delete-orphan", passive_deletes=True
+    )
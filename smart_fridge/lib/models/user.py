@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, Integer, func
+from sqlalchemy import DateTime, Index, Integer, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .abc import AbstractModel
@@ -31,6 +31,7 @@ class UserModel(AbstractModel):
             is active. Defaults to True, meaning the account is active unless specified otherwise.
         tg_id (Mapped[int | None]): The Telegram ID of the user, 
             which is optional and can be null if the user has not linked their Telegram account.
+            Linked accounts are indexed.
         created_at (Mapped[datetime]): Timestamp indicating when the user account was created, 
             automatically set to the current time in UTC. This field is mandatory and indexed for performance.
         deleted_at (Mapped[datetime | None]): Timestamp indicating when the user account was 
@@ -38,9 +39,14 @@ class UserModel(AbstractModel):
     
     Relationships:
         products (Mapped[list["ProductModel"]]): Relationship to the ProductModel, 
-            allowing access to the products associated with this user.
+            allowing access to the products associated with this user. The products, fridges, cart
+            products and auth sessions of the user are deleted with it by the database, with ON DELETE CASCADE.
     """
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_email_lower", text("lower(email)"), postgresql_where=text("deleted_at IS NULL")),
+        Index("ix_users_tg_id", "tg_id", postgresql_where=text("tg_id IS NOT NULL")),
+    )
     id: Mapped[int] = mapped_column("id", Integer(), primary_key=True, autoincrement=True)
     username: Mapped[str] = mapped_column(index=True)
     email: Mapped[str] = mapped_column(index=True)
@@ -54,4 +60,6 @@ class UserModel(AbstractModel):
         index=True,
     )
     deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
-    products: Mapped[list["ProductModel"]] = relationship("ProductModel")
+    products: Mapped[list["ProductModel"]] = relationship(
+        "ProductModel", cascade="all, delete-orphan", passive_deletes=True
+    )
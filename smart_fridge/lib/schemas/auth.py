@@ -1,4 +1,9 @@
+from base64 import b64decode, b64encode
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from json import loads as json_loads
+from struct import Struct
+from typing import ClassVar, Self
 from uuid import UUID, uuid4
 
 from jwt import encode as jwt_encode
@@ -18,11 +23,33 @@ FINGERPRINT = f.BaseField(
 )
 
 
-class TokenRedisData(BaseSchema):
+@dataclass(frozen=True, slots=True)
+class TokenRedisData:
+    """Auth context of an access token, resolved on every authenticated request.
+
+    Stored in Redis as 56 packed bytes (the session UUID, the user ID and the 32-byte encryption key),
+    base64-encoded so that clients with `decode_responses` enabled can read it back.
+    """
+
+    _struct: ClassVar[Struct] = Struct("!16sq32s")
+
     session_id: UUID
     user_id: int
     encryption_key: str
 
+    def encode(self) -> bytes:
+        return b64encode(self._struct.pack(self.session_id.bytes, self.user_id, bytes.fromhex(self.encryption_key)))
+
+    @classmethod
+    def decode(cls, data: bytes | str) -> Self:
+        data = data.encode() if isinstance(data, str) else data
+        # Sessions written before the packed encoding are stored as JSON
+        if data[:1] == b"{":
+            json_data = json_loads(data)
+            return cls(UUID(json_data["session_id"]), json_data["user_id"], json_data["encryption_key"])
+        session_id, user_id, encryption_key = cls._struct.unpack(b64decode(data))
+        return cls(UUID(bytes=session_id), user_id, encryption_key.hex())
+
 
 class TokenCreateSchema(BaseSchema):
     email: str = USER_EMAIL
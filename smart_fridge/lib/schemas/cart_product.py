@@ -33,6 +33,7 @@ class CartProductSchema(BaseCartProductSchema):
     owner_id: int = USER_ID
     created_at: datetime = CREATED_AT
     deleted_at: datetime | None = DELETED_AT(default=None)
+    version: int = f.VERSION
     product_type: ProductTypeSchema
 
 
@@ -0,0 +1,9 @@
+from .abc import BaseEnum
+
+
+class IsolationLevel(BaseEnum):
+    """Transaction isolation levels."""
+
+    read_committed = "READ COMMITTED"
+    repeatable_read = "REPEATABLE READ"
+    serializable = "SERIALIZABLE"
@@ -0,0 +1,9 @@
+from .abc import BaseEnum
+
+
+class RateLimitKeyType(BaseEnum):
+    """What a rate limit is accounted to."""
+
+    ip = "ip"
+    user = "user"
+    email = "email"
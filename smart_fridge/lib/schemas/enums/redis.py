@@ -11,3 +11,29 @@ class AuthRedisKeyType(BaseRedisKeyType):
     _prefix = "auth"
 
     access = f"{_prefix}:access:{{}}"
+    revoked = f"{_prefix}:revoked"
+    user_access = f"{_prefix}:user:{{}}:access"
+
+
+class AuthRedisChannelType(BaseRedisKeyType):
+    """Redis auth pub/sub channel type."""
+
+    _prefix = "auth"
+
+    invalidate = f"{_prefix}:invalidate"
+
+
+class RateLimitRedisKeyType(BaseRedisKeyType):
+    """Redis rate limit key type."""
+
+    _prefix = "rate_limit"
+
+    bucket = f"{_prefix}:{{}}:{{}}"
+
+
+class DatabaseRedisKeyType(BaseRedisKeyType):
+    """Redis database routing key type."""
+
+    _prefix = "db"
+
+    primary_pin = f"{_prefix}:primary_pin:{{}}"
@@ -42,3 +42,8 @@ ID = BaseField(
     examples=[1],
     ge=0,
 )
+VERSION = BaseField(
+    description="Row version, incremented by every update. Send it back in If-Match to detect concurrent updates.",
+    examples=[1],
+    ge=1,
+)
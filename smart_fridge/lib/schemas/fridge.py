@@ -26,3 +26,4 @@ class FridgePatchSchema(FridgeCreateSchema):
 class FridgeSchema(FridgeCreateSchema):
     id: int = FRIDGE_ID
     owner_id: int = USER_ID
+    version: int = f.VERSION
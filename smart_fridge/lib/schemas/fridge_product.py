@@ -44,6 +44,7 @@ class FridgeProductSchema(FridgeProductCreateSchema):
     id: int = FRIDGE_PRODUCT_ID
     created_at: datetime = CREATED_AT
     deleted_at: datetime | None = DELETED_AT(default=None)
+    version: int = f.VERSION
     product: ProductSchema
 
 
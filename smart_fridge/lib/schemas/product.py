@@ -34,5 +34,6 @@ class ProductPatchSchema(ProductCreateSchema):
 class ProductSchema(ProductCreateSchema):
     id: int = PRODUCT_ID
     owner_id: int = USER_ID
+    version: int = f.VERSION
     product_type: ProductTypeSchema
     opened_at: datetime | None = OPENED_AT(default=None)
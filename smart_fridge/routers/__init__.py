@@ -1,7 +1,10 @@
 from fastapi import APIRouter
 
+from . import health, metrics
 from .v1 import router as v1_router
 
 
 router = APIRouter(prefix="/api")
 router.include_router(v1_router.router)
+router.include_router(health.router)
+router.include_router(metrics.router)
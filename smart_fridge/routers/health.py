@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Request, Response, status
+
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live", status_code=status.HTTP_204_NO_CONTENT, include_in_schema=False)
+async def live() -> None:
+    return None
+
+
+@router.get("/ready", status_code=status.HTTP_204_NO_CONTENT, include_in_schema=False)
+async def ready(request: Request, response: Response) -> None:
+    # Set once the pools are warmed up, and cleared again on shutdown so traffic drains first
+    if not getattr(request.app.state, "ready", False):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
@@ -0,0 +1,15 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from smart_fridge.core.dependencies.fastapi import metrics_stub
+from smart_fridge.core.metrics import Metrics
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(metrics: Annotated[Metrics, Depends(metrics_stub)]) -> str:
+    return metrics.render()
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Depends, Response
 
 from smart_fridge.core.dependencies.fastapi import (
+    AppConfigDependency,
     ClientHostDependency,
     DatabaseDependency,
     EncryptorDependency,
@@ -8,6 +9,8 @@ from smart_fridge.core.dependencies.fastapi import (
     RefreshTokenDependency,
     TokenDataDependency,
     UserAgentDependency,
+    locate_shard_by_email,
+    locate_shard_by_refresh_token,
 )
 from smart_fridge.lib.db import auth as auth_db, auth_session as auth_session_db
 from smart_fridge.lib.schemas.auth import TokenCreateSchema, TokenSchema
@@ -16,34 +19,46 @@ from smart_fridge.lib.schemas.auth import TokenCreateSchema, TokenSchema
 router = APIRouter(tags=["auth"], prefix="/auth")
 
 
-@router.post("/login", response_model=TokenSchema)
+@router.post("/login", response_model=TokenSchema, dependencies=[Depends(locate_shard_by_email)])
 async def login(
     response: Response,
     db: DatabaseDependency,
     redis: RedisDependency,
     encryptor: EncryptorDependency,
+    config: AppConfigDependency,
     user_agent: UserAgentDependency,
     client_host: ClientHostDependency,
     schema: TokenCreateSchema,
 ) -> TokenSchema:
-    result = await auth_db.create_token(db, redis, encryptor, client_host, user_agent, schema)
+    result = await auth_db.create_token(
+        db, redis, encryptor, client_host, user_agent, schema, self_contained=config.jwt.self_contained_access_token
+    )
     response.set_cookie(
         "refresh_token", result.refresh_token, httponly=True, max_age=result.refresh_token_expires_in * 60 * 60 * 24
     )
     return result
 
 
-@router.post("/refresh_tokens", response_model=TokenSchema)
+@router.post("/refresh_tokens", response_model=TokenSchema, dependencies=[Depends(locate_shard_by_refresh_token)])
 async def refresh_tokens(
     response: Response,
     db: DatabaseDependency,
     redis: RedisDependency,
     encryptor: EncryptorDependency,
+    config: AppConfigDependency,
     user_agent: UserAgentDependency,
     client_host: ClientHostDependency,
     refresh_token: RefreshTokenDependency,
 ) -> TokenSchema:
-    result = await auth_db.refresh_token(db, redis, encryptor, client_host, user_agent, refresh_token)
+    result = await auth_db.refresh_token(
+        db,
+        redis,
+        encryptor,
+        client_host,
+        user_agent,
+        refresh_token,
+        self_contained=config.jwt.self_contained_access_token,
+    )
     response.set_cookie(
         "refresh_token", result.refresh_token, httponly=True, max_age=result.refresh_token_expires_in * 60 * 60 * 24
     )
@@ -55,7 +70,24 @@ async def logout(
     response: Response,
     db: DatabaseDependency,
     redis: RedisDependency,
+    encryptor: EncryptorDependency,
+    token_data: TokenDataDependency,
+) -> None:
+    response.delete_cookie("refresh_token")
+    return await auth_session_db.delete_auth_session(
+        db, redis, token_data.session_id, token_data.user_id, expires_in=encryptor.jwt_expire_minutes
+    )
+
+
+@router.delete("/logout_all", status_code=204)
+async def logout_all(
+    response: Response,
+    db: DatabaseDependency,
+    redis: RedisDependency,
+    encryptor: EncryptorDependency,
     token_data: TokenDataDependency,
 ) -> None:
     response.delete_cookie("refresh_token")
-    return await auth_session_db.delete_auth_session(db, redis, token_data.session_id, token_data.user_id)
+    await auth_session_db.delete_user_auth_sessions(
+        db, redis, token_data.user_id, expires_in=encryptor.jwt_expire_minutes
+    )
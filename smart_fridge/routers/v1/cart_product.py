@@ -1,6 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
-from smart_fridge.core.dependencies.fastapi import DatabaseDependency, TokenDataDependency
+from smart_fridge.core.dependencies.fastapi import (
+    DatabaseDependency,
+    IfMatchDependency,
+    ReadOnlyDatabaseDependency,
+    TokenDataDependency,
+)
+from smart_fridge.core.etag import set_etag
 from smart_fridge.lib.db import cart_product as cart_products_db
 from smart_fridge.lib.schemas.cart_product import (
     CartProductCreateSchema,
@@ -21,29 +27,45 @@ async def create_cart_product(
 
 
 @router.get("/", response_model=list[CartProductSchema])
-async def get_cart_products(db: DatabaseDependency, token_data: TokenDataDependency) -> list[CartProductSchema]:
+async def get_cart_products(db: ReadOnlyDatabaseDependency, token_data: TokenDataDependency) -> list[CartProductSchema]:
     return await cart_products_db.get_cart_products(db, token_data.user_id)
 
 
 @router.get("/{cart_product_id}", response_model=CartProductSchema)
 async def get_cart_product(
-    db: DatabaseDependency, cart_product_id: int, token_data: TokenDataDependency
+    db: ReadOnlyDatabaseDependency, cart_product_id: int, token_data: TokenDataDependency, response: Response
 ) -> CartProductSchema:
-    return await cart_products_db.get_cart_product(db, cart_product_id, token_data.user_id)
+    cart_product = await cart_products_db.get_cart_product(db, cart_product_id, token_data.user_id)
+    set_etag(response, cart_product.version)
+    return cart_product
 
 
 @router.patch("/{cart_product_id}", response_model=CartProductSchema)
 async def patch_cart_product(
-    db: DatabaseDependency, cart_product_id: int, token_data: TokenDataDependency, schema: CartProductPatchSchema
+    db: DatabaseDependency,
+    cart_product_id: int,
+    token_data: TokenDataDependency,
+    schema: CartProductPatchSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> CartProductSchema:
-    return await cart_products_db.update_cart_product(db, cart_product_id, schema, token_data.user_id)
+    cart_product = await cart_products_db.update_cart_product(db, cart_product_id, schema, token_data.user_id, version)
+    set_etag(response, cart_product.version)
+    return cart_product
 
 
 @router.put("/{cart_product_id}", response_model=CartProductSchema)
 async def update_cart_product(
-    db: DatabaseDependency, cart_product_id: int, token_data: TokenDataDependency, schema: CartProductUpdateSchema
+    db: DatabaseDependency,
+    cart_product_id: int,
+    token_data: TokenDataDependency,
+    schema: CartProductUpdateSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> CartProductSchema:
-    return await cart_products_db.update_cart_product(db, cart_product_id, schema, token_data.user_id)
+    cart_product = await cart_products_db.update_cart_product(db, cart_product_id, schema, token_data.user_id, version)
+    set_etag(response, cart_product.version)
+    return cart_product
 
 
 @router.delete("/{cart_product_id}", status_code=204)
@@ -1,6 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
-from smart_fridge.core.dependencies.fastapi import DatabaseDependency, TokenDataDependency
+from smart_fridge.core.dependencies.fastapi import (
+    DatabaseDependency,
+    IfMatchDependency,
+    ReadOnlyDatabaseDependency,
+    TokenDataDependency,
+)
+from smart_fridge.core.etag import set_etag
 from smart_fridge.lib.db import fridge as fridges_db
 from smart_fridge.lib.schemas.fridge import FridgeCreateSchema, FridgePatchSchema, FridgeSchema, FridgeUpdateSchema
 
@@ -17,27 +23,45 @@ async def create_fridge(
 
 # TODO: add filters & pagination
 @router.get("/", response_model=list[FridgeSchema])
-async def get_fridges(db: DatabaseDependency, token_data: TokenDataDependency) -> list[FridgeSchema]:
+async def get_fridges(db: ReadOnlyDatabaseDependency, token_data: TokenDataDependency) -> list[FridgeSchema]:
     return await fridges_db.get_fridges(db, token_data.user_id)
 
 
 @router.get("/{fridge_id}", response_model=FridgeSchema)
-async def get_fridge(db: DatabaseDependency, fridge_id: int, token_data: TokenDataDependency) -> FridgeSchema:
-    return await fridges_db.get_fridge(db, fridge_id, token_data.user_id)
+async def get_fridge(
+    db: ReadOnlyDatabaseDependency, fridge_id: int, token_data: TokenDataDependency, response: Response
+) -> FridgeSchema:
+    fridge = await fridges_db.get_fridge(db, fridge_id, token_data.user_id)
+    set_etag(response, fridge.version)
+    return fridge
 
 
 @router.patch("/{fridge_id}", response_model=FridgeSchema)
 async def patch_fridge(
-    db: DatabaseDependency, fridge_id: int, token_data: TokenDataDependency, schema: FridgePatchSchema
+    db: DatabaseDependency,
+    fridge_id: int,
+    token_data: TokenDataDependency,
+    schema: FridgePatchSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> FridgeSchema:
-    return await fridges_db.update_fridge(db, fridge_id, schema, token_data.user_id)
+    fridge = await fridges_db.update_fridge(db, fridge_id, schema, token_data.user_id, version)
+    set_etag(response, fridge.version)
+    return fridge
 
 
 @router.put("/{fridge_id}", response_model=FridgeSchema)
 async def update_fridge(
-    db: DatabaseDependency, fridge_id: int, token_data: TokenDataDependency, schema: FridgeUpdateSchema
+    db: DatabaseDependency,
+    fridge_id: int,
+    token_data: TokenDataDependency,
+    schema: FridgeUpdateSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> FridgeSchema:
-    return await fridges_db.update_fridge(db, fridge_id, schema, token_data.user_id)
+    fridge = await fridges_db.update_fridge(db, fridge_id, schema, token_data.user_id, version)
+    set_etag(response, fridge.version)
+    return fridge
 
 
 @router.delete("/{fridge_id}", status_code=204)
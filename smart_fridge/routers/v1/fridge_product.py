@@ -1,6 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
-from smart_fridge.core.dependencies.fastapi import DatabaseDependency, TokenDataDependency
+from smart_fridge.core.dependencies.fastapi import (
+    DatabaseDependency,
+    IfMatchDependency,
+    ReadOnlyDatabaseDependency,
+    SerializableUnitOfWorkDependency,
+    TokenDataDependency,
+)
+from smart_fridge.core.etag import set_etag
 from smart_fridge.lib.db import fridge_product as fridge_products_db
 from smart_fridge.lib.schemas.fridge_product import (
     FridgeProductCreateSchema,
@@ -17,18 +24,24 @@ router = APIRouter(prefix="/fridge_products", tags=["fridge_products"])
 
 
 @router.post("/", response_model=FridgeProductSchema)
-async def create_fridge_product(db: DatabaseDependency, schema: FridgeProductCreateSchema) -> FridgeProductSchema:
-    return await fridge_products_db.create_fridge_product(db, schema)
+async def create_fridge_product(
+    uow: SerializableUnitOfWorkDependency, schema: FridgeProductCreateSchema
+) -> FridgeProductSchema:
+    return await uow(fridge_products_db.create_fridge_product, schema)
 
 
 @router.get("/{id}", response_model=FridgeProductSchema)
-async def get_fridge_product(db: DatabaseDependency, id: int, token_data: TokenDataDependency) -> FridgeProductSchema:
-    return await fridge_products_db.get_fridge_product(db, id, token_data.user_id)
+async def get_fridge_product(
+    db: ReadOnlyDatabaseDependency, id: int, token_data: TokenDataDependency, response: Response
+) -> FridgeProductSchema:
+    fridge_product = await fridge_products_db.get_fridge_product(db, id, token_data.user_id)
+    set_etag(response, fridge_product.version)
+    return fridge_product
 
 
 @router.get("/", response_model=FridgeProductPaginationResponse)
 async def get_fridge_products(
-    db: DatabaseDependency,
+    db: ReadOnlyDatabaseDependency,
     token_data: TokenDataDependency,
     pagination: PaginationRequest = Depends(),
     filters: FridgeProductFilterSchema = Depends(),
@@ -38,16 +51,30 @@ async def get_fridge_products(
 
 @router.patch("/{id}", response_model=FridgeProductSchema)
 async def patch_fridge_product(
-    db: DatabaseDependency, id: int, token_data: TokenDataDependency, schema: FridgeProductPatchSchema
+    db: DatabaseDependency,
+    id: int,
+    token_data: TokenDataDependency,
+    schema: FridgeProductPatchSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> FridgeProductSchema:
-    return await fridge_products_db.update_fridge_product(db, id, schema, token_data.user_id)
+    fridge_product = await fridge_products_db.update_fridge_product(db, id, schema, token_data.user_id, version)
+    set_etag(response, fridge_product.version)
+    return fridge_product
 
 
 @router.put("/{id}", response_model=FridgeProductSchema)
 async def update_fridge_product(
-    db: DatabaseDependency, id: int, token_data: TokenDataDependency, schema: FridgeProductUpdateSchema
+    db: DatabaseDependency,
+    id: int,
+    token_data: TokenDataDependency,
+    schema: FridgeProductUpdateSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> FridgeProductSchema:
-    return await fridge_products_db.update_fridge_product(db, id, schema, token_data.user_id)
+    fridge_product = await fridge_products_db.update_fridge_product(db, id, schema, token_data.user_id, version)
+    set_etag(response, fridge_product.version)
+    return fridge_product
 
 
 @router.delete("/{id}", status_code=204)
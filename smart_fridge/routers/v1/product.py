@@ -1,6 +1,12 @@
-from fastapi import APIRouter
-
-from smart_fridge.core.dependencies.fastapi import DatabaseDependency, TokenDataDependency
+from fastapi import APIRouter, Response
+
+from smart_fridge.core.dependencies.fastapi import (
+    DatabaseDependency,
+    IfMatchDependency,
+    ReadOnlyDatabaseDependency,
+    TokenDataDependency,
+)
+from smart_fridge.core.etag import set_etag
 from smart_fridge.lib.db import product as products_db
 from smart_fridge.lib.schemas.product import ProductCreateSchema, ProductPatchSchema, ProductSchema, ProductUpdateSchema
 
@@ -16,38 +22,64 @@ async def create_product(
 
 
 @router.post("/open/{id}", response_model=ProductSchema)
-async def set_product_opened(db: DatabaseDependency, id: int, token_data: TokenDataDependency) -> ProductSchema:
-    return await products_db.set_product_opened(db, id, token_data.user_id)
+async def set_product_opened(
+    db: DatabaseDependency, id: int, token_data: TokenDataDependency, response: Response
+) -> ProductSchema:
+    product = await products_db.set_product_opened(db, id, token_data.user_id)
+    set_etag(response, product.version)
+    return product
 
 
 @router.post("/close/{id}", response_model=ProductSchema)
-async def set_product_closed(db: DatabaseDependency, id: int, token_data: TokenDataDependency) -> ProductSchema:
-    return await products_db.set_product_closed(db, id, token_data.user_id)
+async def set_product_closed(
+    db: DatabaseDependency, id: int, token_data: TokenDataDependency, response: Response
+) -> ProductSchema:
+    product = await products_db.set_product_closed(db, id, token_data.user_id)
+    set_etag(response, product.version)
+    return product
 
 
 # TODO: add filters & pagination
 @router.get("/", response_model=list[ProductSchema])
-async def get_products(db: DatabaseDependency, token_data: TokenDataDependency) -> list[ProductSchema]:
+async def get_products(db: ReadOnlyDatabaseDependency, token_data: TokenDataDependency) -> list[ProductSchema]:
     return await products_db.get_products(db, token_data.user_id)
 
 
 @router.get("/{id}", response_model=ProductSchema)
-async def get_product(db: DatabaseDependency, id: int, token_data: TokenDataDependency) -> ProductSchema:
-    return await products_db.get_product(db, id, token_data.user_id)
+async def get_product(
+    db: ReadOnlyDatabaseDependency, id: int, token_data: TokenDataDependency, response: Response
+) -> ProductSchema:
+    product = await products_db.get_product(db, id, token_data.user_id)
+    set_etag(response, product.version)
+    return product
 
 
 @router.patch("/{id}", response_model=ProductSchema)
 async def patch_product(
-    db: DatabaseDependency, id: int, token_data: TokenDataDependency, schema: ProductPatchSchema
+    db: DatabaseDependency,
+    id: int,
+    token_data: TokenDataDependency,
+    schema: ProductPatchSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> ProductSchema:
-    return await products_db.update_product(db, id, schema, token_data.user_id)
+    product = await products_db.update_product(db, id, schema, token_data.user_id, version)
+    set_etag(response, product.version)
+    return product
 
 
 @router.put("/{id}", response_model=ProductSchema)
 async def update_product(
-    db: DatabaseDependency, id: int, token_data: TokenDataDependency, schema: ProductUpdateSchema
+    db: DatabaseDependency,
+    id: int,
+    token_data: TokenDataDependency,
+    schema: ProductUpdateSchema,
+    version: IfMatchDependency,
+    response: Response,
 ) -> ProductSchema:
-    return await products_db.update_product(db, id, schema, token_data.user_id)
+    product = await products_db.update_product(db, id, schema, token_data.user_id, version)
+    set_etag(response, product.version)
+    return product
 
 
 @router.delete("/{id}", status_code=204)
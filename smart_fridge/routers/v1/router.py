@@ -1,18 +1,34 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from smart_fridge.core.dependencies.fastapi import deadline, rate_limit
+from smart_fridge.core.rate_limit import RateLimit
+from smart_fridge.lib.schemas.enums.rate_limit import RateLimitKeyType
 
 from . import auth, cart_product, fridge, fridge_product, product, product_type, statistics, user
 
 
 router = APIRouter(prefix="/v1")
 
-for i in [
-    auth.router,
-    user.router,
-    product_type.router,
-    product.router,
-    fridge_product.router,
-    fridge.router,
-    cart_product.router,
-    statistics.router,
+AUTH_RATE_LIMITS = (
+    RateLimit("login_ip", limit=20, period=60, key=RateLimitKeyType.ip, path="/auth/login"),
+    RateLimit("login_email", limit=5, period=60, key=RateLimitKeyType.email, path="/auth/login"),
+    RateLimit("refresh_ip", limit=60, period=60, key=RateLimitKeyType.ip, path="/auth/refresh_tokens"),
+)
+CRUD_RATE_LIMITS = (RateLimit("crud_user", limit=300, period=60, key=RateLimitKeyType.user),)
+
+# Latency budgets in seconds, routes can declare their own with `dependencies=[Depends(deadline(...))]`
+AUTH_DEADLINE = 5
+CRUD_DEADLINE = 5
+ANALYTICS_DEADLINE = 15
+
+for i, rate_limits, budget in [
+    (auth.router, AUTH_RATE_LIMITS, AUTH_DEADLINE),
+    (user.router, CRUD_RATE_LIMITS, CRUD_DEADLINE),
+    (product_type.router, CRUD_RATE_LIMITS, CRUD_DEADLINE),
+    (product.router, CRUD_RATE_LIMITS, CRUD_DEADLINE),
+    (fridge_product.router, CRUD_RATE_LIMITS, CRUD_DEADLINE),
+    (fridge.router, CRUD_RATE_LIMITS, CRUD_DEADLINE),
+    (cart_product.router, CRUD_RATE_LIMITS, CRUD_DEADLINE),
+    (statistics.router, CRUD_RATE_LIMITS, ANALYTICS_DEADLINE),
 ]:
-    router.include_router(i)
+    router.include_router(i, dependencies=[Depends(deadline(budget)), Depends(rate_limit(*rate_limits))])
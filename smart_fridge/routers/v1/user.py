@@ -1,6 +1,15 @@
-from fastapi import APIRouter
-
-from smart_fridge.core.dependencies.fastapi import DatabaseDependency, TokenDataDependency
+from fastapi import APIRouter, Depends
+
+from smart_fridge.core.dependencies.fastapi import (
+    DatabaseDependency,
+    EncryptorDependency,
+    NewUserIdDependency,
+    ReadOnlyDatabaseDependency,
+    RedisDependency,
+    SerializableUnitOfWorkDependency,
+    TokenDataDependency,
+    new_user_id,
+)
 from smart_fridge.lib.db import user as user_db
 from smart_fridge.lib.schemas.user import UserCreateSchema, UserSchema
 
@@ -8,16 +17,24 @@ from smart_fridge.lib.schemas.user import UserCreateSchema, UserSchema
 router = APIRouter(tags=["user"], prefix="/users")
 
 
-@router.post("/", response_model=UserSchema)
-async def create_user(db: DatabaseDependency, schema: UserCreateSchema) -> UserSchema:
-    return await user_db.create_user(db, schema=schema)
+# Declared on the route to pick the shard before the unit of work does
+@router.post("/", response_model=UserSchema, dependencies=[Depends(new_user_id)])
+async def create_user(
+    uow: SerializableUnitOfWorkDependency,
+    encryptor: EncryptorDependency,
+    user_id: NewUserIdDependency,
+    schema: UserCreateSchema,
+) -> UserSchema:
+    return await uow(user_db.create_user, encryptor, schema=schema, user_id=user_id)
 
 
 @router.get("/me", response_model=UserSchema)
-async def get_user(db: DatabaseDependency, token_data: TokenDataDependency) -> UserSchema:
+async def get_user(db: ReadOnlyDatabaseDependency, token_data: TokenDataDependency) -> UserSchema:
     return await user_db.get_user(db, user_id=token_data.user_id)
 
 
 @router.delete("/me", status_code=204)
-async def delete_user(db: DatabaseDependency, token_data: TokenDataDependency) -> None:
-    return await user_db.delete_user(db, user_id=token_data.user_id)
+async def delete_user(
+    db: DatabaseDependency, redis: RedisDependency, encryptor: EncryptorDependency, token_data: TokenDataDependency
+) -> None:
+    return await user_db.delete_user(db, redis, user_id=token_data.user_id, expires_in=encryptor.jwt_expire_minutes)
@@ -0,0 +1,161 @@
+"""Every CRUD route of the API, run in process through PgBouncer in transaction pooling mode."""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+
+from smart_fridge.app import App
+from smart_fridge.cli.bench import AsgiResponse, asgi_request
+from smart_fridge.core.config import AppConfig
+
+
+# More clients than the server connections of the `pgbouncer` service, so their transactions share them
+CONCURRENCY = 8
+
+
+class Client:
+    """In-process API client of one user, failing the test on any unexpected status."""
+
+    def __init__(self, application: FastAPI) -> None:
+        self.__app = application
+        self.__headers: list[tuple[bytes, bytes]] = []
+
+    def authorize(self, access_token: str, refresh_token: str) -> None:
+        self.__headers = [
+            (b"authorization", f"Bearer {access_token}".encode()),
+            (b"cookie", f"refresh_token={refresh_token}".encode()),
+        ]
+
+    def forget(self) -> None:
+        self.__headers = []
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: Any = None,
+        *,
+        expected: int = 200,
+        headers: list[tuple[bytes, bytes]] | None = None,
+    ) -> AsgiResponse:
+        content = b"" if body is None else json.dumps(body, default=str).encode()
+        all_headers = [(b"user-agent", b"pytest"), *self.__headers, *(headers or [])]
+        if body is not None:
+            all_headers.append((b"content-type", b"application/json"))
+        response = await asgi_request(self.__app, method, f"/api/v1{path}", all_headers, content)
+        assert response.status == expected, f"{method} {path}: {response.status} {response.body[:200]!r}"
+        return response
+
+    async def update(self, method: str, path: str, body: Any, etag: str) -> AsgiResponse:
+        """Update the resource with If-Match, then check that its previous version is refused."""
+        response = await self.request(method, path, body, headers=[(b"if-match", etag.encode())])
+        assert response.headers.get("etag") != etag, f"{method} {path}: version was not incremented"
+        await self.request(method, path, body, expected=412, headers=[(b"if-match", etag.encode())])
+        return response
+
+
+async def run_suite(application: FastAPI) -> None:
+    """Walk one new user through every route, then delete what it created."""
+    client = Client(application)
+    email = f"test-{uuid4().hex}@example.com"
+    password = uuid4().hex
+
+    user = (await client.request("POST", "/users/", {"username": email, "email": email, "password": password})).json()
+    tokens = (await client.request("POST", "/auth/login", {"email": email, "password": password})).json()
+    client.authorize(tokens["access_token"], tokens["refresh_token"])
+    tokens = (await client.request("POST", "/auth/refresh_tokens")).json()
+    client.authorize(tokens["access_token"], tokens["refresh_token"])
+    assert (await client.request("GET", "/users/me")).json()["id"] == user["id"]
+
+    product_type = {
+        "name": f"test-{uuid4().hex}",
+        "slug": f"test-{uuid4().hex}",
+        "account_type": "pieces",
+        "exp_period_before_opening": "P3D",
+        "exp_period_after_opening": "P1D",
+        "calories": 100,
+    }
+    product_type_id = (await client.request("POST", "/product_types/", product_type)).json()["id"]
+    await client.request("GET", "/product_types/")
+    await client.request("GET", f"/product_types/{product_type_id}")
+    await client.request("PATCH", f"/product_types/{product_type_id}", {"calories": 120})
+    await client.request("PUT", f"/product_types/{product_type_id}", {**product_type, "calories": 150})
+
+    now = datetime.now(timezone.utc)
+    product = {"amount": 3, "product_type_id": product_type_id, "manufactured_at": now - timedelta(days=1)}
+    product_id = (await client.request("POST", "/products/", product)).json()["id"]
+    await client.request("GET", "/products/")
+    etag = (await client.request("GET", f"/products/{product_id}")).headers["etag"]
+    etag = (await client.update("PATCH", f"/products/{product_id}", {**product, "amount": 2}, etag)).headers["etag"]
+    await client.update("PUT", f"/products/{product_id}", {**product, "amount": 1}, etag)
+    await client.request("POST", f"/products/open/{product_id}")
+    await client.request("POST", f"/products/close/{product_id}")
+
+    fridge_id = (await client.request("POST", "/fridges/", {"name": "test"})).json()["id"]
+    await client.request("GET", "/fridges/")
+    etag = (await client.request("GET", f"/fridges/{fridge_id}")).headers["etag"]
+    etag = (await client.update("PATCH", f"/fridges/{fridge_id}", {"name": "test patched"}, etag)).headers["etag"]
+    await client.update("PUT", f"/fridges/{fridge_id}", {"name": "test updated"}, etag)
+
+    fridge_product = {"product_id": product_id, "fridge_id": fridge_id}
+    fridge_product_id = (await client.request("POST", "/fridge_products/", fridge_product)).json()["id"]
+    await client.request("GET", f"/fridge_products/?fridge_id_eq={fridge_id}")
+    etag = (await client.request("GET", f"/fridge_products/{fridge_product_id}")).headers["etag"]
+    await client.update("PATCH", f"/fridge_products/{fridge_product_id}", {"deleted_at": None}, etag)
+
+    cart_product_id = (await client.request("POST", "/cart_products/", {"product_type_id": product_type_id})).json()[
+        "id"
+    ]
+    await client.request("GET", "/cart_products/")
+    etag = (await client.request("GET", f"/cart_products/{cart_product_id}")).headers["etag"]
+    await client.update("PUT", f"/cart_products/{cart_product_id}", {}, etag)
+
+    # Updates are scoped to the owner, missing rows must still be told from forbidden ones
+    await client.request("PATCH", "/product_types/0", {"calories": 120}, expected=404)
+    await client.request("PATCH", "/products/0", {**product, "amount": 2}, expected=404)
+    await client.request("PATCH", "/fridges/0", {"name": "test patched"}, expected=404)
+    await client.request("PATCH", "/fridge_products/0", {"deleted_at": None}, expected=404)
+    await client.request("PUT", "/cart_products/0", {}, expected=404)
+
+    period = f"date_from={(now - timedelta(days=1)).isoformat()}&date_to={(now + timedelta(days=1)).isoformat()}"
+    await client.request("GET", f"/statistics/?{period.replace('+', '%2B')}")
+
+    for path in ("/cart_products/0", "/fridge_products/0", "/fridges/0", "/products/0"):
+        await client.request("DELETE", path, expected=404)
+    await client.request("DELETE", f"/cart_products/{cart_product_id}", expected=204)
+    await client.request("DELETE", f"/fridge_products/{fridge_product_id}", expected=204)
+    await client.request("DELETE", f"/fridges/{fridge_id}", expected=204)
+    await client.request("DELETE", f"/products/{product_id}", expected=204)
+    # The soft-deleted cart product still references the product type
+    unused_type = {**product_type, "name": f"test-{uuid4().hex}", "slug": f"test-{uuid4().hex}"}
+    unused_id = (await client.request("POST", "/product_types/", unused_type)).json()["id"]
+    await client.request("DELETE", f"/product_types/{unused_id}", expected=204)
+    await client.request("DELETE", "/auth/logout", expected=204)
+    client.forget()
+    tokens = (await client.request("POST", "/auth/login", {"email": email, "password": password})).json()
+    client.authorize(tokens["access_token"], tokens["refresh_token"])
+    await client.request("DELETE", "/users/me", expected=204)
+
+
+@pytest.fixture
+async def application(pgbouncer_config: AppConfig) -> AsyncIterator[FastAPI]:
+    # The suites of a test share a client address, so they would trip the rate limits of the auth routes
+    config = pgbouncer_config.model_copy(
+        update={"rate_limit": pgbouncer_config.rate_limit.model_copy(update={"enabled": False})}
+    )
+    app = App(config)
+    async with app.lifespan(app.app):
+        yield app.app
+
+
+async def test_crud(application: FastAPI) -> None:
+    await run_suite(application)
+
+
+async def test_crud_concurrently(application: FastAPI) -> None:
+    await asyncio.gather(*(run_suite(application) for _ in range(CONCURRENCY)))
@@ -0,0 +1,350 @@
+"""Query plans of every query of lib/db on realistic volumes, run against TEST_DATABASE_URL.
+
+The module seeds the volumes in a transaction, runs each query for one seeded user, and explains each
+statement with its parameters. Everything is rolled back, but the seed takes locks and disk space while it runs.
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Sequence
+from uuid import UUID
+
+import pytest
+import pytest_asyncio
+from redis.asyncio import Redis
+from sqlalchemy import Connection, event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from smart_fridge.core.config import AppConfig
+from smart_fridge.core.dependencies import constructors as app_depends
+from smart_fridge.core.exceptions.abc import AbstractException
+from smart_fridge.lib.db import (
+    auth_session as auth_session_db,
+    cart_product as cart_products_db,
+    fridge as fridges_db,
+    fridge_product as fridge_products_db,
+    product as products_db,
+    product_type as product_types_db,
+    statistics as statistics_db,
+    user as user_db,
+)
+from smart_fridge.lib.schemas.cart_product import CartProductPatchSchema
+from smart_fridge.lib.schemas.fridge import FridgePatchSchema
+from smart_fridge.lib.schemas.fridge_product import FridgeProductFilterSchema, FridgeProductPatchSchema
+from smart_fridge.lib.schemas.pagination import PaginationRequest
+from smart_fridge.lib.schemas.product import ProductPatchSchema
+from smart_fridge.lib.schemas.product_type import ProductTypePatchSchema
+from smart_fridge.lib.schemas.statistics import StatisticsFilterSchema
+from smart_fridge.lib.schemas.user import UserPatchSchema
+
+
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+# Rows seeded per user, and per database for users and product types
+VOLUMES = {
+    "users": 20000,
+    "products": 20,
+    "fridges": 2,
+    "cart_products": 10,
+    "sessions": 2,
+    "product_types": 500,
+}
+
+# Tables smaller than this may be scanned sequentially
+MIN_ROWS = 10000
+
+# Seed tables whose sequential scans fail the tests once they hold MIN_ROWS rows
+PLAN_TABLES = ("users", "auth_sessions", "products", "fridges", "fridge_products", "cart_products", "product_types")
+
+# Rows of every user on top of what the database holds, inserted in the transaction the tests roll back
+_SEED = (
+    "INSERT INTO product_types (name, slug, account_type, exp_period_before_opening, calories) "
+    "SELECT 'plan-' || i, 'plan-' || i, 'PIECES', make_interval(days => i % 30 + 1), i % 500 "
+    "FROM generate_series(1, :product_types) i",
+    # One user in ten linked their Telegram account
+    "INSERT INTO users (username, email, hashed_password, is_active, tg_id) "
+    "SELECT 'plan-' || i, 'plan-' || i || '@example.invalid', '', true, CASE WHEN i % 10 = 0 THEN i END "
+    "FROM generate_series(1, :users) i",
+    "INSERT INTO fridges (owner_id, name) "
+    "SELECT u.id, 'plan-' || i FROM users u, generate_series(1, :fridges) i WHERE u.id > :users_before",
+    "INSERT INTO products (product_type_id, owner_id, amount, manufactured_at) "
+    "SELECT t.ids[1 + (u.id + i) % array_length(t.ids, 1)], u.id, i, now() - make_interval(days => i) "
+    "FROM users u, generate_series(1, :products) i, "
+    "(SELECT array_agg(id) AS ids FROM product_types WHERE id > :product_types_before) t "
+    "WHERE u.id > :users_before",
+    # Three products in four were put in a fridge, and a third of those were taken out since
+    "INSERT INTO fridge_products (fridge_id, product_id, created_at, deleted_at) "
+    "SELECT f.id, p.id, p.manufactured_at, "
+    "CASE WHEN p.amount::int % 3 = 0 THEN p.manufactured_at + interval '1 day' END "
+    "FROM products p JOIN (SELECT owner_id, min(id) AS id FROM fridges GROUP BY owner_id) f ON f.owner_id = p.owner_id "
+    "WHERE p.owner_id > :users_before AND p.amount::int % 4 <> 0",
+    "INSERT INTO cart_products (owner_id, product_type_id, created_at, deleted_at) "
+    "SELECT u.id, t.ids[1 + (u.id * i) % array_length(t.ids, 1)], now(), CASE WHEN i % 2 = 0 THEN now() END "
+    "FROM users u, generate_series(1, :cart_products) i, "
+    "(SELECT array_agg(id) AS ids FROM product_types WHERE id > :product_types_before) t "
+    "WHERE u.id > :users_before",
+    "INSERT INTO auth_sessions (id, user_id, user_ip, access_token, refresh_token, last_online, created_at) "
+    "SELECT gen_random_uuid(), u.id, '127.0.0.1', gen_random_uuid(), gen_random_uuid(), now(), "
+    "now() - make_interval(days => i) FROM users u, generate_series(1, :sessions) i WHERE u.id > :users_before",
+)
+
+_SAMPLE = """
+SELECT u.id, u.email, fp.id, fp.product_id, fp.fridge_id, p.product_type_id,
+    (SELECT id FROM products WHERE owner_id = u.id AND amount::int % 4 = 0 LIMIT 1),
+    (SELECT id FROM cart_products WHERE owner_id = u.id AND deleted_at IS NULL LIMIT 1),
+    s.id, s.refresh_token
+FROM users u
+JOIN products p ON p.owner_id = u.id
+JOIN fridge_products fp ON fp.product_id = p.id AND fp.deleted_at IS NULL
+JOIN auth_sessions s ON s.user_id = u.id
+WHERE u.id > :users_before AND u.tg_id IS NOT NULL
+LIMIT 1
+"""
+
+# Sequential scans the planner rightly prefers: the expiry job aggregates the products of every linked user at once
+PLAN_SEQ_SCANS_ALLOWED: dict[str, frozenset[str]] = {
+    "user.get_expiry_users": frozenset({"products", "fridge_products"}),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class _Sample:
+    """Rows of one seeded user the queries are run for."""
+
+    user_id: int
+    email: str
+    fridge_product_id: int
+    product_id: int
+    fridge_id: int
+    product_type_id: int
+    # Not in any fridge, so it can be deleted
+    free_product_id: int
+    cart_product_id: int
+    session_id: UUID
+    refresh_token: UUID
+
+
+def _period() -> StatisticsFilterSchema:
+    now = datetime.now(timezone.utc)
+    return StatisticsFilterSchema(date_from=now - timedelta(days=30), date_to=now)
+
+
+# Every query of lib/db, by the function running it
+PLAN_PROBES: Sequence[tuple[str, Callable[[AsyncSession, Redis, _Sample], Awaitable[Any]]]] = (
+    ("user.is_email_exists", lambda db, redis, s: user_db.is_email_exists(db, s.email)),
+    ("user.get_user_model", lambda db, redis, s: user_db.get_user_model(db, email=s.email)),
+    ("user.get_user", lambda db, redis, s: user_db.get_user(db, user_id=s.user_id)),
+    (
+        "user.update_user",
+        lambda db, redis, s: user_db.update_user(db, user_id=s.user_id, schema=UserPatchSchema(username="plan")),
+    ),
+    ("user.get_expiry_users", lambda db, redis, s: user_db.get_expiry_users(db)),
+    ("user.delete_user", lambda db, redis, s: user_db.delete_user(db, redis, user_id=s.user_id, expires_in=1)),
+    (
+        "auth_session.get_auth_session_model",
+        lambda db, redis, s: auth_session_db.get_auth_session_model(db, refresh_token=s.refresh_token, join_user=True),
+    ),
+    (
+        "auth_session.get_auth_session",
+        lambda db, redis, s: auth_session_db.get_auth_session(db, s.session_id, s.user_id),
+    ),
+    (
+        "auth_session.is_refresh_token_exists",
+        lambda db, redis, s: auth_session_db.is_refresh_token_exists(db, s.refresh_token),
+    ),
+    (
+        "auth_session.create_auth_session_for_credentials",
+        lambda db, redis, s: auth_session_db.create_auth_session_for_credentials(
+            db, s.email, "", "127.0.0.1", None, ""
+        ),
+    ),
+    (
+        "auth_session.rotate_auth_session_tokens",
+        lambda db, redis, s: auth_session_db.rotate_auth_session_tokens(db, s.refresh_token, "127.0.0.1", None),
+    ),
+    (
+        "auth_session.update_last_online",
+        lambda db, redis, s: auth_session_db.update_last_online(db, {s.session_id: datetime.now(timezone.utc)}),
+    ),
+    (
+        "auth_session.delete_expired_auth_sessions",
+        lambda db, redis, s: auth_session_db.delete_expired_auth_sessions(
+            db, datetime.now(timezone.utc) - timedelta(days=30), limit=100
+        ),
+    ),
+    (
+        "auth_session.delete_user_auth_sessions",
+        lambda db, redis, s: auth_session_db.delete_user_auth_sessions(db, redis, s.user_id, expires_in=1),
+    ),
+    ("product_type.get_product_types", lambda db, redis, s: product_types_db.get_product_types(db)),
+    ("product_type.get_product_type", lambda db, redis, s: product_types_db.get_product_type(db, s.product_type_id)),
+    (
+        "product_type.update_product_type",
+        lambda db, redis, s: product_types_db.update_product_type(
+            db, s.product_type_id, ProductTypePatchSchema(calories=1)
+        ),
+    ),
+    ("product.get_products", lambda db, redis, s: products_db.get_products(db, s.user_id)),
+    ("product.get_product", lambda db, redis, s: products_db.get_product(db, s.product_id, s.user_id)),
+    (
+        "product.update_product",
+        lambda db, redis, s: products_db.update_product(
+            db, s.product_id, ProductPatchSchema(amount=1, product_type_id=s.product_type_id), s.user_id
+        ),
+    ),
+    ("product.set_product_opened", lambda db, redis, s: products_db.set_product_opened(db, s.product_id, s.user_id)),
+    ("product.delete_product", lambda db, redis, s: products_db.delete_product(db, s.free_product_id, s.user_id)),
+    ("fridge.get_fridges", lambda db, redis, s: fridges_db.get_fridges(db, s.user_id)),
+    ("fridge.get_fridge", lambda db, redis, s: fridges_db.get_fridge(db, s.fridge_id, s.user_id)),
+    (
+        "fridge.update_fridge",
+        lambda db, redis, s: fridges_db.update_fridge(db, s.fridge_id, FridgePatchSchema(name="plan"), s.user_id),
+    ),
+    ("fridge.delete_fridge", lambda db, redis, s: fridges_db.delete_fridge(db, s.fridge_id, s.user_id)),
+    (
+        "fridge_product.get_fridge_products",
+        lambda db, redis, s: fridge_products_db.get_fridge_products(
+            db, FridgeProductFilterSchema(), PaginationRequest(), s.user_id
+        ),
+    ),
+    (
+        "fridge_product.get_fridge_products(fridge_id_eq)",
+        lambda db, redis, s: fridge_products_db.get_fridge_products(
+            db, FridgeProductFilterSchema(fridge_id_eq=s.fridge_id), PaginationRequest(), s.user_id
+        ),
+    ),
+    (
+        "fridge_product.get_fridge_product",
+        lambda db, redis, s: fridge_products_db.get_fridge_product(db, s.fridge_product_id, s.user_id),
+    ),
+    (
+        "fridge_product.update_fridge_product",
+        lambda db, redis, s: fridge_products_db.update_fridge_product(
+            db, s.fridge_product_id, FridgeProductPatchSchema(deleted_at=None), s.user_id
+        ),
+    ),
+    (
+        "fridge_product.delete_fridge_product",
+        lambda db, redis, s: fridge_products_db.delete_fridge_product(db, s.fridge_product_id, s.user_id),
+    ),
+    ("fridge_product.is_product_exists", lambda db, redis, s: fridge_products_db.is_product_exists(db, s.product_id)),
+    ("cart_product.get_cart_products", lambda db, redis, s: cart_products_db.get_cart_products(db, s.user_id)),
+    (
+        "cart_product.get_cart_product",
+        lambda db, redis, s: cart_products_db.get_cart_product(db, s.cart_product_id, s.user_id),
+    ),
+    (
+        "cart_product.update_cart_product",
+        lambda db, redis, s: cart_products_db.update_cart_product(
+            db, s.cart_product_id, CartProductPatchSchema(deleted_at=None), s.user_id
+        ),
+    ),
+    (
+        "cart_product.delete_cart_product",
+        lambda db, redis, s: cart_products_db.delete_cart_product(db, s.cart_product_id, s.user_id),
+    ),
+    ("statistics.get_added", lambda db, redis, s: statistics_db.get_added(db, s.user_id, _period())),
+    ("statistics.get_deleted", lambda db, redis, s: statistics_db.get_deleted(db, s.user_id, _period())),
+    ("statistics.get_exceeded", lambda db, redis, s: statistics_db.get_exceeded(db, s.user_id, _period())),
+)
+
+
+def _seq_scans(plan: dict[str, Any]) -> Iterator[str]:
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+async def _seed(conn: AsyncConnection, volumes: dict[str, int]) -> _Sample:
+    params = {
+        **volumes,
+        "users_before": await conn.scalar(text("SELECT coalesce(max(id), 0) FROM users")),
+        "product_types_before": await conn.scalar(text("SELECT coalesce(max(id), 0) FROM product_types")),
+    }
+    for statement in _SEED:
+        await conn.execute(text(statement), params)
+    await conn.execute(text(f"ANALYZE {', '.join(PLAN_TABLES)}"))
+    row = (await conn.execute(text(_SAMPLE), params)).one()
+    return _Sample(*row)
+
+
+async def _explain(conn: AsyncConnection, statement: str, parameters: Any) -> dict[str, Any]:
+    # The statements are explained with the parameters they ran with, so the planner sees the same values
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = result.scalar_one()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+async def _run_probe(
+    conn: AsyncConnection,
+    probe: Callable[[AsyncSession, Redis, _Sample], Awaitable[Any]],
+    redis: Redis,
+    sample: _Sample,
+) -> list[tuple[str, Any]]:
+    """Run the probe in a savepoint rolled back afterwards, and return the statements it ran with their parameters."""
+    statements: list[tuple[str, Any]] = []
+
+    def capture(connection: Connection, cursor: Any, statement: str, parameters: Any, *args: Any) -> None:
+        executemany = args[-1]
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    event.listen(conn.sync_connection, "before_cursor_execute", capture)
+    try:
+        await probe(db, redis, sample)
+    except AbstractException:
+        pass
+    finally:
+        event.remove(conn.sync_connection, "before_cursor_execute", capture)
+        await db.close()
+    return statements
+
+
+@dataclass(frozen=True, slots=True)
+class Seeded:
+    conn: AsyncConnection
+    redis: Redis
+    sample: _Sample
+    # Seeded tables holding at least MIN_ROWS rows
+    large: frozenset[str]
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def seeded(database_config: AppConfig) -> AsyncIterator[Seeded]:
+    engine = app_depends.db_engine(database_config.database)
+    redis = Redis.from_url(database_config.redis.url)
+    try:
+        async with engine.connect() as conn:
+            # Nothing is committed: the seed and the writes of the probes are rolled back with this transaction
+            await conn.begin()
+            sample = await _seed(conn, VOLUMES)
+            query = text("SELECT relname FROM pg_class WHERE relname = ANY(:tables) AND reltuples >= :rows")
+            large = frozenset((await conn.scalars(query, {"tables": list(PLAN_TABLES), "rows": MIN_ROWS})).all())
+            yield Seeded(conn, redis, sample, large)
+            await conn.rollback()
+    finally:
+        await redis.aclose()
+        await engine.dispose()
+
+
+async def test_seed_is_large(seeded: Seeded) -> None:
+    # Otherwise the planner may rightly scan tables the probes are meant to find in indexes
+    assert seeded.large >= {"users", "auth_sessions", "products", "fridge_products", "cart_products"}
+
+
+@pytest.mark.parametrize("name, probe", PLAN_PROBES, ids=[name for name, _ in PLAN_PROBES])
+async def test_no_seq_scans_of_large_tables(
+    seeded: Seeded, name: str, probe: Callable[[AsyncSession, Redis, _Sample], Awaitable[Any]]
+) -> None:
+    statements = await _run_probe(seeded.conn, probe, seeded.redis, seeded.sample)
+    assert statements, f"{name} ran no statements"
+    failures = []
+    for statement, parameters in statements:
+        scans = set(_seq_scans(await _explain(seeded.conn, statement, parameters))) & seeded.large
+        failures.extend(
+            f"{table}:\n{statement}" for table in sorted(scans - PLAN_SEQ_SCANS_ALLOWED.get(name, frozenset()))
+        )
+    assert not failures, f"{name} scans sequentially " + "\n".join(failures)